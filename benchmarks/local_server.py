@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: local_server.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Local HTTP server used as a stand-in origin by the benchmark scripts.
+
+Routes:
+    /bytes/<size>     Serves `size` bytes, throttled to `rate` bytes per second per connection.
+    /status/<code>    Responds with the given HTTP status code and an empty body.
+    /delay/<ms>       Waits `ms` milliseconds, then serves a small body.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+# Size of the blocks written by the server, and the throttling granularity.
+BLOCK_SIZE = 64 * 1024
+
+# Body of the delayed responses.
+_DELAYED_BODY = b'late'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves the benchmark routes."""
+
+    protocol_version = 'HTTP/1.1'
+    server: 'LocalServer'
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        """Answers a HEAD request."""
+
+        self.__respond(send_body=False)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answers a GET request."""
+
+        self.__respond(send_body=True)
+
+    def log_message(self, format: str, *args) -> None:  # pylint: disable=redefined-builtin
+        """Silences the default request logging."""
+
+    def __respond(self, send_body: bool) -> None:
+        """Dispatches the request path."""
+
+        parts = self.path.split('?')[0].strip('/').split('/')
+        try:
+            route, value = parts[0], int(parts[1])
+        except (IndexError, ValueError):
+            self.send_error(404)
+            return
+
+        if route == 'status':
+            self.send_response(value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif route == 'delay':
+            time.sleep(value / 1000)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(_DELAYED_BODY)))
+            self.end_headers()
+            if send_body:
+                self.__write(_DELAYED_BODY)
+        elif route == 'bytes':
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(value))
+            self.end_headers()
+            if send_body:
+                self.__send_bytes(value)
+        else:
+            self.send_error(404)
+
+    def __write(self, data: bytes) -> bool:
+        """Writes `data`, returning False if the client went away, as timed out clients do."""
+
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            return False
+
+        return True
+
+    def __send_bytes(self, size: int) -> None:
+        """Writes `size` bytes, throttled to the server rate."""
+
+        block = b'x' * BLOCK_SIZE
+        rate = self.server.rate
+        started = time.perf_counter()
+        sent = 0
+        while sent < size:
+            count = min(BLOCK_SIZE, size - sent)
+            if not self.__write(block[:count]):
+                return
+            sent += count
+            if rate:
+                delay = sent / rate - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+
+class LocalServer(ThreadingHTTPServer):
+    """A threaded HTTP server running in the background.
+
+    Attributes:
+        rate(float): Bytes per second served to each connection, or 0 for unthrottled.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, rate: float = 0, address: Tuple[str, int] = ('127.0.0.1', 0)) -> None:
+        """Binds the server to `address` (a free port by default)."""
+
+        super().__init__(address, _Handler)
+        self.rate = rate
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        """The URL of the server root, without trailing slash."""
+
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self) -> 'LocalServer':
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.server_close()
+        self.__thread.join()
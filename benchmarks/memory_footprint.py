@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: memory_footprint.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Compares the memory used by DownloadTask/DownloadResult lists and TaskBatch/BatchResult.
+
+Usage:
+    python benchmarks/memory_footprint.py --count 1000000
+"""
+
+# pylint: disable=wrong-import-position
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+# Add src to path to run execution
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from grabharvester import BatchResult, DownloadResult, DownloadTask, TaskBatch
+
+
+def measure(build: Callable[[], object]) -> Tuple[object, int]:
+    """Returns the object built by `build` and the bytes it retains."""
+
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return value, current
+
+
+def task_args(count: int):
+    """Yields the URL and destination of `count` synthetic tasks spread over 100 directories."""
+
+    for number in range(count):
+        yield (
+            f'https://data.example.com/archive/{number % 100:02d}/object-{number:08d}.json',
+            f'/srv/harvest/{number % 100:02d}/object-{number:08d}.json',
+        )
+
+
+def main() -> None:
+    """Runs the benchmark and prints a comparison table."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000, help='number of tasks (default: 1,000,000)')
+    count = parser.parse_args().count
+
+    tasks, tasks_bytes = measure(lambda: [DownloadTask(url, Path(path)) for url, path in task_args(count)])
+    # The manager receives a fresh Path from the download service for every success.
+    result, result_bytes = measure(
+        lambda: DownloadResult(successes=[Path(path) for _, path in task_args(count)], failures=[])
+    )
+    del tasks, result
+
+    def build_batch() -> TaskBatch:
+        batch = TaskBatch()
+        for url, path in task_args(count):
+            batch.append(url, path)
+        return batch
+
+    batch, batch_bytes = measure(build_batch)
+
+    def build_batch_result() -> BatchResult:
+        batch_result = BatchResult(batch)
+        for index in range(len(batch)):
+            batch_result.record_success(index, batch.destination_path(index))
+        return batch_result
+
+    _, batch_result_bytes = measure(build_batch_result)
+
+    print(f'{count:,} tasks')
+    print(f'{"":24}{"objects":>14}{"compact":>14}{"ratio":>8}')
+    for label, objects, compact in (
+        ('tasks', tasks_bytes, batch_bytes),
+        ('results (all success)', result_bytes, batch_result_bytes),
+    ):
+        print(f'{label:24}{objects / 2**20:>11.1f} MiB{compact / 2**20:>10.1f} MiB{objects / compact:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: scheduling_makespan.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Measures the makespan and mean completion time of each scheduling policy.
+
+A local server serves a mix of many small files and a few large ones, listed
+last in the input, throttled per connection to emulate a slow origin.
+
+Usage:
+    python benchmarks/scheduling_makespan.py --threads 4 --rate 4000000
+"""
+
+# pylint: disable=wrong-import-position
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+# Add src to path to run execution
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent))
+
+from local_server import LocalServer
+
+from grabharvester import (
+    DownloadManager,
+    DownloadService,
+    DownloadTask,
+    FifoPolicy,
+    LargestFirstPolicy,
+    ShortestFirstPolicy,
+)
+
+
+class TimedService(DownloadService):
+    """Download service recording when each file completes."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.completions: List[float] = []
+        self.__lock = threading.Lock()
+
+    def download_file(self, url, file_path=None, **kwargs):
+        path = super().download_file(url, file_path, **kwargs)
+        with self.__lock:
+            self.completions.append(time.perf_counter())
+        return path
+
+
+def main() -> None:
+    """Runs every policy against the same mixed-size batch and prints the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=4, help='worker threads (default: 4)')
+    parser.add_argument('--rate', type=float, default=4e6, help='bytes/s per connection (default: 4 MB/s)')
+    parser.add_argument('--small', type=int, default=40, help='number of 256 KiB files (default: 40)')
+    parser.add_argument('--large', type=int, default=2, help='number of 16 MiB files (default: 2)')
+    parser.add_argument('--probe', action='store_true', help='probe sizes with HEAD instead of size hints')
+    args = parser.parse_args()
+
+    sizes = [256 * 1024] * args.small + [16 * 1024 * 1024] * args.large
+
+    with LocalServer(rate=args.rate) as server, tempfile.TemporaryDirectory() as directory:
+        print(f'{len(sizes)} files, {args.threads} threads, {args.rate / 1e6:.1f} MB/s per connection')
+        print(f'{"policy":22}{"makespan":>10}{"mean completion":>18}')
+
+        for policy in (FifoPolicy(), LargestFirstPolicy(), ShortestFirstPolicy()):
+            tasks = [
+                DownloadTask(
+                    url=f'{server.base_url}/bytes/{size}?n={number}',
+                    destination_path=Path(directory, type(policy).__name__, f'{number}.bin'),
+                    size_hint=None if args.probe else size,
+                )
+                for number, size in enumerate(sizes)
+            ]
+            service = TimedService()
+            manager = DownloadManager(
+                service, max_threads=args.threads, progress=None, scheduler=policy, probe_sizes=args.probe
+            )
+
+            started = time.perf_counter()
+            result = manager.run(tasks)
+            makespan = time.perf_counter() - started
+            mean_completion = statistics.fmean(completion - started for completion in service.completions)
+
+            assert not result.failures, result.failures
+            print(f'{type(policy).__name__:22}{makespan:>9.2f}s{mean_completion:>17.2f}s')
+
+
+if __name__ == '__main__':
+    main()
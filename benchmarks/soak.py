@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: soak.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Soak test: calls DownloadManager.run repeatedly, as a long-lived service does, and checks for leaks.
+
+Every round downloads a batch from a local stand-in server, mixing successes with
+HTTP errors, per-task timeouts and, in some rounds, a cancellation of the whole
+batch. After each round the process is sampled: resident memory, open file
+descriptors, threads, open sockets, live `httpx.Response` objects and open
+`tqdm` bars. The first samples, taken once the warm-up rounds have filled the
+caches and pools, are the baseline; any later sample above the baseline plus
+its bound, or a throughput fallen below a fraction of the initial one, fails
+the run with exit status 1.
+
+The server runs in a child process, so its threads and sockets are not counted.
+
+Usage:
+    python benchmarks/soak.py --rounds 1000 --tasks 1000
+    python benchmarks/soak.py --rounds 200 --session --lookahead 8
+"""
+
+# pylint: disable=wrong-import-position
+
+import argparse
+import contextlib
+import gc
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from statistics import median
+from typing import Dict, List, NamedTuple
+
+import httpx
+from tqdm import tqdm
+
+# Add src to path to run execution
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent))
+
+from local_server import LocalServer
+
+from grabharvester import CancellationToken, DownloadManager, DownloadService, DownloadTask, HttpSession
+
+
+class Sample(NamedTuple):
+    """Resources held by the process after a round, and the throughput of the round."""
+
+    round: int
+    tasks: int  # Downloads attempted since the start.
+    throughput: float  # Tasks per second of the round.
+    rss: int
+    fds: int
+    threads: int
+    sockets: int
+    responses: int
+    bars: int
+
+
+# Resources checked for growth against the baseline.
+_CHECKED = ('rss', 'fds', 'threads', 'sockets', 'responses', 'bars')
+
+
+def resident_memory() -> int:
+    """Returns the resident set size of the process, in bytes.
+
+    Outside Linux this is the peak resident size, which can only detect growth.
+    """
+
+    try:
+        with open('/proc/self/statm', 'rb') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def open_descriptors() -> int:
+    """Returns the number of file descriptors open in the process."""
+
+    for directory in ('/proc/self/fd', '/dev/fd'):
+        if os.path.isdir(directory):
+            return len(os.listdir(directory))
+
+    return -1
+
+
+def live_objects() -> Dict[str, int]:
+    """Counts the open sockets and the `httpx.Response` objects still alive."""
+
+    counts = {'sockets': 0, 'responses': 0}
+    for value in gc.get_objects():
+        if isinstance(value, socket.socket):
+            counts['sockets'] += value.fileno() != -1
+        elif isinstance(value, httpx.Response):
+            counts['responses'] += 1
+
+    return counts
+
+
+def take_sample(number: int, tasks: int, throughput: float) -> Sample:
+    """Collects garbage, then samples the resources held by the process."""
+
+    gc.collect()
+    return Sample(
+        round=number,
+        tasks=tasks,
+        throughput=throughput,
+        rss=resident_memory(),
+        fds=open_descriptors(),
+        threads=threading.active_count(),
+        bars=len(getattr(tqdm, '_instances', ())),
+        **live_objects(),
+    )
+
+
+def serve(rate: float, urls: 'multiprocessing.Queue[str]') -> None:
+    """Runs the stand-in server until the process is terminated."""
+
+    with LocalServer(rate=rate) as server:
+        urls.put(server.base_url)
+        threading.Event().wait()
+
+
+def build_tasks(base_url: str, directory: Path, options: argparse.Namespace, rng: random.Random) -> List[DownloadTask]:
+    """Builds a batch mixing successes, HTTP errors and downloads slower than the task timeout."""
+
+    delay = int(options.task_timeout * 2000)
+    tasks = []
+    for number in range(options.tasks):
+        draw = rng.random()
+        if draw < options.failure_rate:
+            path = f'status/{rng.choice((404, 500, 503))}'
+        elif draw < options.failure_rate + options.timeout_rate:
+            path = f'delay/{delay}'
+        else:
+            path = f'bytes/{rng.randint(1, options.max_size)}'
+        tasks.append(DownloadTask(url=f'{base_url}/{path}', destination_path=directory / f'{number}.bin'))
+
+    return tasks
+
+
+def run_round(manager: DownloadManager, tasks: List[DownloadTask], options: argparse.Namespace, cancel: bool) -> None:
+    """Runs one batch, cancelling it midway if `cancel` is set."""
+
+    token = CancellationToken()
+    timer = threading.Timer(options.cancel_after, token.cancel) if cancel else None
+    if timer is not None:
+        timer.start()
+
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stderr(devnull):
+            manager.run(tasks, token=token)
+    finally:
+        if timer is not None:
+            timer.cancel()
+            timer.join()
+
+
+def violations(
+    baseline: Sample, initial: float, sample: Sample, recent: float, options: argparse.Namespace
+) -> List[str]:
+    """Lists the bounds exceeded by `sample`."""
+
+    bounds = {
+        'rss': options.max_rss_growth * 2**20,
+        'fds': options.max_fd_growth,
+        'threads': options.max_thread_growth,
+        'sockets': options.max_object_growth,
+        'responses': options.max_object_growth,
+        'bars': options.max_object_growth,
+    }
+    found = [
+        f'round {sample.round}: {name} grew from {getattr(baseline, name)} to {getattr(sample, name)}'
+        for name in _CHECKED
+        if getattr(sample, name) > getattr(baseline, name) + bounds[name]
+    ]
+    if initial and recent < initial * options.min_throughput:
+        found.append(f'round {sample.round}: throughput fell from {initial:.0f} to {recent:.0f} tasks/s')
+
+    return found
+
+
+def print_sample(sample: Sample) -> None:
+    """Prints a row of the report."""
+
+    print(
+        f'{sample.round:>7}{sample.tasks:>10,}{sample.throughput:>10.0f}{sample.rss / 2**20:>10.1f}'
+        f'{sample.fds:>6}{sample.threads:>8}{sample.sockets:>8}{sample.responses:>10}{sample.bars:>6}',
+        flush=True,
+    )
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parses the command line."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=1000, help='number of run() calls (default: 1000)')
+    parser.add_argument('--tasks', type=int, default=1000, help='tasks per round (default: 1000)')
+    parser.add_argument('--threads', type=int, default=8, help='worker threads (default: 8)')
+    parser.add_argument('--max-size', type=int, default=16 * 1024, help='largest file, in bytes (default: 16 KiB)')
+    parser.add_argument('--failure-rate', type=float, default=0.05, help='share of HTTP errors (default: 0.05)')
+    parser.add_argument('--timeout-rate', type=float, default=0.01, help='share of timed out tasks (default: 0.01)')
+    parser.add_argument('--task-timeout', type=float, default=0.2, help='per-task timeout, in seconds (default: 0.2)')
+    parser.add_argument('--cancel-rate', type=float, default=0.1, help='share of cancelled rounds (default: 0.1)')
+    parser.add_argument('--cancel-after', type=float, default=0.1, help='seconds before cancelling (default: 0.1)')
+    parser.add_argument('--session', action='store_true', help='share an HttpSession between the rounds')
+    parser.add_argument('--lookahead', type=int, default=0, help='connections pre-warmed ahead (default: 0)')
+    parser.add_argument('--progress', default='tqdm', help="progress option of the manager (default: 'tqdm')")
+    parser.add_argument('--warmup', type=int, default=3, help='rounds before the baseline (default: 3)')
+    parser.add_argument('--report-every', type=int, default=10, help='rounds between report rows (default: 10)')
+    parser.add_argument('--max-rss-growth', type=float, default=64, help='allowed RSS growth, in MiB (default: 64)')
+    parser.add_argument('--max-fd-growth', type=int, default=16, help='allowed new descriptors (default: 16)')
+    parser.add_argument('--max-thread-growth', type=int, default=4, help='allowed new threads (default: 4)')
+    parser.add_argument('--max-object-growth', type=int, default=16, help='allowed new sockets, responses or bars')
+    parser.add_argument(
+        '--min-throughput', type=float, default=0.5, help='lowest throughput, as a share of the first (default: 0.5)'
+    )
+    parser.add_argument('--seed', type=int, default=0, help='seed of the task mix (default: 0)')
+
+    return parser.parse_args()
+
+
+# pylint: disable=too-many-locals
+def main() -> int:
+    """Runs the soak test, prints a report and returns the exit status."""
+
+    options = parse_arguments()
+    rng = random.Random(options.seed)
+
+    context = multiprocessing.get_context('spawn')
+    urls = context.Queue()
+    server = context.Process(target=serve, args=(0, urls), daemon=True)
+    server.start()
+    base_url = urls.get(timeout=30)
+
+    session = HttpSession() if options.session else None
+    manager = DownloadManager(
+        DownloadService(session=session),
+        max_threads=options.threads,
+        progress=None if options.progress == 'none' else options.progress,
+        task_timeout=options.task_timeout,
+        lookahead=options.lookahead,
+    )
+    directory = Path(tempfile.mkdtemp(prefix='grabharvester-soak-'))
+
+    print(f'{"round":>7}{"tasks":>10}{"tasks/s":>10}{"RSS MiB":>10}{"fds":>6}{"threads":>8}{"sockets":>8}', end='')
+    print(f'{"responses":>10}{"bars":>6}')
+
+    baseline = None
+    throughputs: List[float] = []
+    initial = 0.0
+    found: List[str] = []
+    total = 0
+    try:
+        for number in range(1, options.rounds + 1):
+            tasks = build_tasks(base_url, directory, options, rng)
+            cancel = rng.random() < options.cancel_rate
+            started = time.perf_counter()
+            run_round(manager, tasks, options, cancel)
+            elapsed = time.perf_counter() - started
+            total += len(tasks)
+            shutil.rmtree(directory)
+            directory.mkdir()
+
+            sample = take_sample(number, total, len(tasks) / elapsed)
+            if number <= options.warmup:
+                baseline = sample
+            else:
+                # Cancelled rounds stop early, so their throughput says nothing.
+                if not cancel:
+                    throughputs.append(sample.throughput)
+                if not initial and len(throughputs) == options.report_every:
+                    initial = median(throughputs)
+                recent = median(throughputs[-options.report_every :]) if initial else 0.0
+                found = violations(baseline or sample, initial, sample, recent, options)
+            if number % options.report_every == 0 or number == options.rounds or found:
+                print_sample(sample)
+            if found:
+                break
+    finally:
+        if session is not None:
+            session.close()
+        shutil.rmtree(directory, ignore_errors=True)
+        server.terminate()
+        server.join()
+
+    if found:
+        print('\n'.join(['', 'FAILED'] + found))
+        return 1
+
+    print(f'\nOK: {total:,} downloads in {number} rounds without resource growth beyond the bounds.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -32,9 +32,38 @@ from typing import Sequence, Union
 
 from loguru import logger
 
+from .batch import BatchResult, TaskBatch, TaskStatus
+from .cancellation import CancellationToken
 from .downloader import DownloadService
-from .interfaces import DownloadError, DownloadResult, DownloadTask, FileOperationError, NetworkDownloadError
+from .interfaces import (
+    DestinationLockedError,
+    DirectoryLayoutProtocol,
+    DownloadCancelledError,
+    DownloadError,
+    DownloadResult,
+    DownloadTask,
+    DownloadTimeoutError,
+    FileOperationError,
+    NetworkDownloadError,
+    TaskEvent,
+    TaskMetrics,
+)
 from .manager import DownloadManager
+from .memory import MemoryBudget, MemoryResult, SpooledBuffer
+from .network import DnsCache, HttpSession
+from .paths import DateLayout, FlatLayout, HashPrefixLayout
+from .pipeline import WriterPool
+from .profiling import Profiler, ProfileReport
+from .progress import (
+    CallbackProgressReporter,
+    LoggingProgressReporter,
+    ProgressOption,
+    ProgressSnapshot,
+    TqdmProgressReporter,
+)
+from .scheduling import FifoPolicy, LargestFirstPolicy, PriorityPolicy, ShortestFirstPolicy
+from .shards import ShardResult, ShardWriter
+from .sinks import LocalSink, MemorySink, S3Sink, SinkResult
 
 # NOTE: Disable logging by default when used as a library.
 logger.disable('grabharvester')
@@ -43,7 +72,9 @@ logger.disable('grabharvester')
 # fmt: off
 def download(urls: Sequence[Union[str, DownloadTask]],
              destination_dir: Union[str, Path, None] = None,
-             max_threads: int = 5) -> DownloadResult:
+             max_threads: int = 5,
+             progress: ProgressOption = 'auto',
+             layout: DirectoryLayoutProtocol | None = None) -> DownloadResult:
 # fmt: on
     """High-level function to download multiple files concurrently.
 
@@ -53,6 +84,10 @@ def download(urls: Sequence[Union[str, DownloadTask]],
                                                  dir (or uses task specific path). If provided,
                                                  it overrides/sets the directory for string URLs.
         max_threads(int): Number of concurrent threads (default: 5).
+        progress(ProgressOption): Progress reporting, see `DownloadManager` (default: 'auto').
+        layout(DirectoryLayoutProtocol | None): Places files inside `destination_dir`, e.g.
+                                                `HashPrefixLayout()` to shard huge output
+                                                trees (default: flat).
 
     Returns:
         DownloadResult: A tuple containing lists of successful paths and failed tasks.
@@ -60,18 +95,18 @@ def download(urls: Sequence[Union[str, DownloadTask]],
 
     # Initialize the download service and manager, then prepare tasks.
     service = DownloadService()
-    manager = DownloadManager(service, max_threads=max_threads)
+    manager = DownloadManager(service, max_threads=max_threads, progress=progress, layout=layout)
 
     tasks_to_run = []
     destination_path = Path(destination_dir) if destination_dir else None
+    placement = layout or FlatLayout()
 
     for item in urls:
         if isinstance(item, str):
             if destination_path:
                 # If destination_dir is provided, we treat it as a directory.
                 # We need to extract the filename from the URL to construct the full path.
-                filename = item.split('/')[-1].split('?')[0] or 'downloaded_file'
-                download_destination = destination_path / filename
+                download_destination = placement.place(destination_path, item)
             else:
                 download_destination = None
 
@@ -90,7 +125,42 @@ __all__ = [
     'DownloadManager',
     'DownloadResult',
     'DownloadTask',
+    'TaskBatch',
+    'BatchResult',
+    'TaskStatus',
+    'TaskEvent',
+    'TaskMetrics',
     'DownloadError',
     'NetworkDownloadError',
     'FileOperationError',
+    'DownloadCancelledError',
+    'DownloadTimeoutError',
+    'DestinationLockedError',
+    'CancellationToken',
+    'ProgressSnapshot',
+    'ProgressOption',
+    'TqdmProgressReporter',
+    'LoggingProgressReporter',
+    'CallbackProgressReporter',
+    'FlatLayout',
+    'HashPrefixLayout',
+    'DateLayout',
+    'FifoPolicy',
+    'LargestFirstPolicy',
+    'ShortestFirstPolicy',
+    'PriorityPolicy',
+    'WriterPool',
+    'MemoryBudget',
+    'MemoryResult',
+    'SpooledBuffer',
+    'ShardWriter',
+    'ShardResult',
+    'LocalSink',
+    'MemorySink',
+    'S3Sink',
+    'SinkResult',
+    'Profiler',
+    'ProfileReport',
+    'HttpSession',
+    'DnsCache',
 ]
@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: batch.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Compact, column-oriented representation of large download batches.
+
+A `TaskBatch` keeps URLs and filenames in contiguous byte buffers, interns the
+destination directories and stores one status code per task in an `array('b')`.
+`DownloadTask` and `Path` objects are only created when an entry is accessed,
+so describing (and reporting on) millions of downloads costs tens of bytes per
+entry instead of several hundred.
+"""
+
+import os
+from array import array
+from collections.abc import Sequence
+from enum import IntEnum
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, TypeVar, Union, overload
+
+from .interfaces import DownloadTask
+
+T = TypeVar('T')
+
+# Marks a missing directory in the interned directory column.
+_NO_DIRECTORY = -1
+
+# Size hint column value of tasks without a hint.
+_NO_SIZE = -1
+
+# Separates the mirrors of a task in the mirror column; URLs cannot contain a raw newline.
+_MIRROR_SEPARATOR = '\n'
+
+# Path rows of a `BatchResult` for tasks without a path, or saved at their own destination.
+_NO_PATH = -1
+_TASK_DESTINATION = -2
+
+
+class TaskStatus(IntEnum):
+    """Outcome of a task in a `BatchResult`."""
+
+    PENDING = 0
+    SUCCEEDED = 1
+    FAILED = 2
+    NOT_STARTED = 3
+
+
+class _StringColumn:
+    """Append-only column of strings stored as UTF-8 in a single buffer."""
+
+    __slots__ = ('__data', '__ends')
+
+    def __init__(self) -> None:
+        self.__data = bytearray()
+        self.__ends = array('Q')
+
+    def __len__(self) -> int:
+        return len(self.__ends)
+
+    def append(self, value: str) -> None:
+        """Appends a string to the column."""
+
+        self.__data += value.encode('utf-8')
+        self.__ends.append(len(self.__data))
+
+    def __getitem__(self, row: int) -> str:
+        start = self.__ends[row - 1] if row else 0
+        return self.__data[start : self.__ends[row]].decode('utf-8')
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the column buffers."""
+
+        return len(self.__data) + self.__ends.itemsize * len(self.__ends)
+
+
+class _PathColumn:
+    """Append-only column of optional paths with interned parent directories."""
+
+    __slots__ = ('__directories', '__directory_ids', '__parents', '__names')
+
+    def __init__(self) -> None:
+        self.__directories: List[str] = []
+        self.__directory_ids: Dict[str, int] = {}
+        self.__parents = array('l')
+        self.__names = _StringColumn()
+
+    def __len__(self) -> int:
+        return len(self.__parents)
+
+    def append(self, path: Union[str, Path, None]) -> None:
+        """Appends a path, or None, to the column."""
+
+        if path is None:
+            self.__parents.append(_NO_DIRECTORY)
+            self.__names.append('')
+            return
+
+        directory, name = os.path.split(os.fspath(path))
+        directory_id = self.__directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = self.__directory_ids[directory] = len(self.__directories)
+            self.__directories.append(directory)
+
+        self.__parents.append(directory_id)
+        self.__names.append(name)
+
+    def __getitem__(self, row: int) -> Path | None:
+        directory_id = self.__parents[row]
+        if directory_id == _NO_DIRECTORY:
+            return None
+
+        return Path(self.__directories[directory_id], self.__names[row])
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate bytes used by the column, including the interned directories."""
+
+        directories = sum(len(directory) for directory in self.__directories)
+        return directories + self.__parents.itemsize * len(self.__parents) + self.__names.nbytes
+
+
+class TaskBatch(Sequence):
+    """A compact sequence of download tasks.
+
+    Indexing or iterating a batch materializes `DownloadTask` objects on the fly;
+    they are not kept, so a batch can be handed to `DownloadManager.run_batch`
+    (or anything else expecting a sequence of tasks) without inflating memory.
+    """
+
+    def __init__(self, tasks: Iterable[Union[DownloadTask, str]] = ()) -> None:
+        """Initializes the batch.
+
+        Arguments:
+            tasks(Iterable[Union[DownloadTask, str]]): Initial tasks, as tasks or bare URLs.
+        """
+
+        self.__urls = _StringColumn()
+        self.__destinations = _PathColumn()
+        self.__priorities = array('l')
+        self.__size_hints = array('q')
+        self.__mirrors = _StringColumn()
+        self.extend(tasks)
+
+    def append(
+        self,
+        url: str,
+        destination_path: Union[str, Path, None] = None,
+        priority: int = 0,
+        size_hint: int | None = None,
+        mirrors: Sequence[str] = (),
+    ) -> None:
+        """Adds a task to the batch.
+
+        Arguments:
+            url(str): The URL of the file to download.
+            destination_path(Union[str, Path, None]): The local file path or directory, if any.
+            priority(int): Scheduling priority (default: 0).
+            size_hint(int | None): Expected size in bytes, if known.
+            mirrors(Sequence[str]): Alternative URLs serving the same file.
+        """
+
+        self.__urls.append(url)
+        self.__destinations.append(destination_path)
+        self.__priorities.append(priority)
+        self.__size_hints.append(_NO_SIZE if size_hint is None else size_hint)
+        self.__mirrors.append(_MIRROR_SEPARATOR.join(mirrors))
+
+    def extend(self, tasks: Iterable[Union[DownloadTask, str]]) -> None:
+        """Adds several tasks, given as tasks or bare URLs, to the batch."""
+
+        for task in tasks:
+            if isinstance(task, str):
+                self.append(task)
+            elif isinstance(task, DownloadTask):
+                self.append(*task)
+            else:
+                raise ValueError(f'Invalid item type in tasks: {type(task)}')
+
+    def __len__(self) -> int:
+        return len(self.__urls)
+
+    @overload
+    def __getitem__(self, index: int) -> DownloadTask: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[DownloadTask]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+
+        position = self.__position(index)
+        size_hint = self.__size_hints[position]
+        mirrors = self.__mirrors[position]
+
+        return DownloadTask(
+            url=self.__urls[position],
+            destination_path=self.__destinations[position],
+            priority=self.__priorities[position],
+            size_hint=None if size_hint == _NO_SIZE else size_hint,
+            mirrors=tuple(mirrors.split(_MIRROR_SEPARATOR)) if mirrors else (),
+        )
+
+    def url(self, index: int) -> str:
+        """Returns the URL of the task at `index` without materializing the task."""
+
+        return self.__urls[self.__position(index)]
+
+    def destination_path(self, index: int) -> Path | None:
+        """Returns the destination of the task at `index` without materializing the task."""
+
+        return self.__destinations[self.__position(index)]
+
+    def __position(self, index: int) -> int:
+        """Validates `index` and converts negative indexes."""
+
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError('TaskBatch index out of range')
+
+        return index
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate bytes used to store the batch."""
+
+        fixed = self.__priorities.itemsize + self.__size_hints.itemsize
+        return self.__urls.nbytes + self.__destinations.nbytes + self.__mirrors.nbytes + fixed * len(self)
+
+
+class _IndexView(Sequence):
+    """Read-only sequence materializing one item per selected task index."""
+
+    def __init__(self, indexes: array, getter: Callable[[int], T]) -> None:
+        self.__indexes = indexes
+        self.__getter = getter
+
+    def __len__(self) -> int:
+        return len(self.__indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.__getter(position) for position in self.__indexes[index]]
+
+        return self.__getter(self.__indexes[index])
+
+    def __iter__(self) -> Iterator:
+        return map(self.__getter, self.__indexes)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+
+        return list(self) == list(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({list(self)!r})'
+
+
+class BatchResult:
+    """Outcome of a `TaskBatch`: one status code per task plus the saved paths.
+
+    Exposes the same `successes`, `failures` and `not_started` attributes as `DownloadResult`,
+    as lazy views that only materialize `Path` and `DownloadTask` objects when
+    accessed.
+
+    Attributes:
+        batch(TaskBatch): The batch this result refers to.
+        status(array): One `TaskStatus` code per task, in batch order.
+    """
+
+    def __init__(self, batch: TaskBatch) -> None:
+        """Initializes a result with every task pending.
+
+        Arguments:
+            batch(TaskBatch): The batch this result refers to.
+        """
+
+        self.batch = batch
+        self.status = array('b', bytes(len(batch)))
+        self.__path_rows = array('q', [_NO_PATH]) * len(batch)
+        self.__paths = _PathColumn()
+
+    def record_success(self, index: int, path: Path) -> None:
+        """Marks the task at `index` as succeeded, saved at `path`."""
+
+        self.status[index] = TaskStatus.SUCCEEDED
+        if path == self.batch.destination_path(index):
+            # The common case: no need to store the path a second time.
+            self.__path_rows[index] = _TASK_DESTINATION
+        else:
+            self.__path_rows[index] = len(self.__paths)
+            self.__paths.append(path)
+
+    def record_failure(self, index: int) -> None:
+        """Marks the task at `index` as failed."""
+
+        self.status[index] = TaskStatus.FAILED
+
+    def record_not_started(self, index: int) -> None:
+        """Marks the task at `index` as never started, because its batch stopped early."""
+
+        self.status[index] = TaskStatus.NOT_STARTED
+
+    def path(self, index: int) -> Path | None:
+        """Returns the path the task at `index` was saved at, or None if it did not succeed."""
+
+        row = self.__path_rows[index]
+        if row == _TASK_DESTINATION:
+            return self.batch.destination_path(index)
+
+        return self.__paths[row] if row != _NO_PATH else None
+
+    def indexes(self, status: TaskStatus) -> array:
+        """Returns the indexes of the tasks with the given status, in batch order."""
+
+        code = int(status)
+        return array('Q', (index for index, value in enumerate(self.status) if value == code))
+
+    def count(self, status: TaskStatus) -> int:
+        """Returns the number of tasks with the given status."""
+
+        return self.status.count(status)
+
+    @property
+    def successes(self) -> Sequence:
+        """Paths of the successful downloads, in batch order."""
+
+        return _IndexView(self.indexes(TaskStatus.SUCCEEDED), self.path)
+
+    @property
+    def failures(self) -> Sequence:
+        """Tasks that failed, in batch order."""
+
+        return _IndexView(self.indexes(TaskStatus.FAILED), self.batch.__getitem__)
+
+    @property
+    def not_started(self) -> Sequence:
+        """Tasks that never started because the batch stopped early, in batch order."""
+
+        return _IndexView(self.indexes(TaskStatus.NOT_STARTED), self.batch.__getitem__)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: cancellation.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Cooperative cancellation of downloads.
+
+A `CancellationToken` is checked by the transfer loop for every chunk, so
+cancelling it, or letting its deadline pass, stops a transfer at the next chunk
+instead of letting it run to completion. Tokens form a tree: a task token is
+cancelled along with the batch token it was derived from.
+"""
+
+import threading
+import time
+from typing import Callable, List
+
+from .interfaces import DownloadCancelledError, DownloadTimeoutError
+
+
+class CancellationToken:
+    """A cancellation flag with an optional wall-clock deadline.
+
+    Attributes:
+        __parent(CancellationToken | None): Token whose cancellation also cancels this one.
+        __deadline(float | None): Monotonic time after which the token counts as cancelled.
+        __event(threading.Event): Set once the token is explicitly cancelled.
+        __callbacks(List[Callable[[], None]]): Called once when the token is explicitly cancelled.
+    """
+
+    def __init__(self, timeout: float | None = None, parent: 'CancellationToken | None' = None) -> None:
+        """Initializes the token.
+
+        Arguments:
+            timeout(float | None): Seconds from now after which the token expires (default: never).
+            parent(CancellationToken | None): Token whose cancellation also cancels this one.
+        """
+
+        now = time.monotonic()
+        deadlines = [now + timeout] if timeout is not None else []
+        parent_remaining = parent.remaining() if parent is not None else None
+        if parent_remaining is not None:
+            # Inherit the deadline of the parent, so `expired` never has to walk the tree.
+            deadlines.append(now + parent_remaining)
+
+        self.__parent = parent
+        self.__deadline = min(deadlines, default=None)
+        self.__event = threading.Event()
+        self.__lock = threading.Lock()
+        self.__callbacks: List[Callable[[], None]] = []
+
+    def child(self, timeout: float | None = None) -> 'CancellationToken':
+        """Returns a token cancelled with this one, or when its own `timeout` expires."""
+
+        return CancellationToken(timeout, parent=self)
+
+    def cancel(self) -> None:
+        """Cancels the token and everything derived from it."""
+
+        with self.__lock:
+            if self.__event.is_set():
+                return
+            self.__event.set()
+            callbacks, self.__callbacks = self.__callbacks, []
+
+        for callback in callbacks:
+            callback()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the token, or one of its ancestors, was cancelled or has expired."""
+
+        return self.cancel_requested or self.expired
+
+    @property
+    def cancel_requested(self) -> bool:
+        """Whether `cancel` was called on the token or one of its ancestors."""
+
+        return self.__event.is_set() or (self.__parent is not None and self.__parent.cancel_requested)
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline of the token, or of one of its ancestors, has passed."""
+
+        return self.__deadline is not None and time.monotonic() >= self.__deadline
+
+    def remaining(self) -> float | None:
+        """Returns the seconds left before the deadline, or None if there is none."""
+
+        if self.__deadline is None:
+            return None
+
+        return max(self.__deadline - time.monotonic(), 0.0)
+
+    def raise_if_cancelled(self) -> None:
+        """Raises if the token was cancelled or has expired.
+
+        Raises:
+            DownloadTimeoutError: If the deadline has passed.
+            DownloadCancelledError: If the token was cancelled.
+        """
+
+        if self.cancel_requested:
+            raise DownloadCancelledError('Download cancelled.')
+        if self.expired:
+            raise DownloadTimeoutError('Download exceeded its time limit.')
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Registers `callback` to be called once, when `cancel` is called on this token.
+
+        Neither deadlines nor the cancellation of an ancestor trigger callbacks; use
+        `remaining` to wait for deadlines. The callback is called right away if the
+        token was already cancelled.
+        """
+
+        with self.__lock:
+            if not self.__event.is_set():
+                self.__callbacks.append(callback)
+                return
+
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        """Unregisters a callback added with `add_callback`, if it was not called yet."""
+
+        with self.__lock:
+            if callback in self.__callbacks:
+                self.__callbacks.remove(callback)
@@ -0,0 +1,445 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: dedup.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Coalescing of duplicate URLs and colliding destinations.
+
+Tasks are planned incrementally, in batch order, as the manager reaches them.
+The URL digest and resolved destination of each task are computed once and kept
+in compact columns, along with an open-addressing index of their distinct
+digests. A Bloom filter over those digests tells new keys from keys possibly
+seen before; only the latter are looked up in the index. Memory therefore grows
+by a few dozen bytes per task plus the number of duplicates, not with Python
+objects per task.
+"""
+
+import hashlib
+import math
+import re
+import threading
+from array import array
+from collections.abc import Hashable
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple, TypeVar
+from urllib.parse import urlsplit, urlunsplit
+
+from .batch import _PathColumn
+from .interfaces import DirectoryLayoutProtocol, DownloadTask
+from .paths import resolve_destination
+
+T = TypeVar('T')
+
+# Size, in bytes, of the URL and path digests.
+_DIGEST_SIZE = 16
+
+# Ports that are implied by the scheme and dropped during normalization.
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# URLs already in normal form: lowercase scheme and host, no port, credentials or fragment, and a path.
+_NORMAL_URL = re.compile(r'[a-z][a-z0-9+.-]*://[a-z0-9._-]+/[^\x00-\x20#]*')
+
+
+def normalize_url(url: str) -> str:
+    """Returns a canonical form of `url` for duplicate detection.
+
+    The scheme and host are lowercased, default ports and fragments are dropped
+    and an empty path becomes '/'. The query string is kept verbatim, since its
+    order may be meaningful to the server.
+
+    Arguments:
+        url(str): The URL to normalize.
+
+    Returns:
+        str: The normalized URL.
+    """
+
+    if _NORMAL_URL.fullmatch(url) and not url.endswith('?'):
+        # The common case, and the same result as below without parsing the URL.
+        return url
+
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        # Malformed URLs are compared verbatim; the download itself reports the error.
+        return url
+
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or '').lower()
+    if ':' in netloc:
+        netloc = f'[{netloc}]'
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f'{netloc}:{port}'
+    if parts.username is not None:
+        credentials = parts.username if parts.password is None else f'{parts.username}:{parts.password}'
+        netloc = f'{credentials}@{netloc}'
+
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+def url_key(url: str) -> bytes:
+    """Returns a compact 16-byte digest of the normalized `url`."""
+
+    return hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=_DIGEST_SIZE).digest()
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over byte strings.
+
+    Attributes:
+        __size(int): Number of bits in the filter.
+        __hashes(int): Number of bit positions set per key.
+        __bits(bytearray): The bit array.
+        __prehashed(bool): Whether keys are digests used as they are.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 1e-4, *, prehashed: bool = False) -> None:
+        """Sizes the filter for `capacity` keys at the given false-positive rate.
+
+        Arguments:
+            capacity(int): Expected number of distinct keys.
+            error_rate(float): Target false-positive probability (default: 1e-4).
+            prehashed(bool): Whether keys are already uniform digests of at least 16 bytes, such as
+                             `url_key` values, whose bits are used without hashing them again
+                             (default: False).
+        """
+
+        if not 0 < error_rate < 1:
+            raise ValueError(f'error_rate must be between 0 and 1, got {error_rate}')
+
+        capacity = max(capacity, 1)
+        self.__size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.__hashes = max(1, round(self.__size / capacity * math.log(2)))
+        self.__bits = bytearray((self.__size + 7) // 8)
+        self.__prehashed = prehashed
+
+    @property
+    def size_in_bytes(self) -> int:
+        """Memory used by the bit array."""
+
+        return len(self.__bits)
+
+    def __positions(self, key: bytes) -> Tuple[int, int]:
+        """Returns the first bit position of `key` and the step between its positions (double hashing)."""
+
+        digest = key if self.__prehashed else hashlib.blake2b(key, digest_size=16).digest()
+        size = self.__size
+        return int.from_bytes(digest[:8], 'little') % size, (int.from_bytes(digest[8:16], 'little') | 1) % size
+
+    def add(self, key: bytes) -> bool:
+        """Adds `key` to the filter.
+
+        Returns:
+            bool: True if the key was possibly present before, False if it was certainly new.
+        """
+
+        present = True
+        bits, size = self.__bits, self.__size
+        position, step = self.__positions(key)
+        for _ in range(self.__hashes):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                present = False
+                bits[position >> 3] |= mask
+            position = (position + step) % size
+
+        return present
+
+    def __contains__(self, key: bytes) -> bool:
+        """Returns True if `key` was possibly added, False if it certainly was not."""
+
+        bits, size = self.__bits, self.__size
+        position, step = self.__positions(key)
+        for _ in range(self.__hashes):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position = (position + step) % size
+
+        return True
+
+
+def _disambiguate(destination: Path, key: bytes) -> Path:
+    """Derives a deterministic alternative filename from the URL digest."""
+
+    return destination.with_name(f'{destination.stem}-{key.hex()[:8]}{destination.suffix}')
+
+
+def _path_key(destination: Path) -> bytes:
+    """Returns a compact digest of a destination path."""
+
+    return hashlib.blake2b(str(destination).encode('utf-8'), digest_size=_DIGEST_SIZE).digest()
+
+
+class _DigestIndex:
+    """Open-addressing hash index of the distinct digests in a digest column.
+
+    Slots hold row numbers, so the index costs a few bytes per distinct digest
+    instead of a dictionary entry and a bytes object.
+
+    Attributes:
+        __column(bytearray): The indexed digest column.
+        __slots(array): Row of each occupied slot, or -1.
+        __count(int): Number of indexed rows.
+    """
+
+    __slots__ = ('__column', '__slots', '__count')
+
+    def __init__(self, column: bytearray) -> None:
+        self.__column = column
+        self.__slots = array('q', [-1]) * 1024
+        self.__count = 0
+
+    def __probe(self, digest: bytes) -> int:
+        """Returns the slot holding `digest`, or the free slot where it belongs."""
+
+        slots, column = self.__slots, self.__column
+        mask = len(slots) - 1
+        slot = int.from_bytes(digest[8:16], 'little') & mask
+        while True:
+            row = slots[slot]
+            if row < 0:
+                return slot
+            offset = row * _DIGEST_SIZE
+            if column[offset : offset + _DIGEST_SIZE] == digest:
+                return slot
+            slot = (slot + 1) & mask
+
+    def find(self, digest: bytes) -> int:
+        """Returns the indexed row holding `digest`, or -1."""
+
+        return self.__slots[self.__probe(digest)]
+
+    def add(self, row: int, digest: bytes) -> None:
+        """Indexes `row` of the column, holding `digest`, which must not be indexed yet."""
+
+        if (self.__count + 1) * 2 > len(self.__slots):
+            rows = [indexed for indexed in self.__slots if indexed >= 0]
+            self.__slots = array('q', [-1]) * (len(self.__slots) * 2)
+            for indexed in rows:
+                self.__slots[self.__probe(self.__digest(indexed))] = indexed
+
+        self.__slots[self.__probe(digest)] = row
+        self.__count += 1
+
+    def __digest(self, row: int) -> bytes:
+        """Returns the digest at `row` of the column."""
+
+        offset = row * _DIGEST_SIZE
+        return bytes(self.__column[offset : offset + _DIGEST_SIZE])
+
+
+# pylint: disable=too-many-instance-attributes
+class TransferPlan:
+    """Coalesced view of a download batch, planned incrementally in batch order.
+
+    Tasks with the same normalized URL share the transfer of their first occurrence.
+    When different URLs map to the same file, the first task keeps the filename and
+    the others get a suffix derived from their URL, so re-running the same manifest
+    always produces the same layout.
+
+    Attributes:
+        leaders(Dict[int, int]): Maps the index of each planned duplicate task to the index of
+                                 an earlier task whose result it shares, by reusing its file
+                                 or copying it to its own destination. Tasks that are not
+                                 listed download on their own.
+        __tasks(Sequence[DownloadTask]): The planned tasks.
+        __layout(DirectoryLayoutProtocol | None): Places files of tasks whose destination is a directory.
+        __url_keys(bytearray): URL digest of every planned task.
+        __path_keys(bytearray): Digest of the resolved destination of every planned task, before renaming.
+        __destinations(_PathColumn): Final destination of every planned task.
+        __url_bloom(BloomFilter): URL digests seen so far.
+        __path_bloom(BloomFilter): Destination digests taken so far, renamed ones included.
+        __url_index(_DigestIndex): First task of each distinct URL digest.
+        __path_index(_DigestIndex): First task of each distinct destination digest, before renaming.
+        __path_owners(Dict[bytes, Tuple[int, bytes]]): Task and URL digest owning each contended destination.
+    """
+
+    def __init__(self, tasks: Sequence[DownloadTask], layout: DirectoryLayoutProtocol | None = None) -> None:
+        """Initializes an empty plan; tasks are planned by `advance`.
+
+        Arguments:
+            tasks(Sequence[DownloadTask]): The download tasks, in submission order.
+            layout(DirectoryLayoutProtocol | None): Places files of tasks whose destination is a
+                                                    directory (default: directly inside it).
+        """
+
+        self.leaders: Dict[int, int] = {}
+        self.__tasks = tasks
+        self.__layout = layout
+        self.__url_keys = bytearray()
+        self.__path_keys = bytearray()
+        self.__destinations = _PathColumn()
+        self.__url_bloom = BloomFilter(len(tasks), prehashed=True)
+        self.__path_bloom = BloomFilter(len(tasks), prehashed=True)
+        self.__url_index = _DigestIndex(self.__url_keys)
+        self.__path_index = _DigestIndex(self.__path_keys)
+        self.__path_owners: Dict[bytes, Tuple[int, bytes]] = {}
+
+    @property
+    def planned(self) -> int:
+        """Number of tasks planned so far, from the start of the batch."""
+
+        return len(self.__destinations)
+
+    def advance(self, stop: int) -> List[Tuple[int, int]]:
+        """Plans the tasks up to, but excluding, index `stop`.
+
+        Arguments:
+            stop(int): Index of the first task left unplanned.
+
+        Returns:
+            List[Tuple[int, int]]: The duplicate tasks just planned, with the index of their leader.
+        """
+
+        followers = []
+        for index in range(self.planned, min(stop, len(self.__tasks))):
+            leader = self.__plan(index)
+            if leader is not None:
+                self.leaders[index] = leader
+                followers.append((index, leader))
+
+        return followers
+
+    def destination(self, index: int) -> Path:
+        """Returns the resolved, collision-free destination of the task at `index`."""
+
+        if index >= self.planned:
+            self.advance(index + 1)
+
+        return self.__destinations[index]
+
+    def __plan(self, index: int) -> int | None:
+        """Plans the next task and returns the index of its leader, if it is a duplicate."""
+
+        task = self.__tasks[index]
+        key = url_key(task.url)
+        destination = resolve_destination(task.url, task.destination_path, self.__layout)
+        path_key = _path_key(destination)
+
+        # A key the filter reports as possibly seen is new after all when the index misses it.
+        leader = self.__url_index.find(key) if self.__url_bloom.add(key) else -1
+        contended = self.__path_bloom.add(path_key)
+        owner = self.__path_index.find(path_key) if contended else -1
+
+        self.__url_keys += key
+        self.__path_keys += path_key
+        if leader < 0:
+            self.__url_index.add(index, key)
+        if owner < 0:
+            self.__path_index.add(index, path_key)
+
+        original = destination
+        if contended and (owner >= 0 or path_key in self.__path_owners):
+            leader, destination = self.__claim(index, key, path_key, destination, leader, owner)
+
+        self.__destinations.append(destination)
+        if destination is not original:
+            # Renamed destinations can collide with the destinations of later tasks too.
+            self.__path_bloom.add(_path_key(destination))
+
+        return leader if leader >= 0 else None
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __claim(
+        self, index: int, key: bytes, path_key: bytes, destination: Path, leader: int, row: int
+    ) -> Tuple[int, Path]:
+        """Resolves a destination already taken: shares the transfer of its owner or picks another name.
+
+        The owner is the task at `row`, unless the destination was taken by a renamed task (`row` is then -1).
+        """
+
+        owner = self.__path_owners.get(path_key)
+        if owner is None:
+            offset = row * _DIGEST_SIZE
+            owner = self.__path_owners[path_key] = (row, bytes(self.__url_keys[offset : offset + _DIGEST_SIZE]))
+
+        salt, original = key, destination
+        while owner[0] != index:
+            if owner[1] == key:
+                # Same URL and same file: share the transfer of the task that owns the file.
+                return owner[0], destination
+            destination = _disambiguate(original, salt)
+            owner = self.__path_owners.setdefault(_path_key(destination), (index, key))
+            salt = hashlib.blake2b(salt, digest_size=_DIGEST_SIZE).digest()
+
+        return leader, destination
+
+
+def plan_transfers(tasks: Sequence[DownloadTask], layout: DirectoryLayoutProtocol | None = None) -> TransferPlan:
+    """Groups duplicate URLs and resolves destination collisions in a whole batch.
+
+    Arguments:
+        tasks(Sequence[DownloadTask]): The download tasks, in submission order.
+        layout(DirectoryLayoutProtocol | None): Places files of tasks whose destination is a
+                                                directory (default: directly inside it).
+
+    Returns:
+        TransferPlan: The duplicate-to-leader mapping and the resolved destinations of every task.
+    """
+
+    plan = TransferPlan(tasks, layout)
+    plan.advance(len(tasks))
+    return plan
+
+
+# pylint: disable=too-few-public-methods
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its outcome.
+
+    Attributes:
+        __lock(threading.Lock): Guards the table of in-flight calls.
+        __calls(Dict[Hashable, Future]): The in-flight calls, by key.
+    """
+
+    def __init__(self) -> None:
+        """Initializes an empty table of in-flight calls."""
+
+        self.__lock = threading.Lock()
+        self.__calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, function: Callable[..., T], *args, **kwargs) -> T:
+        """Calls `function(*args, **kwargs)`, or waits for the in-flight call with the same key.
+
+        Arguments:
+            key(Hashable): Identifies calls that can share their outcome.
+            function(Callable[..., T]): The function to call.
+
+        Returns:
+            T: The result of the call, which is shared with concurrent callers.
+        Raises:
+            Exception: Whatever the shared call raised.
+        """
+
+        with self.__lock:
+            future = self.__calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self.__calls[key] = Future()
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+
+        future.set_result(result)
+        return result
@@ -16,63 +16,402 @@
 
 """Module for downloading files concurrently using multiple threads."""
 
-import tempfile
+import os
+from contextlib import suppress
 from pathlib import Path
+from typing import BinaryIO, Callable, ContextManager, Sequence, get_args
 
 import httpx
 from loguru import logger
 
-from .interfaces import FileOperationError, NetworkDownloadError
+from .interfaces import (
+    CancellationTokenProtocol,
+    DirectoryLayoutProtocol,
+    DownloadCancelledError,
+    DownloadError,
+    FileOperationError,
+    NetworkDownloadError,
+    SinkWriterProtocol,
+    StorageSinkProtocol,
+    TransferProgressProtocol,
+)
+from .locking import LockMode, hold_destination
+from .memory import DEFAULT_SPILL_THRESHOLD, MemoryBudget, SpooledBuffer
+from .mirrors import DEFAULT_HEDGE_DELAY, DEFAULT_SEGMENTS, MirrorDownload, MirrorMode
+from .network import HttpSession
+from .paths import ensure_directory, filename_from_url, resolve_destination
+from .pipeline import PipelinedFile, WriterPool
+from .profiling import active_timer, traced_stream
+from .streaming import (
+    CompressionMode,
+    accept_encoding,
+    content_length,
+    decodes,
+    existing_size,
+    forget_decoded,
+    is_complete,
+    iter_body,
+    open_for_writing,
+    record_decoded,
+    request_timeout,
+)
 
 
-# pylint: disable=too-few-public-methods
+# pylint: disable=too-few-public-methods, too-many-instance-attributes
 class DownloadService:
-    """Downloads a single file from a URL using HTTP."""
+    """Downloads a single file from a URL using HTTP.
 
-    def download_file(self, url: str, file_path: Path | None = None) -> Path:
+    Attributes:
+        __layout(DirectoryLayoutProtocol | None): Places files saved into a directory.
+        __mirror_mode(MirrorMode): How files with mirrors are downloaded.
+        __hedge_delay(float): Seconds without progress before a hedged download tries another mirror.
+        __segments(int): Maximum number of byte ranges of a segmented download.
+        __writer_pool(WriterPool | None): Writes the files on dedicated threads, if set.
+        __compression(CompressionMode): How compressed responses are stored.
+        __headers(Dict[str, str]): Headers sent with every download request.
+        __lock_mode(LockMode | None): How files locked by another download are handled, if locking.
+        __session(HttpSession | None): The client shared by every request, if set.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        layout: DirectoryLayoutProtocol | None = None,
+        *,
+        mirror_mode: MirrorMode = 'hedged',
+        hedge_delay: float = DEFAULT_HEDGE_DELAY,
+        segments: int = DEFAULT_SEGMENTS,
+        writer_pool: WriterPool | None = None,
+        compression: CompressionMode = 'decode',
+        lock_mode: LockMode | None = None,
+        session: HttpSession | None = None,
+    ) -> None:
+        """Initializes the DownloadService.
+
+        Arguments:
+            layout(DirectoryLayoutProtocol | None): Places files when `download_file` receives
+                                                    a directory, e.g. `HashPrefixLayout()` to
+                                                    shard huge output trees (default: flat).
+            mirror_mode(MirrorMode): How files with mirrors are downloaded: 'hedged' races
+                                     another mirror when a request stalls, 'failover' tries
+                                     the mirrors in turn and 'segmented' fetches byte ranges
+                                     from several mirrors in parallel (default: 'hedged').
+            hedge_delay(float): Seconds without progress before a hedged download tries
+                                another mirror (default: 2.0).
+            segments(int): Maximum number of byte ranges of a segmented download (default: 4).
+            writer_pool(WriterPool | None): Pipelines disk writes through dedicated writer threads,
+                                            so slow storage does not stall the network threads
+                                            (default: write from the downloading thread).
+            compression(CompressionMode): Offers gzip, deflate and, when their codecs are installed,
+                                          br and zstd to the server: 'decode' stores the decoded body,
+                                          'raw' stores the body as sent (e.g. gzip data) and 'off'
+                                          asks for uncompressed bodies; as Content-Length cannot tell
+                                          whether a decoded file is complete, its encoded size, ETag
+                                          and decoded size are kept in a `<file>.encoding` file next
+                                          to it (default: 'decode').
+            lock_mode(LockMode | None): Coordinates processes sharing an output directory through a
+                                        lock per destination file, written through a `.part` file
+                                        renamed into place: 'wait' for a file another process is
+                                        downloading, then reuse it if complete, or 'skip' it with
+                                        `DestinationLockedError` (default: no locking).
+            session(HttpSession | None): Shares one client, with kept-alive connections and cached DNS
+                                         resolutions, between all requests and size probes, and lets
+                                         `DownloadManager` open connections ahead of the transfers;
+                                         mirror requests keep connections of their own, so they can
+                                         be aborted alone, but share its DNS cache (default: a new
+                                         client per request).
+
+        Raises:
+            ValueError: If `mirror_mode`, `compression` or `lock_mode` is unknown.
+        """
+
+        if mirror_mode not in get_args(MirrorMode):
+            raise ValueError(
+                f"Invalid mirror mode: {mirror_mode!r}. Expected one of {', '.join(get_args(MirrorMode))}."
+            )
+        if compression not in get_args(CompressionMode):
+            raise ValueError(
+                f"Invalid compression mode: {compression!r}. Expected one of {', '.join(get_args(CompressionMode))}."
+            )
+        if lock_mode is not None and lock_mode not in get_args(LockMode):
+            raise ValueError(f"Invalid lock mode: {lock_mode!r}. Expected one of {', '.join(get_args(LockMode))}.")
+
+        self.__layout = layout
+        self.__mirror_mode = mirror_mode
+        self.__hedge_delay = hedge_delay
+        self.__segments = segments
+        self.__writer_pool = writer_pool
+        self.__compression = compression
+        self.__lock_mode = lock_mode
+        self.__session = session
+        self.__headers = {'Accept-Encoding': accept_encoding(compression)}
+
+    @property
+    def layout(self) -> DirectoryLayoutProtocol | None:
+        """Places files saved into a directory, if set; `DownloadManager` adopts it when it has no layout."""
+
+        return self.__layout
+
+    def download_file(
+        self,
+        url: str,
+        file_path: Path | None = None,
+        *,
+        progress: TransferProgressProtocol | None = None,
+        mirrors: Sequence[str] = (),
+        token: CancellationTokenProtocol | None = None,
+    ) -> Path:
         """Download a file from a URL and save it to a local file path.
 
+        The response body is streamed to disk chunk by chunk, so large files are
+        never held in memory.
+
         Arguments:
             url(str): The URL of the file to download.
             file_path (Path | None): The local file path or directory. If None, uses system temp dir.
+            progress(TransferProgressProtocol | None): Optional byte counter updated for every chunk.
+            mirrors(Sequence[str]): Alternative URLs serving the same file, used according to the
+                                    mirror mode of the service.
+            token(CancellationTokenProtocol | None): Optional token checked for every chunk; its
+                                                     deadline also bounds the HTTP timeout.
 
         Returns:
             Path: The local file path where the downloaded file was saved.
         Raises:
             NetworkDownloadError: If there was an error during the network request.
             FileOperationError: If there was an error during file I/O operations.
+            DownloadCancelledError: If the token was cancelled, or expired (`DownloadTimeoutError`).
+            DestinationLockedError: If another download holds the file and the lock mode is 'skip'.
         """
 
         # Determine the correct file path.
-        if file_path is None:
-            file_path = Path(tempfile.gettempdir())
+        file_path = resolve_destination(url, file_path, self.__layout)
+
+        if self.__lock_mode is None:
+            return self.__download_to(url, file_path, progress, mirrors, token)
+
+        try:
+            with hold_destination(file_path, self.__lock_mode, token) as completed:
+                if completed:
+                    logger.info(f'File was completed by another download: {file_path.name}')
+                    return file_path
+                return self.__download_to(url, file_path, progress, mirrors, token)
+        except (IOError, OSError) as error:
+            raise FileOperationError(f'Locking {file_path} failed: {error}') from error
+
+    # pylint: disable=too-many-arguments
+    def __download_to(
+        self,
+        url: str,
+        file_path: Path,
+        progress: TransferProgressProtocol | None,
+        mirrors: Sequence[str],
+        token: CancellationTokenProtocol | None,
+    ) -> Path:
+        """Downloads `url`, or its mirrors, to `file_path`."""
+
+        if mirrors:
+            transfer = MirrorDownload(
+                [url, *mirrors],
+                file_path,
+                progress=progress,
+                token=token,
+                hedge_delay=self.__hedge_delay,
+                segments=self.__segments,
+                headers=self.__headers,
+                compression=self.__compression,
+                session=self.__session,
+                writer_pool=self.__writer_pool,
+            )
+            return transfer.run(self.__mirror_mode)
 
-        if file_path.is_dir():
-            filename = url.split('/')[-1].split('?')[0] or 'downloaded_file'
-            file_path = file_path / filename
+        if token is not None:
+            token.raise_if_cancelled()
 
         try:
-            response = httpx.get(url, timeout=30)
-            response.raise_for_status()  # Raise an exception for HTTP error status (4xx or 5xx)
-        except httpx.RequestError as error:
+            with self.__stream(url, token) as response:
+                response.raise_for_status()  # Raise an exception for HTTP error status (4xx or 5xx)
+                return self.__save_response(response, file_path, progress, token)
+        except httpx.HTTPError as error:
+            if token is not None:
+                # A timeout shortened by the deadline means the deadline passed.
+                token.raise_if_cancelled()
             # Wrap the specific httpx exception in our custom, more general network error.
             raise NetworkDownloadError(f'Network request for {url} failed: {error}') from error
 
+    # pylint: disable=too-many-arguments
+    def download_buffer(
+        self,
+        url: str,
+        *,
+        progress: TransferProgressProtocol | None = None,
+        mirrors: Sequence[str] = (),
+        token: CancellationTokenProtocol | None = None,
+        budget: MemoryBudget | None = None,
+        spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+    ) -> SpooledBuffer:
+        """Download a file from a URL into memory, skipping the round trip through the file system.
+
+        The body only spills to an anonymous temporary file when it grows past
+        `spill_threshold`, or when `budget` is exhausted. Mirrors are tried in turn,
+        whatever the mirror mode of the service.
+
+        Arguments:
+            url(str): The URL of the file to download.
+            progress(TransferProgressProtocol | None): Optional byte counter updated for every chunk.
+            mirrors(Sequence[str]): Alternative URLs serving the same file, tried if `url` fails.
+            token(CancellationTokenProtocol | None): Optional token checked for every chunk; its
+                                                     deadline also bounds the HTTP timeout.
+            budget(MemoryBudget | None): Shared cap on the bytes kept in memory (default: none).
+            spill_threshold(int): Size above which the body spills to disk (default: 8 MiB).
+
+        Returns:
+            SpooledBuffer: The body; close it to return its memory to the budget.
+        Raises:
+            NetworkDownloadError: If the network request failed for the URL and every mirror.
+            FileOperationError: If spilling to disk failed.
+            DownloadCancelledError: If the token was cancelled, or expired (`DownloadTimeoutError`).
+        """
+
+        buffer = self.__fetch((url, *mirrors), lambda: SpooledBuffer(budget, spill_threshold), progress, token)
+        logger.info(f'Download completed in memory: {url}')
+
+        return buffer
+
+    # pylint: disable=too-many-arguments
+    def download_to_sink(
+        self,
+        url: str,
+        sink: StorageSinkProtocol,
+        key: str | None = None,
+        *,
+        progress: TransferProgressProtocol | None = None,
+        mirrors: Sequence[str] = (),
+        token: CancellationTokenProtocol | None = None,
+    ) -> str:
+        """Download a file from a URL, streaming it straight into a storage sink.
+
+        Each chunk is handed to the sink as it arrives, so the file is never staged on
+        the local disk; how much the sink buffers is up to the sink. Mirrors are tried
+        in turn, whatever the mirror mode of the service.
+
+        Arguments:
+            url(str): The URL of the file to download.
+            sink(StorageSinkProtocol): Stores the file, e.g. `LocalSink`, `MemorySink` or `S3Sink`.
+            key(str | None): The key of the object in the sink (default: the filename in the URL).
+            progress(TransferProgressProtocol | None): Optional byte counter updated for every chunk.
+            mirrors(Sequence[str]): Alternative URLs serving the same file, tried if `url` fails.
+            token(CancellationTokenProtocol | None): Optional token checked for every chunk; its
+                                                     deadline also bounds the HTTP timeout.
+
+        Returns:
+            str: The key of the stored object.
+        Raises:
+            NetworkDownloadError: If the network request failed for the URL and every mirror.
+            FileOperationError: If the sink failed to store the object.
+            DownloadCancelledError: If the token was cancelled, or expired (`DownloadTimeoutError`).
+        """
+
+        key = key or filename_from_url(url)
+        writer = self.__fetch((url, *mirrors), lambda: sink.open(key), progress, token)
         try:
-            if file_path.exists():
-                file_size_local = file_path.stat().st_size
-                file_size_remote = int(response.headers.get('content-length', 0))
+            writer.close()
+        except BaseException as error:
+            # A failed close may leave a partial object behind, e.g. an open S3 multipart upload.
+            with suppress(Exception):
+                writer.abort()
+            if isinstance(error, (IOError, OSError)):
+                raise FileOperationError(f'Storing {key} failed: {error}') from error
+            raise
 
-                if file_size_remote > 0 and file_size_remote == file_size_local:
-                    logger.info(f'File already exists and is complete: {file_path.name}')
-                    return file_path
+        logger.info(f'Download completed: {key}')
+
+        return key
 
-            # Ensure parent directory exists
-            file_path.parent.mkdir(parents=True, exist_ok=True)
+    def prewarm(self, url: str) -> None:
+        """Opens the connection to the host of `url` ahead of its download; only sessions keep it.
 
-            with open(file_path, 'wb') as file:
-                for chunk in response.iter_bytes(chunk_size=8192):
-                    file.write(chunk)
+        See `HttpSession.prewarm` for how the connection is opened.
+
+        Arguments:
+            url(str): The URL of a file about to be downloaded.
+        """
+
+        if self.__session is not None:
+            self.__session.prewarm(url)
+
+    def probe_size(self, url: str, *, token: CancellationTokenProtocol | None = None) -> int | None:
+        """Returns the size of the file at `url` from a HEAD request, without downloading it.
+
+        Arguments:
+            url(str): The URL of the file.
+            token(CancellationTokenProtocol | None): Optional token; once cancelled no request is
+                                                     sent, and its deadline bounds the HTTP timeout.
+
+        Returns:
+            int | None: The announced size in bytes, or None if unknown, cancelled or the request failed.
+        """
+
+        try:
+            if token is not None:
+                token.raise_if_cancelled()
+        except DownloadCancelledError:
+            return None
+
+        timeout = request_timeout(token)
+        try:
+            if self.__session is not None:
+                response = self.__session.head(url, timeout=timeout)
+            else:
+                response = httpx.head(url, timeout=timeout, follow_redirects=True)
+            response.raise_for_status()
+        except httpx.HTTPError as error:
+            logger.debug(f'Size probe for {url} failed: {error}')
+            return None
+
+        return content_length(response) or None
+
+    def __save_response(
+        self,
+        response: httpx.Response,
+        file_path: Path,
+        progress: TransferProgressProtocol | None,
+        token: CancellationTokenProtocol | None,
+    ) -> Path:
+        """Writes the body of a streamed response to `file_path`."""
+
+        try:
+            if is_complete(file_path, existing_size(file_path), response, self.__compression):
+                logger.info(f'File already exists and is complete: {file_path.name}')
+                return file_path
+
+            # Ensure parent directory exists (at most one mkdir per directory and process).
+            ensure_directory(file_path.parent)
+
+            # A decoded body records its size once stored, as Content-Length cannot vouch for it.
+            decoding = decodes(response, self.__compression)
+            if decoding:
+                forget_decoded(file_path)
+
+            if progress is not None:
+                progress.expect(content_length(response))
+
+            # Locked files are written aside, so other processes never see them truncated.
+            part_path = file_path.with_name(f'{file_path.name}.part') if self.__lock_mode is not None else None
+            write_path = part_path or file_path
+            try:
+                with self.__open(write_path) as file:
+                    self.__copy_body(response, file, progress, token)
+            except BaseException as error:
+                # Do not leave a truncated file behind.
+                if part_path is not None or isinstance(error, DownloadCancelledError):
+                    write_path.unlink(missing_ok=True)
+                raise
+
+            if part_path is not None:
+                os.replace(part_path, file_path)
+            if decoding:
+                record_decoded(file_path, response, file_path.stat().st_size)
         except (IOError, OSError) as error:
             # Wrap file system exceptions in our custom file operation error.
             raise FileOperationError(f'File operation for {file_path} failed: {error}') from error
@@ -80,3 +419,103 @@ class DownloadService:
         logger.info(f'Download completed: {file_path.name}')
 
         return file_path
+
+    def __copy_body(
+        self,
+        response: httpx.Response,
+        target: BinaryIO | SinkWriterProtocol,
+        progress: TransferProgressProtocol | None,
+        token: CancellationTokenProtocol | None,
+    ) -> None:
+        """Writes the body of a streamed response to `target`, chunk by chunk."""
+
+        # Decoded bodies advance the progress by the bytes received themselves.
+        advance = progress.advance if progress is not None and not decodes(response, self.__compression) else None
+        check = token.raise_if_cancelled if token is not None else None
+        chunks = iter_body(response, self.__compression, progress)
+        write = target.write
+
+        timer = active_timer()
+        if timer is not None:
+            chunks = timer.iterate('read', chunks)
+            write = timer.wrap('write', write)
+            if advance is not None:
+                advance = timer.wrap('progress', advance)
+
+        try:
+            for chunk in chunks:
+                if check is not None:
+                    check()
+                write(chunk)
+                if advance is not None:
+                    advance(len(chunk))
+        finally:
+            if progress is not None:
+                progress.flush()
+
+    def __stream(self, url: str, token: CancellationTokenProtocol | None) -> ContextManager[httpx.Response]:
+        """Starts a streamed GET request, timing its connection steps if the transfer is profiled."""
+
+        timer = active_timer()
+        if self.__session is not None:
+            return self.__session.stream(
+                url,
+                headers=self.__headers,
+                timeout=request_timeout(token),
+                extensions={'trace': timer.trace} if timer is not None else None,
+            )
+        if timer is not None:
+            return traced_stream(url, headers=self.__headers, timeout=request_timeout(token), timer=timer)
+
+        return httpx.stream('GET', url, headers=self.__headers, timeout=request_timeout(token))
+
+    def __fetch(
+        self,
+        urls: Sequence[str],
+        open_target: Callable[[], SinkWriterProtocol],
+        progress: TransferProgressProtocol | None,
+        token: CancellationTokenProtocol | None,
+    ) -> SinkWriterProtocol:
+        """Streams the body of the first URL that succeeds into a target from `open_target`.
+
+        A target is opened for each attempt and aborted if the attempt fails. Unlike
+        `download_file`, HTTP error statuses also move on to the next URL.
+        """
+
+        error: DownloadError | None = None
+        for url in urls:
+            if token is not None:
+                token.raise_if_cancelled()
+
+            target = open_target()
+            try:
+                with self.__stream(url, token) as response:
+                    response.raise_for_status()  # Raise an exception for HTTP error status (4xx or 5xx)
+                    if progress is not None:
+                        progress.expect(content_length(response))
+                    self.__copy_body(response, target, progress, token)
+            except httpx.HTTPError as http_error:
+                target.abort()
+                if token is not None:
+                    token.raise_if_cancelled()
+                error = NetworkDownloadError(f'Network request for {url} failed: {http_error}')
+                logger.warning(str(error))
+                continue
+            except (IOError, OSError) as os_error:
+                target.abort()
+                raise FileOperationError(f'Writing the body of {url} failed: {os_error}') from os_error
+            except BaseException:
+                target.abort()
+                raise
+
+            return target
+
+        raise error
+
+    def __open(self, file_path: Path) -> BinaryIO | PipelinedFile:
+        """Opens `file_path` for writing, through the writer pool if there is one."""
+
+        if self.__writer_pool is not None:
+            return self.__writer_pool.open(file_path)
+
+        return open_for_writing(file_path)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: events.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Per-task events of a download batch.
+
+`BatchEvents` times each transfer, counts its bytes and turns every settled
+task into a `TaskEvent` handed to the caller as soon as it happens, so work on
+a file can start while the rest of the batch is still downloading.
+`EventStream` runs a batch on a background thread and exposes those events as
+an iterator.
+"""
+
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Sequence, Tuple
+
+from .cancellation import CancellationToken
+from .interfaces import (
+    DownloadError,
+    DownloadTask,
+    ProgressReporterProtocol,
+    TaskEvent,
+    TaskMetrics,
+    TransferProgressProtocol,
+)
+from .progress import TransferProgress
+
+# Receives the index and the task of a transfer that starts.
+StartCallback = Callable[[int, DownloadTask], None]
+
+# Receives the index, the task, the bytes received so far and the expected size (0 if unknown).
+ProgressCallback = Callable[[int, DownloadTask, int, int], None]
+
+# Receives the event of a settled task.
+EventCallback = Callable[[TaskEvent], None]
+
+# Metrics of tasks settled without a transfer of their own (duplicates sharing another one).
+_NO_METRICS = TaskMetrics(bytes_downloaded=0, duration=0.0)
+
+# Marks the end of an event stream.
+_END = object()
+
+
+class _TaskCounter:
+    """Counts the bytes of one transfer, forwarding them to the batch reporter and progress callback.
+
+    It stands in for the batch reporter behind a `TransferProgress`, so it only sees
+    the already batched updates.
+    """
+
+    __slots__ = ('bytes_done', 'bytes_total', 'bytes_decoded', '__index', '__task', '__reporter', '__on_progress')
+
+    def __init__(
+        self,
+        index: int,
+        task: DownloadTask,
+        reporter: ProgressReporterProtocol | None,
+        on_progress: ProgressCallback | None,
+    ) -> None:
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.bytes_decoded = 0
+        self.__index = index
+        self.__task = task
+        self.__reporter = reporter
+        self.__on_progress = on_progress
+
+    def add_total_bytes(self, count: int) -> None:
+        """Grows the expected size of the transfer."""
+
+        self.bytes_total += count
+        if self.__reporter is not None:
+            self.__reporter.add_total_bytes(count)
+
+    def add_decoded_bytes(self, count: int) -> None:
+        """Records that the compressed body of the transfer decoded to `count` bytes."""
+
+        self.bytes_decoded += count
+
+    def advance_bytes(self, count: int) -> None:
+        """Records that `count` more bytes were received."""
+
+        self.bytes_done += count
+        if self.__reporter is not None:
+            self.__reporter.advance_bytes(count)
+        if self.__on_progress is not None:
+            self.__on_progress(self.__index, self.__task, self.bytes_done, self.bytes_total)
+
+
+# pylint: disable=too-many-instance-attributes
+class BatchEvents:
+    """Dispatches the events of the tasks of a batch to the caller's callbacks.
+
+    Without callbacks, no per-task counter is created and transfers only report
+    to the batch reporter, if any.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        tasks: Sequence[DownloadTask],
+        reporter: ProgressReporterProtocol | None = None,
+        *,
+        on_start: StartCallback | None = None,
+        on_progress: ProgressCallback | None = None,
+        on_complete: EventCallback | None = None,
+        on_error: EventCallback | None = None,
+    ) -> None:
+        """Initializes the dispatcher.
+
+        Arguments:
+            tasks(Sequence[DownloadTask]): The tasks of the batch.
+            reporter(ProgressReporterProtocol | None): The batch progress reporter, if any.
+            on_start(StartCallback | None): Called from the worker thread when a transfer starts.
+            on_progress(ProgressCallback | None): Called from the worker thread as bytes arrive,
+                                                  about once per megabyte.
+            on_complete(EventCallback | None): Called with the event of each successful task.
+            on_error(EventCallback | None): Called with the event of each failed task.
+        """
+
+        self.__tasks = tasks
+        self.__reporter = reporter
+        self.__on_start = on_start
+        self.__on_progress = on_progress
+        self.__on_complete = on_complete
+        self.__on_error = on_error
+        self.__tracking = any(callback is not None for callback in (on_start, on_progress, on_complete, on_error))
+        self.__transfers: Dict[int, Tuple[_TaskCounter, float]] = {}
+
+    def start(self, index: int) -> TransferProgressProtocol | None:
+        """Records that the transfer of task `index` starts and returns its byte counter, if any."""
+
+        if not self.__tracking:
+            return TransferProgress(self.__reporter) if self.__reporter is not None else None
+
+        task = self.__tasks[index]
+        counter = _TaskCounter(index, task, self.__reporter, self.__on_progress)
+        self.__transfers[index] = (counter, time.perf_counter())
+        if self.__on_start is not None:
+            self.__on_start(index, task)
+
+        return TransferProgress(counter)
+
+    def settle(self, index: int, path: Path | None, error: DownloadError | None) -> None:
+        """Emits the event of a task that succeeded (with its `path`) or failed (with its `error`)."""
+
+        if not self.__tracking:
+            return
+
+        transfer = self.__transfers.pop(index, None)
+        callback = self.__on_complete if error is None else self.__on_error
+        if callback is None:
+            return
+
+        metrics = _NO_METRICS
+        if transfer is not None:
+            counter, started = transfer
+            metrics = TaskMetrics(
+                bytes_downloaded=counter.bytes_done,
+                duration=time.perf_counter() - started,
+                bytes_decoded=counter.bytes_decoded,
+            )
+
+        callback(TaskEvent(index=index, task=self.__tasks[index], path=path, error=error, metrics=metrics))
+
+
+class EventStream:
+    """Runs a batch on a background thread and hands its events over through a bounded queue.
+
+    A consumer that falls behind blocks the batch when the queue fills up, so
+    events never pile up in memory. Closing the stream cancels the batch.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[EventCallback, CancellationToken], None],
+        token: CancellationToken | None = None,
+        depth: int = 64,
+    ) -> None:
+        """Starts the batch.
+
+        Arguments:
+            run(Callable[[EventCallback, CancellationToken], None]): Runs the batch, emitting each
+                                                                     event to its first argument and
+                                                                     stopping when its token is cancelled.
+            token(CancellationToken | None): The caller's token; cancelling it stops the batch.
+            depth(int): Number of events that may wait for the consumer (default: 64).
+        """
+
+        self.__caller_token = token
+        self.__token = CancellationToken(parent=token)
+        if token is not None:
+            token.add_callback(self.__token.cancel)
+
+        self.__events: queue.Queue = queue.Queue(max(depth, 1))
+        self.__error: BaseException | None = None
+        self.__thread = threading.Thread(target=self.__produce, args=(run,), name='grabharvester-batch', daemon=True)
+        self.__thread.start()
+
+    def get(self) -> TaskEvent | None:
+        """Returns the next event, waiting for it, or None once the batch is over.
+
+        Raises:
+            Exception: Whatever the batch raised, once its events are consumed.
+        """
+
+        event = self.__events.get()
+        if event is not _END:
+            return event
+
+        # Leave the marker for any later call.
+        self.__events.put(_END)
+        if self.__error is not None:
+            raise self.__error
+
+        return None
+
+    def close(self) -> None:
+        """Cancels the batch, if still running, and waits for it to stop."""
+
+        self.__token.cancel()
+        while self.__thread.is_alive():
+            try:
+                # Unblock a batch waiting on a full queue.
+                self.__events.get(timeout=0.05)
+            except queue.Empty:
+                pass
+
+        self.__thread.join()
+        try:
+            self.__events.put_nowait(_END)
+        except queue.Full:
+            pass
+
+        if self.__caller_token is not None:
+            self.__caller_token.remove_callback(self.__token.cancel)
+
+    def __produce(self, run: Callable[[EventCallback, CancellationToken], None]) -> None:
+        """Runs the batch on the background thread."""
+
+        try:
+            run(self.__events.put, self.__token)
+        except BaseException as error:  # pylint: disable=broad-exception-caught
+            self.__error = error
+        finally:
+            self.__events.put(_END)
@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: execution.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Execution of a single download batch on a thread pool.
+
+`BatchExecution` plans, submits and settles the tasks of one batch, and
+`look_ahead` opens the connections of upcoming tasks while earlier ones run.
+"""
+
+import shutil
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Sequence, Set, Tuple, Type
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+from .cancellation import CancellationToken
+from .dedup import TransferPlan
+from .interfaces import (
+    DirectoryLayoutProtocol,
+    DownloadError,
+    DownloadTask,
+    FileOperationError,
+    ProgressReporterProtocol,
+)
+from .paths import ensure_directory
+
+
+def _copy_download(source: Path, destination: Path) -> Path:
+    """Copies a finished download to the destination of a duplicate task."""
+
+    try:
+        ensure_directory(destination.parent)
+        shutil.copyfile(source, destination)
+    except OSError as error:
+        raise FileOperationError(f'File operation for {destination} failed: {error}') from error
+
+    return destination
+
+
+# Number of distinct hosts remembered by the look-ahead stage before it starts over.
+_MAX_WARMED_HOSTS = 65536
+
+
+def look_ahead(
+    order: Iterable[int],
+    tasks: Sequence[DownloadTask],
+    warm: Callable[[str], object],
+    depth: int,
+    token: CancellationToken,
+) -> Iterator[int]:
+    """Yields `order`, calling `warm` with the URL of each task `depth` tasks before yielding it.
+
+    Each host is warmed once, by its first task. Once `token` is cancelled, as when
+    a stopped batch drains the order, no host is warmed any more.
+    """
+
+    warmed: Set[str] = set()
+    ahead: Deque[int] = deque()
+    for index in order:
+        url = tasks[index].url
+        try:
+            host = urlsplit(url).netloc
+        except ValueError:
+            host = ''
+        if host and host not in warmed and not token.cancelled:
+            if len(warmed) >= _MAX_WARMED_HOSTS:
+                warmed.clear()
+            warmed.add(host)
+            warm(url)
+
+        ahead.append(index)
+        if len(ahead) > depth:
+            yield ahead.popleft()
+
+    yield from ahead
+
+
+# Number of tasks planned between two checks of the batch token.
+_PLAN_CHUNK = 1024
+
+# Outcomes of settled tasks, kept for the duplicates planned after their leader settled.
+_PENDING, _SUCCEEDED, _FAILED, _SKIPPED = 0, 1, 2, 3
+
+
+class _NotStarted(Exception):
+    """Raised by a queued transfer that a worker picks up after its batch was stopped."""
+
+
+# pylint: disable=too-few-public-methods, too-many-instance-attributes
+class BatchExecution:
+    """State of a single batch execution.
+
+    Tasks are submitted through a bounded window rather than all at once, so
+    huge batches never hold more than a few futures per worker. For the same
+    reason, stopping a batch only has a window of queued futures to cancel.
+    Tasks are planned as the window reaches them, so the first transfers start
+    right away and a stopped batch never plans the tasks it did not reach.
+
+    Attributes:
+        tasks(Sequence[DownloadTask]): The tasks of the batch.
+        plan(TransferPlan): Resolved destinations and duplicate-to-leader mapping.
+    """
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(
+        self,
+        tasks: Sequence[DownloadTask],
+        layout: DirectoryLayoutProtocol | None,
+        executor: Executor,
+        window: int,
+        reporter: ProgressReporterProtocol | None,
+        on_success: Callable[[int, Path], None],
+        on_failure: Callable[[int, DownloadError], None],
+        on_skip: Callable[[int], None],
+    ) -> None:
+        """Prepares the batch.
+
+        Arguments:
+            tasks(Sequence[DownloadTask]): The tasks of the batch.
+            layout(DirectoryLayoutProtocol | None): Places files of tasks whose destination is a directory.
+            executor(Executor): Runs the transfers and the copies for duplicate tasks.
+            window(int): Maximum number of submitted, unfinished futures.
+            reporter(ProgressReporterProtocol | None): Notified whenever a task is settled.
+            on_success(Callable[[int, Path], None]): Receives the index and path of each successful task.
+            on_failure(Callable[[int, DownloadError], None]): Receives the index and error of each failed task.
+            on_skip(Callable[[int], None]): Receives the index of each task that never started.
+        """
+
+        self.tasks = tasks
+        self.plan = TransferPlan(tasks, layout)
+        self.__executor = executor
+        self.__window = max(window, 1)
+        self.__reporter = reporter
+        self.__on_success = on_success
+        self.__on_failure = on_failure
+        self.__on_skip = on_skip
+        self.skipped = 0
+        self.__pending: Dict[Future[Path], int] = {}
+        self.__followers: Dict[int, List[int]] = {}
+        # One outcome code per task; errors and unplanned paths only for the tasks that have them.
+        self.__outcomes = array('b', bytes(len(tasks)))
+        self.__errors: Dict[int, Tuple[Type[DownloadError], str]] = {}
+        self.__paths: Dict[int, Path] = {}
+
+    def run(self, download: Callable[[int, Path], Path], order: Iterable[int], token: CancellationToken) -> None:
+        """Submits every leading task to `download`, in `order`, and settles all tasks as they finish.
+
+        `download` receives the index and destination of the task.
+
+        Once `token` is cancelled or expires, or on Ctrl-C, queued transfers are cancelled
+        right away and reported to `on_skip` along with the tasks never submitted. Running
+        transfers stop at their next chunk and are settled as failures.
+        """
+
+        order = iter(order)
+        wake: Future[None] = Future()
+        token.add_callback(lambda: wake.set_result(None))
+        stopped = False
+
+        self.__fill(download, order, token)
+        while self.__pending or not stopped:
+            if not stopped and token.cancelled:
+                stopped = True
+                self.__stop(order)
+                continue
+            if not self.__pending:
+                break
+
+            waiting = list(self.__pending) if stopped else [*self.__pending, wake]
+            try:
+                done, _ = wait(waiting, timeout=None if stopped else token.remaining(), return_when=FIRST_COMPLETED)
+            except KeyboardInterrupt:
+                logger.warning('Interrupted: cancelling the remaining download tasks.')
+                token.cancel()
+                continue
+
+            for future in done:
+                if future is wake or future not in self.__pending:
+                    continue
+                index = self.__pending.pop(future)
+                try:
+                    self.__settle(index, future.result(), None)
+                except _NotStarted:
+                    self.__skip(index)
+                except DownloadError as error:
+                    self.__settle(index, None, error)
+
+            if not stopped:
+                self.__fill(download, order, token)
+
+        if self.plan.leaders:
+            logger.info(f'Coalesced {len(self.plan.leaders)} duplicate download tasks.')
+        if self.skipped:
+            logger.warning(f'Batch stopped: {self.skipped} download tasks were not started.')
+
+    def __stop(self, order: Iterator[int]) -> None:
+        """Cancels the queued transfers and skips them, along with the tasks never submitted."""
+
+        for future, index in list(self.__pending.items()):
+            if future.cancel():
+                del self.__pending[future]
+                self.__skip(index)
+
+        # Planned duplicates are settled or skipped along with their leader; the rest is not planned at all.
+        planned = self.plan.planned
+        for index in order:
+            if index >= planned or index not in self.plan.leaders:
+                self.__skip(index)
+
+    def __skip(self, index: int) -> None:
+        """Records that a task, and the duplicates waiting on it, never started."""
+
+        skipped = [index]
+        while skipped:
+            index = skipped.pop()
+            self.__outcomes[index] = _SKIPPED
+            self.__on_skip(index)
+            self.skipped += 1
+            skipped.extend(self.__followers.pop(index, ()))
+
+    def __fill(self, download: Callable[[int, Path], Path], order: Iterator[int], token: CancellationToken) -> None:
+        """Submits leading tasks until the window is full, no task is left or the batch is stopped."""
+
+        while len(self.__pending) < self.__window:
+            index = next(order, None)
+            if index is None:
+                return
+            if not self.__advance(index, token):
+                # Stopped while planning: the task is skipped along with the rest of the order.
+                self.__skip(index)
+                return
+            if index in self.plan.leaders:
+                continue
+            future = self.__executor.submit(self.__start, download, token, index, self.plan.destination(index))
+            self.__pending[future] = index
+
+    def __advance(self, index: int, token: CancellationToken) -> bool:
+        """Plans the batch up to the task at `index`, unless `token` is cancelled first."""
+
+        while self.plan.planned <= index:
+            if token.cancelled:
+                return False
+            for follower, leader in self.plan.advance(min(self.plan.planned + _PLAN_CHUNK, index + 1)):
+                self.__follow(follower, leader)
+            if self.plan.planned == len(self.tasks):
+                # No duplicate is left to plan, so the errors of settled leaders are not needed anymore.
+                self.__errors.clear()
+
+        return True
+
+    def __follow(self, follower: int, leader: int) -> None:
+        """Makes a newly planned duplicate wait for its leader, or share its outcome if already settled."""
+
+        outcome = self.__outcomes[leader]
+        if outcome == _PENDING:
+            self.__followers.setdefault(leader, []).append(follower)
+        elif outcome == _SKIPPED:
+            self.__skip(follower)
+        else:
+            path = self.__paths.get(leader, self.plan.destination(leader)) if outcome == _SUCCEEDED else None
+            error = None
+            if outcome == _FAILED:
+                error_type, message = self.__errors[leader]
+                error = error_type(message)
+            for shared in self.__share(follower, path, error):
+                self.__settle(*shared)
+
+    @staticmethod
+    def __start(download: Callable[[int, Path], Path], token: CancellationToken, index: int, destination: Path) -> Path:
+        """Runs a transfer on a worker, unless the batch was stopped while it was queued.
+
+        Workers see a cancellation as soon as it happens and may drain the queue
+        before the batch thread gets to cancel the queued futures.
+        """
+
+        if token.cancelled:
+            raise _NotStarted()
+
+        return download(index, destination)
+
+    def __settle(self, index: int, path: Path | None, error: DownloadError | None) -> None:
+        """Records the outcome of a task, then of the duplicates waiting on it."""
+
+        outcomes = [(index, path, error)]
+        while outcomes:
+            index, path, error = outcomes.pop()
+            if path is not None:
+                self.__outcomes[index] = _SUCCEEDED
+                if path != self.plan.destination(index):
+                    self.__paths[index] = path
+                self.__on_success(index, path)
+            else:
+                self.__outcomes[index] = _FAILED
+                if self.plan.planned < len(self.tasks):
+                    # Only duplicates planned later still need it; the traceback and response are not kept.
+                    self.__errors[index] = (type(error), str(error))
+                task = self.tasks[index]
+                task_name = task.destination_path.name if task.destination_path else task.url
+                logger.error(f'Task failed for {task_name}: {error}')
+                self.__on_failure(index, error)
+
+            if self.__reporter is not None:
+                self.__reporter.task_done()
+
+            for follower in self.__followers.pop(index, ()):
+                outcomes.extend(self.__share(follower, path, error))
+
+    def __share(
+        self, follower: int, path: Path | None, error: DownloadError | None
+    ) -> List[Tuple[int, Path | None, DownloadError | None]]:
+        """Returns the outcome of a duplicate whose leader settled, or starts copying the file of its leader."""
+
+        destination = self.plan.destination(follower)
+        if path is None or destination == path:
+            return [(follower, path, error)]
+
+        self.__pending[self.__executor.submit(_copy_download, path, destination)] = follower
+        return []
@@ -17,7 +17,7 @@
 """Shared data structures and interface protocols for the application."""
 
 from pathlib import Path
-from typing import List, NamedTuple, Protocol
+from typing import Iterable, List, NamedTuple, Protocol, Sequence, Tuple
 
 
 class DownloadError(Exception):
@@ -32,28 +32,207 @@ class FileOperationError(DownloadError):
     """Exception for errors during file I/O operations (write, create dir, etc.)."""
 
 
+class DownloadCancelledError(DownloadError):
+    """Exception for downloads stopped through their cancellation token."""
+
+
+class DownloadTimeoutError(DownloadCancelledError):
+    """Exception for downloads stopped because their time limit, or the batch deadline, passed."""
+
+
+class DestinationLockedError(DownloadError):
+    """Exception for downloads skipped because another process is downloading the same file."""
+
+
+class TransferProgressProtocol(Protocol):
+    """Defines the protocol for the byte counter of a single transfer."""
+
+    def expect(self, total_bytes: int) -> None:
+        """Announce the expected size of the transfer, once known."""
+
+    def advance(self, count: int) -> None:
+        """Record that `count` more bytes were received."""
+
+    def flush(self) -> None:
+        """Forward any pending byte count to the underlying reporter."""
+
+
+class CancellationTokenProtocol(Protocol):
+    """Defines the protocol for the cancellation token checked by a transfer."""
+
+    def raise_if_cancelled(self) -> None:
+        """Raise `DownloadCancelledError` (or `DownloadTimeoutError`) if the transfer must stop."""
+
+    def remaining(self) -> float | None:
+        """Return the seconds left before the deadline, or None if there is none."""
+
+
+class ProgressReporterProtocol(Protocol):
+    """Defines the protocol for a batch progress reporter.
+
+    Reporters receive aggregated, already batched updates from all workers,
+    so implementations may take a lock without slowing the chunk loop down.
+    """
+
+    def start(self, total_tasks: int) -> None:
+        """Begin reporting a batch of `total_tasks` downloads."""
+
+    def add_total_bytes(self, count: int) -> None:
+        """Grow the expected byte total of the batch."""
+
+    def advance_bytes(self, count: int) -> None:
+        """Record that `count` more bytes were downloaded."""
+
+    def task_done(self) -> None:
+        """Record that a download task finished (successfully or not)."""
+
+    def close(self) -> None:
+        """Finish reporting the current batch."""
+
+
+# pylint: disable=too-few-public-methods
+class DirectoryLayoutProtocol(Protocol):
+    """Defines the protocol for placing downloaded files inside a destination directory."""
+
+    def place(self, directory: Path, url: str) -> Path:
+        """Return the path, inside `directory`, where the file of `url` is saved."""
+
+
+class SinkWriterProtocol(Protocol):
+    """Defines the protocol for an object being streamed into a storage sink."""
+
+    def write(self, data: bytes) -> object:
+        """Append `data` to the object."""
+
+    def close(self) -> None:
+        """Finish the object, making it visible in the sink."""
+
+    def abort(self) -> None:
+        """Discard the object and whatever was written of it."""
+
+
+# pylint: disable=too-few-public-methods
+class StorageSinkProtocol(Protocol):
+    """Defines the protocol for storage receiving downloaded files, such as a directory or an object store."""
+
+    def open(self, key: str) -> SinkWriterProtocol:
+        """Start writing the object stored under `key`, replacing any previous one."""
+
+
+# pylint: disable=too-few-public-methods
+class SchedulingPolicyProtocol(Protocol):
+    """Defines the protocol for ordering the tasks of a batch before submission."""
+
+    needs_sizes: bool
+
+    def order(self, tasks: Sequence['DownloadTask'], sizes: Sequence[int]) -> Iterable[int]:
+        """Return the indexes of `tasks` in submission order.
+
+        `sizes` holds the known size in bytes of each task, or -1 when unknown. It is
+        only filled from hints and probes when the policy sets `needs_sizes`.
+        """
+
+
 # pylint: disable=too-few-public-methods
 class DownloadServiceProtocol(Protocol):
     """Defines the protocol for a download service."""
 
-    def download_file(self, url: str, file_path: Path | None = None) -> Path:
-        """Download a file from a URL and save it to a local file path."""
+    def download_file(
+        self,
+        url: str,
+        file_path: Path | None = None,
+        *,
+        progress: TransferProgressProtocol | None = None,
+        mirrors: Sequence[str] = (),
+        token: CancellationTokenProtocol | None = None,
+    ) -> Path:
+        """Download a file from a URL, or one of its mirrors, and save it to a local file path.
+
+        The keyword arguments are optional: `DownloadManager` only passes those the
+        service accepts, so services implementing `download_file(url, file_path)` still work.
+        """
 
 
 class DownloadTask(NamedTuple):
-    """Represents a single file download task."""
+    """Represents a single file download task.
+
+    Attributes:
+        url: The URL of the file to download.
+        destination_path: The local file path or directory, if any.
+        priority: Scheduling priority; higher values start first under `PriorityPolicy`.
+        size_hint: Expected size in bytes, if known, used by size-aware scheduling policies.
+        mirrors: Alternative URLs serving the same file, used according to the service mirror mode.
+    """
 
     url: str
     destination_path: Path | None = None
+    priority: int = 0
+    size_hint: int | None = None
+    mirrors: Tuple[str, ...] = ()
 
 
-class DownloadResult(NamedTuple):
+class _DownloadOutcome(NamedTuple):
+    """The two fields of `DownloadResult`."""
+
+    successes: List[Path]
+    failures: List[DownloadTask]
+
+
+class DownloadResult(_DownloadOutcome):
     """Result of a download batch execution.
 
+    It unpacks as `successes, failures = manager.run(...)`; `not_started` is an extra
+    attribute rather than a third field, so it is left out of unpacking and comparisons.
+
     Attributes:
         successes: List of paths to successfully downloaded files.
-        failures: List of tasks that failed.
+        failures: List of tasks that failed, including those stopped while running.
+        not_started: Tasks that never started because the batch was cancelled or hit its deadline.
     """
 
-    successes: List[Path]
-    failures: List[DownloadTask]
+    not_started: Sequence[DownloadTask] = ()
+
+    def __new__(
+        cls, successes: List[Path], failures: List[DownloadTask], not_started: Sequence[DownloadTask] = ()
+    ) -> 'DownloadResult':
+        result = super().__new__(cls, successes, failures)
+        result.not_started = not_started
+        return result
+
+
+class TaskMetrics(NamedTuple):
+    """Measurements of a single transfer.
+
+    Attributes:
+        bytes_downloaded: Bytes received, including those of a failed attempt.
+        duration: Seconds between the start of the transfer and the moment it settled.
+        bytes_decoded: Size of the body once decoded, if it was sent compressed and decoded (0 otherwise).
+    """
+
+    bytes_downloaded: int
+    duration: float
+    bytes_decoded: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bandwidth saved by compression: decoded bytes that did not have to be received."""
+
+        return max(self.bytes_decoded - self.bytes_downloaded, 0)
+
+
+class TaskEvent(NamedTuple):
+    """Emitted when a task of a batch completes or fails.
+
+    Attributes:
+        index: Position of the task in the batch.
+        task: The task.
+        path: The downloaded file, or None if the task failed.
+        error: Why the task failed, or None if it succeeded.
+        metrics: Measurements of the transfer; zero for tasks served by another task's transfer.
+    """
+
+    index: int
+    task: DownloadTask
+    path: Path | None
+    error: 'DownloadError | None'
+    metrics: TaskMetrics
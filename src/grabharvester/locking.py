@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: locking.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Cross-process locks on destination files.
+
+Several processes harvesting into the same directory coordinate through an
+advisory lock on a `<file>.lock` file next to each destination: POSIX record
+locks (`lockf`, which also work on NFS) or `msvcrt` locks on Windows. There is
+one lock per file and no global lock, so unrelated downloads never wait on each
+other.
+
+The operating system releases the lock of a process that dies, even when it is
+killed, so a stale lock file left behind is simply locked again by the next
+process. Record locks belong to a process rather than a thread, so the threads
+of a process are kept apart by a process-wide registry of held destinations.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Literal, Set, Tuple
+
+from loguru import logger
+
+from .interfaces import CancellationTokenProtocol, DestinationLockedError
+from .paths import ensure_directory
+
+if os.name == 'nt':  # pragma: no cover - Windows
+    import msvcrt  # pylint: disable=import-error
+
+    fcntl = None  # pylint: disable=invalid-name
+else:
+    import fcntl
+
+    msvcrt = None  # pylint: disable=invalid-name
+
+# What a download does when another one holds the lock of its destination:
+# 'wait' until it is released, or 'skip' the file by raising `DestinationLockedError`.
+LockMode = Literal['wait', 'skip']
+
+# Suffix of the lock file of a destination.
+LOCK_SUFFIX = '.lock'
+
+# First and longest delay, in seconds, between two attempts to take a busy lock.
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 1.0
+
+# Destinations locked by this process.
+_HELD: Set[Path] = set()
+_HELD_LOCK = threading.Lock()
+
+
+def lock_path(destination: Path) -> Path:
+    """Returns the lock file of `destination`."""
+
+    return destination.with_name(f'{destination.name}{LOCK_SUFFIX}')
+
+
+def _try_lock(descriptor: int) -> bool:
+    """Takes the lock of an open lock file without blocking, returning False if another process holds it."""
+
+    try:
+        if fcntl is not None:
+            fcntl.lockf(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:  # pragma: no cover - Windows
+            msvcrt.locking(descriptor, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+
+    return True
+
+
+def _unlock(descriptor: int) -> None:
+    """Releases the lock of an open lock file."""
+
+    if fcntl is not None:
+        fcntl.lockf(descriptor, fcntl.LOCK_UN)
+    else:  # pragma: no cover - Windows
+        os.lseek(descriptor, 0, os.SEEK_SET)
+        msvcrt.locking(descriptor, msvcrt.LK_UNLCK, 1)
+
+
+def _acquire(destination: Path) -> int | None:
+    """Locks `destination`, returning the descriptor of its lock file, or None if it is busy."""
+
+    with _HELD_LOCK:
+        if destination in _HELD:
+            return None
+        _HELD.add(destination)
+
+    path = lock_path(destination)
+    try:
+        ensure_directory(path.parent)
+        while True:
+            descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            if not _try_lock(descriptor):
+                os.close(descriptor)
+                with _HELD_LOCK:
+                    _HELD.discard(destination)
+                return None
+
+            # The previous holder deletes the file before unlocking it: if it did so
+            # since it was opened, this lock guards nothing, so lock the new file.
+            try:
+                current = os.stat(path).st_ino == os.fstat(descriptor).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                break
+            _unlock(descriptor)
+            os.close(descriptor)
+
+        # The owner, for whoever wonders who holds the lock.
+        os.ftruncate(descriptor, 0)
+        os.write(descriptor, f'{os.getpid()}\n'.encode('ascii'))
+    except BaseException:
+        with _HELD_LOCK:
+            _HELD.discard(destination)
+        raise
+
+    return descriptor
+
+
+def _identity(destination: Path) -> Tuple[int, int, int] | None:
+    """Returns the device, inode and modification time of `destination`, or None if it does not exist."""
+
+    try:
+        stat = destination.stat()
+    except FileNotFoundError:
+        return None
+
+    return stat.st_dev, stat.st_ino, stat.st_mtime_ns
+
+
+def _release(destination: Path, descriptor: int) -> None:
+    """Deletes the lock file of `destination`, then unlocks it."""
+
+    try:
+        lock_path(destination).unlink(missing_ok=True)
+    except OSError:  # pragma: no cover - Windows cannot delete an open file
+        pass
+
+    try:
+        _unlock(descriptor)
+    finally:
+        os.close(descriptor)
+        with _HELD_LOCK:
+            _HELD.discard(destination)
+
+
+@contextmanager
+def hold_destination(
+    destination: Path, mode: LockMode = 'wait', token: CancellationTokenProtocol | None = None
+) -> Iterator[bool]:
+    """Holds the cross-process lock of `destination` within the `with` statement.
+
+    Holders write through a `.part` file renamed into place, so a destination that
+    changed while waiting for the lock was completed by the holder just waited for.
+
+    Arguments:
+        destination(Path): The file about to be written.
+        mode(LockMode): Whether to 'wait' for another holder, or 'skip' the file (default: 'wait').
+        token(CancellationTokenProtocol | None): Stops the wait when cancelled or past its deadline.
+
+    Yields:
+        bool: True if another holder completed `destination` while waiting for the lock.
+    Raises:
+        DestinationLockedError: If the lock is busy in 'skip' mode.
+        DownloadCancelledError: If `token` was cancelled while waiting.
+        OSError: If the lock file cannot be created.
+    """
+
+    delay = POLL_INTERVAL
+    descriptor = _acquire(destination)
+    # The destination as it was when the wait started, and whether it was completed since.
+    waited_on: Tuple[int, int, int] | None = None
+    completed = False
+    if descriptor is None:
+        if mode == 'skip':
+            raise DestinationLockedError(f'{destination} is being downloaded by another process or thread.')
+        logger.info(f'Waiting for another download of {destination.name}.')
+        waited_on = _identity(destination)
+
+    while descriptor is None:
+        remaining = None
+        if token is not None:
+            token.raise_if_cancelled()
+            remaining = token.remaining()
+        time.sleep(delay if remaining is None else min(delay, max(remaining, 0.0)))
+        delay = min(delay * 2, MAX_POLL_INTERVAL)
+        descriptor = _acquire(destination)
+        if descriptor is not None:
+            current = _identity(destination)
+            completed = current is not None and current != waited_on
+
+    try:
+        yield completed
+    finally:
+        _release(destination, descriptor)
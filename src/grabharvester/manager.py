@@ -16,73 +16,724 @@
 
 """Manages concurrent downloading of multiple files."""
 
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import asyncio
+import inspect
+import tempfile
+from array import array
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Sequence, Set, Tuple
 
 from loguru import logger
-from tqdm import tqdm
 
-from .interfaces import DownloadError, DownloadResult, DownloadServiceProtocol, DownloadTask
+from .batch import BatchResult, TaskBatch
+from .cancellation import CancellationToken
+from .dedup import SingleFlight, url_key
+from .downloader import DownloadService
+from .events import BatchEvents, EventCallback, EventStream, ProgressCallback, StartCallback
+from .execution import BatchExecution, look_ahead
+from .interfaces import (
+    DirectoryLayoutProtocol,
+    DownloadError,
+    DownloadResult,
+    DownloadServiceProtocol,
+    DownloadTask,
+    SchedulingPolicyProtocol,
+    StorageSinkProtocol,
+    TaskEvent,
+    TransferProgressProtocol,
+)
+from .memory import DEFAULT_SPILL_THRESHOLD, BufferedDownload, MemoryBudget, MemoryResult, SpooledBuffer
+from .profiling import SETTLE_PHASE, TRANSFER, Profiler
+from .progress import ProgressOption, resolve_progress_reporter
+from .scheduling import UNKNOWN_SIZE, FifoPolicy
+from .shards import ShardEntry, ShardResult, ShardWriter
+from .sinks import SinkResult
 
 
-# pylint: disable=too-few-public-methods
+def _accepted_keywords(function: Callable) -> Set[str] | None:
+    """Returns the keyword arguments `function` accepts, or None if it accepts any."""
+
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        return None
+
+    if any(parameter.kind is parameter.VAR_KEYWORD for parameter in parameters):
+        return None
+
+    return {
+        parameter.name
+        for parameter in parameters
+        if parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY)
+    }
+
+
+# pylint: disable=too-few-public-methods, too-many-instance-attributes
 class DownloadManager:
     """Manages concurrent downloading of multiple files.
 
+    Duplicate URLs within a batch are downloaded once: the other tasks wait for
+    that transfer and reuse its file (or a copy of it). Different URLs that map
+    to the same file are given distinct, deterministic filenames.
+
     Attributes:
         __downloader(DownloadServiceProtocol): The download service used to download files.
         __max_threads(int): The maximum number of concurrent threads.
+        __progress(ProgressOption): The progress option each batch builds its own reporter from.
+        __layout(DirectoryLayoutProtocol | None): Places files of tasks whose destination is a directory.
+        __scheduler(SchedulingPolicyProtocol): Decides the order in which tasks are submitted.
+        __probe_sizes(bool): Whether unknown task sizes are probed before scheduling.
+        __task_timeout(float | None): Wall-clock limit, in seconds, of each transfer.
+        __flights(SingleFlight): Coalesces identical transfers across concurrent runs.
+        __profiler(Profiler | None): Times the phases of every transfer, if set.
+        __lookahead(int): Number of queued tasks whose connection is opened ahead of their transfer.
+        __keywords(Set[str] | None): Keyword arguments accepted by `download_file`, or None if any.
 
     Methods:
-        run(tasks: List[DownloadTask]) -> DownloadResult: Executes a list of download tasks concurrently.
+        run(tasks: List[DownloadTask], ...) -> DownloadResult: Executes a list of download tasks concurrently.
+        run_batch(batch: TaskBatch, ...) -> BatchResult: Executes a compact batch of download tasks concurrently.
+        run_in_memory(tasks: Sequence[DownloadTask], ...) -> MemoryResult: Downloads tasks into memory buffers.
+        run_to_shards(tasks: Sequence[DownloadTask], shards: ShardWriter, ...) -> ShardResult: Packs tasks into shards.
+        run_to_sink(tasks: Sequence[DownloadTask], sink: StorageSinkProtocol, ...) -> SinkResult: Streams to a sink.
+        iter_events(tasks: Sequence[DownloadTask], ...) -> Iterator[TaskEvent]: Yields task events as they happen.
+        aiter_events(tasks: Sequence[DownloadTask], ...) -> AsyncIterator[TaskEvent]: Same, for asyncio code.
     """
 
-    def __init__(self, downloader: DownloadServiceProtocol, max_threads: int = 5) -> None:
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        downloader: DownloadServiceProtocol,
+        max_threads: int = 5,
+        *,
+        progress: ProgressOption = 'auto',
+        layout: DirectoryLayoutProtocol | None = None,
+        scheduler: SchedulingPolicyProtocol | None = None,
+        probe_sizes: bool = False,
+        task_timeout: float | None = None,
+        profiler: Profiler | None = None,
+        lookahead: int = 0,
+    ) -> None:
         """Initializes the DownloadManager with a download service and max threads.
 
         Arguments:
             downloader(DownloadServiceProtocol): The download service used to download files.
             max_threads(int): The maximum number of concurrent threads (default: 5).
+            progress(ProgressOption): Progress reporting: 'auto' (a progress bar on interactive
+                                      terminals only), 'tqdm', 'log', 'none', a reporter instance
+                                      or a callback receiving `ProgressSnapshot` objects. Each
+                                      run gets its own reporter, except a reporter instance,
+                                      which concurrent runs share.
+            layout(DirectoryLayoutProtocol | None): Places the files of tasks whose destination is a
+                                                    directory, e.g. `HashPrefixLayout()` (default: the
+                                                    layout of a `DownloadService` downloader, else flat).
+            scheduler(SchedulingPolicyProtocol | None): Orders the tasks before submission, e.g.
+                                                        `LargestFirstPolicy()` to shorten the batch
+                                                        (default: input order).
+            probe_sizes(bool): Whether size-aware schedulers get the size of tasks without a
+                               `size_hint` from a HEAD request (default: False).
+            task_timeout(float | None): Wall-clock limit, in seconds, of each transfer; unlike the
+                                        HTTP timeout, it also stops servers that send data too
+                                        slowly (default: no limit).
+            profiler(Profiler | None): Records where the time of each transfer goes (connect, TLS,
+                                       waiting, reading, writing, progress) for `Profiler.report`
+                                       (default: no profiling).
+            lookahead(int): Number of queued tasks whose host is resolved and connected to while
+                            earlier transfers run, so connection setup leaves the critical path;
+                            it needs a downloader with a `prewarm` method, such as a `DownloadService`
+                            with an `HttpSession` (default: 0, no look-ahead).
         """
 
         self.__downloader = downloader
         self.__max_threads = max_threads
+        # Reject invalid options now; each run builds its own reporter from the option.
+        resolve_progress_reporter(progress)
+        self.__progress = progress
+        # Files land where the downloader itself would put them, unless told otherwise.
+        if layout is None and isinstance(downloader, DownloadService):
+            layout = downloader.layout
+        self.__layout = layout
+        self.__scheduler = scheduler or FifoPolicy()
+        self.__probe_sizes = probe_sizes
+        self.__task_timeout = task_timeout
+        self.__flights = SingleFlight()
+        self.__profiler = profiler
+        self.__lookahead = lookahead
+        # Services written for the original `download_file(url, file_path)` get no keyword arguments.
+        self.__keywords = _accepted_keywords(downloader.download_file)
+
+    def __download(
+        self,
+        task: DownloadTask,
+        destination: Path,
+        progress: TransferProgressProtocol | None,
+        token: CancellationToken,
+    ) -> Path:
+        """Downloads a single task, sharing the transfer with identical in-flight requests."""
+
+        options = {
+            'progress': progress,
+            'mirrors': task.mirrors,
+            # The per-task limit starts when the transfer does, not when the task is queued.
+            'token': token.child(self.__task_timeout),
+        }
+        if self.__keywords is not None:
+            options = {name: value for name, value in options.items() if name in self.__keywords}
+
+        return self.__flights.do(
+            (url_key(task.url), destination), self.__downloader.download_file, task.url, destination, **options
+        )
+
+    def __task_sizes(self, tasks: Sequence[DownloadTask], executor: Executor, token: CancellationToken) -> array:
+        """Returns the known size of every task, from its hint or, if enabled, a HEAD probe.
+
+        Probes stop once `token` is cancelled, and its deadline bounds the timeout of each one.
+        """
+
+        sizes = array('q', (UNKNOWN_SIZE if task.size_hint is None else task.size_hint for task in tasks))
+
+        probe = getattr(self.__downloader, 'probe_size', None) if self.__probe_sizes else None
+        if probe is not None:
+            keywords = _accepted_keywords(probe)
+            if keywords is None or 'token' in keywords:
+                probe = partial(probe, token=token)
+
+            def probe_unless_stopped(url: str) -> int | None:
+                return None if token.cancelled else probe(url)
+
+            unknown = [index for index, size in enumerate(sizes) if size == UNKNOWN_SIZE]
+            logger.info(f'Probing the size of {len(unknown)} tasks.')
+            for index, size in zip(
+                unknown, executor.map(probe_unless_stopped, (tasks[index].url for index in unknown))
+            ):
+                if size is not None:
+                    sizes[index] = size
+
+        return sizes
+
+    # pylint: disable=too-many-arguments, too-many-locals
+    def __execute(
+        self,
+        tasks: Sequence[DownloadTask],
+        on_success: Callable[[int, Path], None],
+        on_failure: Callable[[int], None],
+        on_skip: Callable[[int], None],
+        *,
+        timeout: float | None,
+        token: CancellationToken | None,
+        transfer: (
+            Callable[[DownloadTask, Path, TransferProgressProtocol | None, CancellationToken], Path] | None
+        ) = None,
+        **callbacks: Callable | None,
+    ) -> None:
+        """Runs a batch of tasks, reporting each outcome by task index and to the event `callbacks`.
+
+        Each leading task is downloaded by `transfer`, by default into its destination file.
+        """
+
+        transfer = transfer or self.__download
+        reporter = resolve_progress_reporter(self.__progress)
+        if reporter is not None:
+            reporter.start(len(tasks))
+
+        events = BatchEvents(tasks, reporter, **callbacks)
+
+        def succeeded(index: int, path: Path) -> None:
+            on_success(index, path)
+            events.settle(index, path, None)
+
+        def failed(index: int, error: DownloadError) -> None:
+            on_failure(index)
+            events.settle(index, None, error)
+
+        profiler = self.__profiler
+        if profiler is not None:
+            transfer = self.__profiled(transfer, profiler)
+            settle_timer = profiler.timer()
+            succeeded = settle_timer.wrap(SETTLE_PHASE, succeeded)
+            failed = settle_timer.wrap(SETTLE_PHASE, failed)
+            profiler.start()
+
+        # The batch token expires at the batch deadline and follows the caller's token.
+        batch_token = CancellationToken(timeout, parent=token)
+        if token is not None:
+            token.add_callback(batch_token.cancel)
+
+        prewarm = getattr(self.__downloader, 'prewarm', None) if self.__lookahead > 0 else None
+        warmer = None
+        if prewarm is not None:
+            # pylint: disable=consider-using-with
+            warmer = ThreadPoolExecutor(
+                max_workers=min(self.__lookahead, self.__max_threads), thread_name_prefix='grabharvester-prewarm'
+            )
+
+        try:
+            # Use ThreadPoolExecutor to manage concurrent downloads.
+            with ThreadPoolExecutor(max_workers=self.__max_threads) as executor:
+                batch = BatchExecution(
+                    tasks, self.__layout, executor, self.__max_threads * 4, reporter, succeeded, failed, on_skip
+                )
+                sizes = self.__task_sizes(tasks, executor, batch_token) if self.__scheduler.needs_sizes else array('q')
+                order = self.__scheduler.order(tasks, sizes)
+                if warmer is not None:
+                    order = look_ahead(order, tasks, partial(warmer.submit, prewarm), self.__lookahead, batch_token)
+                batch.run(
+                    lambda index, destination: transfer(tasks[index], destination, events.start(index), batch_token),
+                    order,
+                    batch_token,
+                )
+        finally:
+            if warmer is not None:
+                warmer.shutdown(wait=False, cancel_futures=True)
+            if token is not None:
+                token.remove_callback(batch_token.cancel)
+            if reporter is not None:
+                reporter.close()
+            if profiler is not None:
+                profiler.stop()
+
+    @staticmethod
+    def __profiled(
+        transfer: Callable[[DownloadTask, Path, TransferProgressProtocol | None, CancellationToken], Path],
+        profiler: Profiler,
+    ) -> Callable[[DownloadTask, Path, TransferProgressProtocol | None, CancellationToken], Path]:
+        """Returns `transfer`, profiling each call on the worker thread running it."""
+
+        def profiled(
+            task: DownloadTask, destination: Path, progress: TransferProgressProtocol | None, token: CancellationToken
+        ) -> Path:
+            with profiler.activate() as timer, timer.measure(TRANSFER):
+                return transfer(task, destination, progress, token)
 
-    def run(self, tasks: List[DownloadTask]) -> DownloadResult:
+        return profiled
+
+    # pylint: disable=too-many-arguments
+    def run(
+        self,
+        tasks: List[DownloadTask],
+        *,
+        timeout: float | None = None,
+        token: CancellationToken | None = None,
+        on_start: StartCallback | None = None,
+        on_progress: ProgressCallback | None = None,
+        on_complete: EventCallback | None = None,
+        on_error: EventCallback | None = None,
+    ) -> DownloadResult:
         """Executes a list of download tasks concurrently.
 
+        The batch stops early when `timeout` expires, `token` is cancelled or the user
+        presses Ctrl-C: tasks still queued are not started and the partial result is
+        returned, with those tasks listed in `not_started`.
+
+        `on_start` and `on_progress` are called from the worker threads, `on_complete`
+        and `on_error` from the calling thread as soon as each task settles.
+
         Arguments:
             tasks(List[DownloadTask]): A list of download tasks.
+            timeout(float | None): Wall-clock limit, in seconds, of the whole batch (default: no limit).
+            token(CancellationToken | None): Cancels the batch from another thread when cancelled.
+            on_start(StartCallback | None): Receives the index and task of each transfer that starts.
+            on_progress(ProgressCallback | None): Receives the index, task, bytes received and expected
+                                                  size of each transfer, about once per megabyte.
+            on_complete(EventCallback | None): Receives the `TaskEvent` of each successful task.
+            on_error(EventCallback | None): Receives the `TaskEvent` of each failed task.
 
         Returns:
-            DownloadResult: A tuple containing lists of successful paths and failed tasks.
+            DownloadResult: A tuple containing lists of successful paths, failed tasks and tasks not started.
         """
 
         failed_tasks: List[DownloadTask] = []
         successful_paths: List[Path] = []
+        not_started: List[DownloadTask] = []
 
         if not tasks:
             logger.info('No download tasks to execute.')
             return DownloadResult(successes=[], failures=[])
 
-        # Use ThreadPoolExecutor to manage concurrent downloads.
-        with ThreadPoolExecutor(max_workers=self.__max_threads) as executor:
-            future_to_task: Dict[Future[Path], DownloadTask] = {
-                executor.submit(self.__downloader.download_file, task.url, task.destination_path): task
-                for task in tasks
-            }
-
-            # Use tqdm to display a progress bar.
-            progress_bar = tqdm(as_completed(future_to_task), total=len(tasks), desc='Downloading files...')
-            for future in progress_bar:
-                task = future_to_task[future]
-                try:
-                    result = future.result()
-                    successful_paths.append(result)
-                except DownloadError as error:
-                    task_name = task.destination_path.name if task.destination_path else task.url
-                    logger.error(f'Task failed for {task_name}: {error}')
-                    failed_tasks.append(task)
-
-        return DownloadResult(successes=successful_paths, failures=failed_tasks)
+        self.__execute(
+            tasks,
+            on_success=lambda _, path: successful_paths.append(path),
+            on_failure=lambda index: failed_tasks.append(tasks[index]),
+            on_skip=lambda index: not_started.append(tasks[index]),
+            timeout=timeout,
+            token=token,
+            on_start=on_start,
+            on_progress=on_progress,
+            on_complete=on_complete,
+            on_error=on_error,
+        )
+
+        return DownloadResult(successes=successful_paths, failures=failed_tasks, not_started=not_started)
+
+    # pylint: disable=too-many-arguments
+    def run_batch(
+        self,
+        batch: TaskBatch,
+        *,
+        timeout: float | None = None,
+        token: CancellationToken | None = None,
+        on_start: StartCallback | None = None,
+        on_progress: ProgressCallback | None = None,
+        on_complete: EventCallback | None = None,
+        on_error: EventCallback | None = None,
+    ) -> BatchResult:
+        """Executes a compact batch of download tasks concurrently.
+
+        Unlike `run`, results are recorded as one status code per task instead of
+        lists of objects, which keeps multi-million entry batches cheap. Tasks not
+        started because the batch stopped early get `TaskStatus.NOT_STARTED`.
+
+        Arguments:
+            batch(TaskBatch): The batch of download tasks.
+            timeout(float | None): Wall-clock limit, in seconds, of the whole batch (default: no limit).
+            token(CancellationToken | None): Cancels the batch from another thread when cancelled.
+            on_start(StartCallback | None): As in `run`.
+            on_progress(ProgressCallback | None): As in `run`.
+            on_complete(EventCallback | None): As in `run`.
+            on_error(EventCallback | None): As in `run`.
+
+        Returns:
+            BatchResult: The status of every task and the paths of the successful ones.
+        """
+
+        result = BatchResult(batch)
+
+        if not batch:
+            logger.info('No download tasks to execute.')
+            return result
+
+        self.__execute(
+            batch,
+            on_success=result.record_success,
+            on_failure=result.record_failure,
+            on_skip=result.record_not_started,
+            timeout=timeout,
+            token=token,
+            on_start=on_start,
+            on_progress=on_progress,
+            on_complete=on_complete,
+            on_error=on_error,
+        )
+
+        return result
+
+    # pylint: disable=too-many-arguments
+    def run_in_memory(
+        self,
+        tasks: Sequence[DownloadTask],
+        *,
+        budget: MemoryBudget | None = None,
+        spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+        timeout: float | None = None,
+        token: CancellationToken | None = None,
+    ) -> MemoryResult:
+        """Executes download tasks concurrently, keeping each body in a memory buffer instead of a file.
+
+        Meant for payloads parsed right away: nothing is written to disk unless a body
+        grows past `spill_threshold` or the batch exhausts `budget`. The destination of
+        the tasks is ignored. Close the buffers once consumed to return their memory
+        to the budget.
+
+        Arguments:
+            tasks(Sequence[DownloadTask]): The download tasks.
+            budget(MemoryBudget | None): Caps the bytes the buffers keep in memory; pass the same
+                                         budget to several batches to share it (default: 256 MiB).
+            spill_threshold(int): Size above which a single body spills to disk (default: 8 MiB).
+            timeout(float | None): Wall-clock limit, in seconds, of the whole batch (default: no limit).
+            token(CancellationToken | None): Cancels the batch from another thread when cancelled.
+
+        Returns:
+            MemoryResult: The buffers of the successful tasks, the failed tasks and those not started.
+
+        Raises:
+            TypeError: If the download service cannot download into memory.
+        """
+
+        successes, failures, not_started = self.__run_buffered(
+            tasks,
+            lambda task, buffer: buffer,
+            budget=budget,
+            spill_threshold=spill_threshold,
+            timeout=timeout,
+            token=token,
+        )
+
+        return MemoryResult(
+            successes=[BufferedDownload(task, buffer) for task, buffer in successes],
+            failures=failures,
+            not_started=not_started,
+        )
+
+    # pylint: disable=too-many-arguments
+    def run_to_shards(
+        self,
+        tasks: Sequence[DownloadTask],
+        shards: ShardWriter,
+        *,
+        budget: MemoryBudget | None = None,
+        timeout: float | None = None,
+        token: CancellationToken | None = None,
+    ) -> ShardResult:
+        """Executes download tasks concurrently, packing each file into the archive shards of `shards`.
+
+        Meant for huge batches of small files: each body is downloaded into memory and
+        appended to the current shard, so no file, directory or metadata operation is
+        made per download. The destination of the tasks is ignored; the caller closes
+        `shards` once done with it.
+
+        Arguments:
+            tasks(Sequence[DownloadTask]): The download tasks.
+            shards(ShardWriter): Receives the downloaded files.
+            budget(MemoryBudget | None): Caps the bytes of the downloads waiting to be packed
+                                         (default: 256 MiB).
+            timeout(float | None): Wall-clock limit, in seconds, of the whole batch (default: no limit).
+            token(CancellationToken | None): Cancels the batch from another thread when cancelled.
+
+        Returns:
+            ShardResult: The index entries of the successful tasks, the failed tasks and those not started.
+
+        Raises:
+            TypeError: If the download service cannot download into memory.
+        """
+
+        def pack(task: DownloadTask, buffer: SpooledBuffer) -> ShardEntry:
+            with buffer:
+                return shards.add(task.url, buffer.open(), buffer.size)
+
+        successes, failures, not_started = self.__run_buffered(
+            tasks, pack, budget=budget, spill_threshold=DEFAULT_SPILL_THRESHOLD, timeout=timeout, token=token
+        )
+
+        return ShardResult(successes=[entry for _, entry in successes], failures=failures, not_started=not_started)
+
+    def run_to_sink(
+        self,
+        tasks: Sequence[DownloadTask],
+        sink: StorageSinkProtocol,
+        *,
+        timeout: float | None = None,
+        token: CancellationToken | None = None,
+    ) -> SinkResult:
+        """Executes download tasks concurrently, streaming each body straight into `sink`.
+
+        Nothing touches the local disk unless the sink itself writes there, e.g. an
+        `S3Sink` uploads while downloading. Objects are keyed by the name each file would
+        get in a directory, laid out by the layout of the manager; the destination of
+        the tasks is ignored.
+
+        Arguments:
+            tasks(Sequence[DownloadTask]): The download tasks.
+            sink(StorageSinkProtocol): Stores the downloaded objects, e.g. `LocalSink`, `MemorySink`
+                                       or `S3Sink`.
+            timeout(float | None): Wall-clock limit, in seconds, of the whole batch (default: no limit).
+            token(CancellationToken | None): Cancels the batch from another thread when cancelled.
+
+        Returns:
+            SinkResult: The keys of the stored objects, the failed tasks and those not started.
+
+        Raises:
+            TypeError: If the download service cannot download into a sink.
+        """
+
+        download_to_sink = getattr(self.__downloader, 'download_to_sink', None)
+        if download_to_sink is None:
+            raise TypeError(f'{type(self.__downloader).__name__} cannot download into a storage sink.')
+
+        root = Path(tempfile.gettempdir())
+
+        def fetch(
+            task: DownloadTask, key: Path, progress: TransferProgressProtocol | None, task_token: CancellationToken
+        ) -> str:
+            # Tasks without destination are planned into the temporary directory.
+            return download_to_sink(
+                task.url,
+                sink,
+                key.relative_to(root).as_posix(),
+                progress=progress,
+                mirrors=task.mirrors,
+                token=task_token,
+            )
+
+        successes, failures, not_started = self.__run_detached(tasks, fetch, timeout=timeout, token=token)
+
+        return SinkResult(successes=[key for _, key in successes], failures=failures, not_started=not_started)
+
+    # pylint: disable=too-many-arguments
+    def __run_buffered(
+        self,
+        tasks: Sequence[DownloadTask],
+        keep: Callable[[DownloadTask, SpooledBuffer], Any],
+        *,
+        budget: MemoryBudget | None,
+        spill_threshold: int,
+        timeout: float | None,
+        token: CancellationToken | None,
+    ) -> Tuple[List[Tuple[DownloadTask, Any]], List[DownloadTask], List[DownloadTask]]:
+        """Downloads tasks into memory buffers, passing each one to `keep` on the worker thread."""
+
+        download_buffer = getattr(self.__downloader, 'download_buffer', None)
+        if download_buffer is None:
+            raise TypeError(f'{type(self.__downloader).__name__} cannot download into memory.')
+
+        budget = budget or MemoryBudget()
+
+        def fetch(
+            task: DownloadTask, _: Path, progress: TransferProgressProtocol | None, task_token: CancellationToken
+        ) -> Any:
+            buffer = download_buffer(
+                task.url,
+                progress=progress,
+                mirrors=task.mirrors,
+                token=task_token,
+                budget=budget,
+                spill_threshold=spill_threshold,
+            )
+            return keep(task, buffer)
+
+        return self.__run_detached(tasks, fetch, timeout=timeout, token=token)
+
+    def __run_detached(
+        self,
+        tasks: Sequence[DownloadTask],
+        fetch: Callable[[DownloadTask, Path, TransferProgressProtocol | None, CancellationToken], Any],
+        *,
+        timeout: float | None,
+        token: CancellationToken | None,
+    ) -> Tuple[List[Tuple[DownloadTask, Any]], List[DownloadTask], List[DownloadTask]]:
+        """Runs tasks whose bodies do not go to their destination file, but wherever `fetch` puts them.
+
+        `fetch` receives each leading task, its planned path (a unique key), its progress
+        counter and its token, and returns the result shared with the duplicates of the task.
+
+        Returns:
+            Tuple: The successful tasks with the result of `fetch`, the failed tasks and those not started.
+        """
+
+        successes: List[Tuple[DownloadTask, Any]] = []
+        failures: List[DownloadTask] = []
+        not_started: List[DownloadTask] = []
+
+        if not tasks:
+            logger.info('No download tasks to execute.')
+            return successes, failures, not_started
+
+        fetched: Dict[Path, Any] = {}
+
+        def transfer(
+            task: DownloadTask, key: Path, progress: TransferProgressProtocol | None, task_token: CancellationToken
+        ) -> Path:
+            # The per-task limit starts when the transfer does, not when the task is queued.
+            fetched[key] = fetch(task, key, progress, task_token.child(self.__task_timeout))
+            return key
+
+        # Without destinations, duplicate URLs always share the key, hence the result, of their leader.
+        self.__execute(
+            [task._replace(destination_path=None) for task in tasks],
+            on_success=lambda index, key: successes.append((tasks[index], fetched[key])),
+            on_failure=lambda index: failures.append(tasks[index]),
+            on_skip=lambda index: not_started.append(tasks[index]),
+            timeout=timeout,
+            token=token,
+            transfer=transfer,
+        )
+
+        return successes, failures, not_started
+
+    def iter_events(
+        self,
+        tasks: Sequence[DownloadTask],
+        *,
+        timeout: float | None = None,
+        token: CancellationToken | None = None,
+        on_start: StartCallback | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> Iterator[TaskEvent]:
+        """Executes download tasks concurrently, yielding the event of each task as soon as it settles.
+
+        Nothing is accumulated: each file can be processed while the rest of the batch
+        is still downloading. The batch runs on a background thread started by the
+        first iteration; leaving the loop early cancels the tasks not settled yet.
+        Tasks that never start, because the batch stopped early, yield no event.
+
+        Arguments:
+            tasks(Sequence[DownloadTask]): The download tasks, e.g. a list or a `TaskBatch`.
+            timeout(float | None): Wall-clock limit, in seconds, of the whole batch (default: no limit).
+            token(CancellationToken | None): Cancels the batch from another thread when cancelled.
+            on_start(StartCallback | None): As in `run`.
+            on_progress(ProgressCallback | None): As in `run`.
+
+        Returns:
+            Iterator[TaskEvent]: The events of the settled tasks, in completion order.
+        """
+
+        stream = self.__stream(tasks, timeout, token, on_start, on_progress)
+        try:
+            while (event := stream.get()) is not None:
+                yield event
+        finally:
+            stream.close()
+
+    async def aiter_events(
+        self,
+        tasks: Sequence[DownloadTask],
+        *,
+        timeout: float | None = None,
+        token: CancellationToken | None = None,
+        on_start: StartCallback | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> AsyncIterator[TaskEvent]:
+        """Asynchronous version of `iter_events`, for use with `async for`.
+
+        The downloads still run on threads; waiting for the next event does not
+        block the event loop.
+
+        Arguments:
+            tasks(Sequence[DownloadTask]): The download tasks, e.g. a list or a `TaskBatch`.
+            timeout(float | None): Wall-clock limit, in seconds, of the whole batch (default: no limit).
+            token(CancellationToken | None): Cancels the batch from another thread when cancelled.
+            on_start(StartCallback | None): As in `run`.
+            on_progress(ProgressCallback | None): As in `run`.
+
+        Returns:
+            AsyncIterator[TaskEvent]: The events of the settled tasks, in completion order.
+        """
+
+        loop = asyncio.get_running_loop()
+        stream = self.__stream(tasks, timeout, token, on_start, on_progress)
+        try:
+            while (event := await loop.run_in_executor(None, stream.get)) is not None:
+                yield event
+        finally:
+            await loop.run_in_executor(None, stream.close)
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __stream(
+        self,
+        tasks: Sequence[DownloadTask],
+        timeout: float | None,
+        token: CancellationToken | None,
+        on_start: StartCallback | None,
+        on_progress: ProgressCallback | None,
+    ) -> EventStream:
+        """Starts a batch on a background thread, streaming its events."""
+
+        def execute(emit: EventCallback, stream_token: CancellationToken) -> None:
+            if not tasks:
+                logger.info('No download tasks to execute.')
+                return
+
+            self.__execute(
+                tasks,
+                on_success=lambda index, path: None,
+                on_failure=lambda index: None,
+                on_skip=lambda index: None,
+                timeout=timeout,
+                token=stream_token,
+                on_start=on_start,
+                on_progress=on_progress,
+                on_complete=emit,
+                on_error=emit,
+            )
+
+        return EventStream(execute, token)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: memory.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""In-memory download targets.
+
+Small payloads that are parsed right away do not need a round trip through
+the file system: a `SpooledBuffer` keeps the body in memory and only spills
+it to an anonymous temporary file when it grows past a threshold, or when the
+`MemoryBudget` shared by a batch is exhausted. The budget caps the bytes held
+in memory by all the buffers of a batch, however many tasks it has.
+"""
+
+import io
+import tempfile
+import threading
+from types import TracebackType
+from typing import BinaryIO, List, NamedTuple, Sequence, Type
+
+from .interfaces import DownloadTask
+
+# Total bytes the buffers of a batch may keep in memory by default.
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Size above which a single buffer spills to disk by default.
+DEFAULT_SPILL_THRESHOLD = 8 * 1024 * 1024
+
+
+class MemoryBudget:
+    """A thread-safe cap on the bytes held in memory by a set of buffers.
+
+    Attributes:
+        limit(int): Maximum number of bytes that may be reserved at once.
+        used(int): Bytes currently reserved.
+    """
+
+    def __init__(self, limit: int = DEFAULT_MEMORY_LIMIT) -> None:
+        """Initializes an empty budget.
+
+        Arguments:
+            limit(int): Maximum number of bytes that may be reserved at once (default: 256 MiB).
+        """
+
+        self.limit = limit
+        self.used = 0
+        self.__lock = threading.Lock()
+
+    def reserve(self, count: int) -> bool:
+        """Reserves `count` bytes, returning False, without reserving anything, if they do not fit."""
+
+        with self.__lock:
+            if self.used + count > self.limit:
+                return False
+            self.used += count
+
+        return True
+
+    def release(self, count: int) -> None:
+        """Returns `count` reserved bytes to the budget."""
+
+        with self.__lock:
+            self.used = max(self.used - count, 0)
+
+
+class SpooledBuffer:
+    """A write-once download target kept in memory until it grows too large.
+
+    Unlike `tempfile.SpooledTemporaryFile`, the in-memory data can be exposed as a
+    `memoryview` without copying it, and the rollover also happens when a shared
+    `MemoryBudget` runs out. Closing the buffer returns its bytes to the budget.
+
+    Attributes:
+        size(int): Number of bytes written.
+        __budget(MemoryBudget | None): Shared cap on the bytes kept in memory, if any.
+        __spill_threshold(int): Size above which the buffer spills to disk.
+        __memory(bytearray | None): The data, while it is kept in memory.
+        __file(BinaryIO | None): The temporary file holding the data, once spilled.
+    """
+
+    def __init__(self, budget: MemoryBudget | None = None, spill_threshold: int = DEFAULT_SPILL_THRESHOLD) -> None:
+        """Initializes an empty, in-memory buffer.
+
+        Arguments:
+            budget(MemoryBudget | None): Shared cap on the bytes kept in memory (default: none).
+            spill_threshold(int): Size above which the buffer spills to disk (default: 8 MiB).
+        """
+
+        self.size = 0
+        self.__budget = budget
+        self.__spill_threshold = spill_threshold
+        self.__memory: bytearray | None = bytearray()
+        self.__file: BinaryIO | None = None
+
+    @property
+    def in_memory(self) -> bool:
+        """Whether the data is still held in memory."""
+
+        return self.__memory is not None
+
+    def write(self, data: bytes) -> int:
+        """Appends `data`, spilling to disk first if it would not fit in memory."""
+
+        if self.__memory is not None and not self.__fits(len(data)):
+            self.__spill()
+
+        if self.__memory is not None:
+            self.__memory += data
+        else:
+            self.__file.write(data)
+        self.size += len(data)
+
+        return len(data)
+
+    def getvalue(self) -> bytes:
+        """Returns a copy of the whole content."""
+
+        if self.__memory is not None:
+            return bytes(self.__memory)
+
+        self.__file.seek(0)
+        return self.__file.read()
+
+    def getbuffer(self) -> memoryview:
+        """Returns the content as a read-only view, without copying it while it is in memory."""
+
+        if self.__memory is not None:
+            return memoryview(self.__memory).toreadonly()
+
+        return memoryview(self.getvalue())
+
+    def open(self) -> BinaryIO:
+        """Returns a binary file object reading the content from the start, e.g. for `json.load`."""
+
+        if self.__memory is not None:
+            return io.BytesIO(self.getbuffer())
+
+        self.__file.seek(0)
+        return self.__file
+
+    def close(self) -> None:
+        """Drops the content and returns its bytes to the budget."""
+
+        if self.__memory is not None:
+            self.__release(len(self.__memory))
+            self.__memory = None
+        if self.__file is not None:
+            self.__file.close()
+        self.__file = None
+
+    def abort(self) -> None:
+        """Same as `close`, so that a buffer can serve as a sink writer."""
+
+        self.close()
+
+    def __enter__(self) -> 'SpooledBuffer':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __fits(self, count: int) -> bool:
+        """Whether `count` more bytes may be kept in memory, reserving them if so."""
+
+        if self.size + count > self.__spill_threshold:
+            return False
+
+        return self.__budget is None or self.__budget.reserve(count)
+
+    def __spill(self) -> None:
+        """Moves the content to an anonymous temporary file and frees its memory."""
+
+        self.__file = tempfile.TemporaryFile()
+        self.__file.write(self.__memory)
+        self.__release(len(self.__memory))
+        self.__memory = None
+
+    def __release(self, count: int) -> None:
+        """Returns `count` bytes to the budget, if any."""
+
+        if self.__budget is not None:
+            self.__budget.release(count)
+
+
+class BufferedDownload(NamedTuple):
+    """A task downloaded into memory.
+
+    Attributes:
+        task: The download task.
+        buffer: Its content; duplicate tasks of a batch share the same buffer.
+    """
+
+    task: DownloadTask
+    buffer: SpooledBuffer
+
+
+class MemoryResult(NamedTuple):
+    """Result of an in-memory batch execution.
+
+    Attributes:
+        successes: The downloaded tasks and their buffers.
+        failures: List of tasks that failed, including those stopped while running.
+        not_started: Tasks that never started because the batch was cancelled or hit its deadline.
+    """
+
+    successes: List[BufferedDownload]
+    failures: List[DownloadTask]
+    not_started: Sequence[DownloadTask] = ()
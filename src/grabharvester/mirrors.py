@@ -0,0 +1,770 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: mirrors.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Downloads of a file available from several mirrors.
+
+Three modes are supported:
+
+* `failover`: tries the mirrors one after the other until one succeeds.
+* `hedged`: starts with the first mirror and, whenever no byte arrives for
+  `hedge_delay` seconds, starts another request to the next mirror. The first
+  request to complete wins; the others are cancelled.
+* `segmented`: splits the file into byte ranges fetched in parallel from
+  different mirrors, moving a range to another mirror when it fails.
+
+Full-body requests negotiate compression like `DownloadService` does, while byte
+ranges always ask for the identity encoding, so they line up with the file.
+Requests write to `.part` files next to the destination, which are renamed into
+place once complete, so a cancelled or failed request never leaves a truncated
+file behind. Cancelling a request shuts its connection down, which also aborts a
+request stalled while waiting for the server.
+"""
+
+import os
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Literal, NamedTuple, Sequence, Tuple
+
+import httpcore
+import httpx
+from loguru import logger
+
+from .interfaces import (
+    CancellationTokenProtocol,
+    DownloadError,
+    FileOperationError,
+    NetworkDownloadError,
+    TransferProgressProtocol,
+)
+from .network import HttpSession
+from .paths import ensure_directory
+from .pipeline import PipelinedFile, WriterPool
+from .profiling import PhaseTimer, active_timer
+from .streaming import (
+    CompressionMode,
+    accept_encoding,
+    content_length,
+    decodes,
+    existing_size,
+    is_complete,
+    iter_body,
+    open_for_writing,
+    record_decoded,
+    request_timeout,
+)
+
+# Download modes for tasks with mirrors.
+MirrorMode = Literal['failover', 'hedged', 'segmented']
+
+# Seconds without any received byte before a hedged download tries another mirror.
+DEFAULT_HEDGE_DELAY = 2.0
+
+# Maximum number of byte ranges of a segmented download.
+DEFAULT_SEGMENTS = 4
+
+# Files smaller than two segments of this size are not segmented.
+MIN_SEGMENT_SIZE = 1024 * 1024
+
+# Headers of requests whose byte positions must match the file: range probes and byte ranges.
+_IDENTITY = {'Accept-Encoding': 'identity'}
+
+
+class _Cancelled(Exception):
+    """Raised inside a request that was cancelled by another thread."""
+
+
+class _ProgressTracker:
+    """Thread-safe byte counter shared by the requests of one download.
+
+    Requests report their position within a slot: hedged and failover requests
+    all use the same slot, so bytes fetched again by a later request are not
+    counted twice, while each segment of a segmented download has its own.
+
+    Attributes:
+        last_activity(float): Monotonic time at which any request last received bytes.
+    """
+
+    def __init__(self, progress: TransferProgressProtocol | None) -> None:
+        """Wraps the per-transfer counter of the download, if any."""
+
+        self.last_activity = time.monotonic()
+        self.__progress = progress
+        self.__lock = threading.Lock()
+        self.__high_water: Dict[int, int] = {}
+        self.__expected = False
+
+    def expect(self, total_bytes: int) -> None:
+        """Announces the size of the file, once per download."""
+
+        with self.__lock:
+            if self.__progress is not None and not self.__expected:
+                self.__expected = True
+                self.__progress.expect(total_bytes)
+
+    def update(self, slot: int, position: int) -> None:
+        """Records that a request of `slot` reached `position` bytes."""
+
+        self.last_activity = time.monotonic()
+        if self.__progress is None:
+            return
+
+        with self.__lock:
+            high_water = self.__high_water.get(slot, 0)
+            if position > high_water:
+                self.__high_water[slot] = position
+                self.__progress.advance(position - high_water)
+
+    def decoded(self, count: int) -> None:
+        """Records that the compressed body of the file decoded to `count` bytes, if the counter tracks it."""
+
+        record = getattr(self.__progress, 'decoded', None)
+        if record is not None:
+            record(count)
+
+    def flush(self) -> None:
+        """Forwards pending bytes to the batch reporter."""
+
+        if self.__progress is not None:
+            with self.__lock:
+                self.__progress.flush()
+
+
+def _shut_down(stream: httpcore.NetworkStream) -> None:
+    """Shuts the socket of a connection down, waking a thread blocked reading from it."""
+
+    sock = stream.get_extra_info('socket')
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _RequestOptions(NamedTuple):
+    """Settings shared by the requests of one download.
+
+    Attributes:
+        token: Token of the whole download, checked for every chunk.
+        headers: Headers of full-body requests, e.g. their Accept-Encoding.
+        compression: How a compressed response is stored.
+        session: Session whose DNS cache and connection settings are used, if any.
+        writer_pool: Writes full bodies on dedicated threads, if set.
+    """
+
+    token: CancellationTokenProtocol | None = None
+    headers: Dict[str, str] | None = None
+    compression: CompressionMode = 'decode'
+    session: HttpSession | None = None
+    writer_pool: WriterPool | None = None
+
+
+class _Connections:
+    """The connections opened by one request, shut down when it is cancelled."""
+
+    def __init__(self) -> None:
+        """Starts with no connection."""
+
+        self.__lock = threading.Lock()
+        self.__streams: List[httpcore.NetworkStream] = []
+        self.__cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the request was cancelled."""
+
+        return self.__cancelled.is_set()
+
+    def add(self, stream: httpcore.NetworkStream) -> None:
+        """Records a new connection, shutting it down right away if the request was cancelled."""
+
+        with self.__lock:
+            self.__streams.append(stream)
+            cancelled = self.__cancelled.is_set()
+        if cancelled:
+            _shut_down(stream)
+
+    def shut_down(self) -> None:
+        """Marks the request as cancelled and shuts every connection down."""
+
+        with self.__lock:
+            self.__cancelled.set()
+            streams = list(self.__streams)
+        # Closing a socket does not wake a thread blocked on it; shutting it down does.
+        for stream in streams:
+            _shut_down(stream)
+
+
+class _Request:
+    """A single GET request to one mirror, cancellable from any thread.
+
+    Attributes:
+        url(str): The URL of the mirror.
+        decoded(int): Size of the decoded body, if the response was compressed and decoded (0 otherwise).
+        response(httpx.Response | None): The response, once received; its body is closed.
+    """
+
+    def __init__(self, url: str, options: _RequestOptions = _RequestOptions()) -> None:
+        """Prepares the request with its own connection, so it can be aborted alone.
+
+        Arguments:
+            url(str): The URL of the mirror.
+            options(_RequestOptions): Token, headers, compression mode, session and writer pool
+                                      of the download (default: none of them).
+        """
+
+        self.url = url
+        self.decoded = 0
+        self.response: httpx.Response | None = None
+        self.__options = options
+        timeout = request_timeout(options.token)
+        session = options.session
+        self.__client = session.client(timeout) if session is not None else httpx.Client(timeout=timeout)
+        self.__connections = _Connections()
+
+    def cancel(self) -> None:
+        """Stops the request at the next chunk, or right away if it is waiting on the network."""
+
+        self.__connections.shut_down()
+        self.__client.close()
+
+    def __tracer(self, timer: PhaseTimer | None) -> Callable[[str, Dict[str, Any]], None]:
+        """Returns an httpx trace extension recording the connections of the request, timed by `timer`."""
+
+        def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if timer is not None:
+                timer.trace(event_name, info)
+            if event_name == 'connection.connect_tcp.complete':
+                self.__connections.add(info['return_value'])
+
+        return trace
+
+    def __open(self, part_path: Path, byte_range: Tuple[int, int] | None) -> BinaryIO | PipelinedFile:
+        """Opens the file written by the request: in place for a byte range, else through the writer pool, if any."""
+
+        if byte_range:
+            file = open_for_writing(part_path, 'r+b')
+            file.seek(byte_range[0])
+            return file
+        if self.__options.writer_pool is not None:
+            return self.__options.writer_pool.open(part_path)
+
+        return open_for_writing(part_path)
+
+    def __raise_if_stopped(self) -> None:
+        """Raises if the request, or the whole download, was cancelled."""
+
+        if self.__connections.cancelled:
+            raise _Cancelled()
+        if self.__options.token is not None:
+            self.__options.token.raise_if_cancelled()
+
+    # pylint: disable=too-many-arguments
+    def fetch(
+        self,
+        part_path: Path,
+        on_response: Callable[[httpx.Response], bool],
+        on_position: Callable[[int], None],
+        *,
+        byte_range: Tuple[int, int] | None = None,
+        timer: PhaseTimer | None = None,
+    ) -> bool:
+        """Streams the response body into `part_path`.
+
+        Arguments:
+            part_path(Path): The file written to; for a byte range, it must already exist.
+            on_response(Callable[[httpx.Response], bool]): Called with the response headers;
+                                                          returning False skips the body.
+            on_position(Callable[[int], None]): Receives the number of bytes received so far.
+            byte_range(Tuple[int, int] | None): Inclusive first and last byte to fetch, if any.
+            timer(PhaseTimer | None): Times the phases of the request, if profiled; it must belong
+                                      to the calling thread.
+
+        Returns:
+            bool: True if the body was written, False if `on_response` skipped it.
+        Raises:
+            httpx.HTTPError: If the request failed.
+            OSError: If writing the file failed.
+            _Cancelled: If the request was cancelled.
+            DownloadCancelledError: If the token of the download was cancelled or expired.
+        """
+
+        headers = self.__options.headers or {}
+        if byte_range:
+            headers = {**_IDENTITY, 'Range': f'bytes={byte_range[0]}-{byte_range[1]}'}
+
+        try:
+            extensions = {'trace': self.__tracer(timer)}
+            with self.__client.stream('GET', self.url, headers=headers, extensions=extensions) as response:
+                self.response = response
+                response.raise_for_status()
+                if byte_range and response.status_code != httpx.codes.PARTIAL_CONTENT:
+                    raise httpx.HTTPStatusError(
+                        f'Range request answered with status {response.status_code}',
+                        request=response.request,
+                        response=response,
+                    )
+                if not on_response(response):
+                    return False
+
+                # Decoded bodies report the bytes received, which is what Content-Length counts.
+                decoding = decodes(response, self.__options.compression)
+                chunks = iter_body(response, self.__options.compression, None)
+                with self.__open(part_path, byte_range) as file:
+                    write = file.write
+                    if timer is not None:
+                        chunks = timer.iterate('read', chunks)
+                        write = timer.wrap('write', write)
+                        on_position = timer.wrap('progress', on_position)
+                    position = 0
+                    for chunk in chunks:
+                        self.__raise_if_stopped()
+                        write(chunk)
+                        position += len(chunk)
+                        on_position(response.num_bytes_downloaded if decoding else position)
+                if decoding:
+                    self.decoded = position
+        except httpx.HTTPError:
+            if self.__connections.cancelled:
+                raise _Cancelled() from None
+            if self.__options.token is not None:
+                # A timeout shortened by the deadline means the deadline passed.
+                self.__options.token.raise_if_cancelled()
+            raise
+        finally:
+            self.__client.close()
+
+        return True
+
+
+def _part_path(destination: Path, number: int) -> Path:
+    """Returns the temporary file of request `number` of a download."""
+
+    return destination.with_name(f'{destination.name}.{number}.part')
+
+
+def _discard(path: Path) -> None:
+    """Removes a temporary file, if it exists."""
+
+    try:
+        path.unlink(missing_ok=True)
+    except OSError as error:
+        logger.warning(f'Could not remove {path}: {error}')
+
+
+def _wrap_error(url: str, error: Exception) -> DownloadError:
+    """Converts an error of a request into the matching download error."""
+
+    if isinstance(error, DownloadError):
+        return error
+    if isinstance(error, httpx.HTTPError):
+        return NetworkDownloadError(f'Network request for {url} failed: {error}')
+
+    return FileOperationError(f'File operation for {url} failed: {error}')
+
+
+class _Outcome(NamedTuple):
+    """How an attempt of a hedged download ended.
+
+    Attributes:
+        number: The number of the attempt, which is also the index of its mirror.
+        request: The request of the attempt.
+        written: Whether the request wrote the body; False means the file was already complete.
+        failure: The error that stopped the attempt, if any.
+        timer: The timer of the attempt, if the download is profiled.
+    """
+
+    number: int
+    request: _Request
+    written: bool
+    failure: BaseException | None
+    timer: PhaseTimer | None
+
+
+class _HedgedRace:
+    """The attempts of a hedged download, each running on a thread of its own.
+
+    Attempt `n` fetches mirror `n` into a `.part` file of its own.
+
+    Attributes:
+        launched(int): Number of attempts started so far.
+        running(Dict[int, _Request]): Requests of the attempts still running, by attempt number.
+    """
+
+    def __init__(self, destination: Path, fetch: Callable[[_Request, Path, PhaseTimer | None], bool]) -> None:
+        """Prepares a race for `destination`, whose attempts run `fetch(request, part_path, timer)`."""
+
+        self.launched = 0
+        self.running: Dict[int, _Request] = {}
+        self.__destination = destination
+        self.__fetch = fetch
+        self.__outcomes: queue.Queue[_Outcome] = queue.Queue()
+        self.__threads: List[threading.Thread] = []
+
+    def launch(self, request: _Request, timer: PhaseTimer | None) -> None:
+        """Starts the next attempt with `request`, timed by `timer` if the download is profiled."""
+
+        number = self.launched
+        self.launched += 1
+        self.running[number] = request
+        thread = threading.Thread(
+            target=self.__attempt, args=(number, request, timer), name=f'grabharvester-hedge-{number}', daemon=True
+        )
+        self.__threads.append(thread)
+        thread.start()
+
+    def __attempt(self, number: int, request: _Request, timer: PhaseTimer | None) -> None:
+        """Runs attempt `number` and reports how it ended."""
+
+        part_path = _part_path(self.__destination, number)
+        written, failure = False, None
+        try:
+            written = self.__fetch(request, part_path, timer)
+        except BaseException as error:  # pylint: disable=broad-exception-caught
+            failure = error
+            _discard(part_path)
+        self.__outcomes.put(_Outcome(number, request, written, failure, timer))
+
+    def next_outcome(self, timeout: float | None) -> _Outcome | None:
+        """Waits up to `timeout` seconds for an attempt to end, removing it from `running`; None on timeout."""
+
+        try:
+            outcome = self.__outcomes.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        del self.running[outcome.number]
+        return outcome
+
+    def join(self) -> None:
+        """Cancels the attempts still running, waits for every attempt and removes the files of the losers."""
+
+        for request in self.running.values():
+            request.cancel()
+        self.running.clear()
+        for thread in self.__threads:
+            thread.join()
+        # The winner's file, if any, has already been moved into place.
+        for number in range(self.launched):
+            _discard(_part_path(self.__destination, number))
+
+
+# pylint: disable=too-few-public-methods
+class MirrorDownload:
+    """Downloads one file from a list of mirror URLs.
+
+    Attributes:
+        urls(Sequence[str]): The mirrors, in order of preference.
+        destination(Path): The final path of the file.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        urls: Sequence[str],
+        destination: Path,
+        *,
+        progress: TransferProgressProtocol | None = None,
+        token: CancellationTokenProtocol | None = None,
+        hedge_delay: float = DEFAULT_HEDGE_DELAY,
+        segments: int = DEFAULT_SEGMENTS,
+        headers: Dict[str, str] | None = None,
+        compression: CompressionMode = 'decode',
+        session: HttpSession | None = None,
+        writer_pool: WriterPool | None = None,
+    ) -> None:
+        """Initializes the download.
+
+        Arguments:
+            urls(Sequence[str]): The mirrors, in order of preference.
+            destination(Path): The final path of the file.
+            progress(TransferProgressProtocol | None): Optional byte counter of the transfer.
+            token(CancellationTokenProtocol | None): Optional token stopping every request of the download.
+            hedge_delay(float): Seconds without progress before a hedged download tries another mirror.
+            segments(int): Maximum number of byte ranges of a segmented download.
+            headers(Dict[str, str] | None): Headers of full-body requests (default: the Accept-Encoding
+                                            of `compression`).
+            compression(CompressionMode): How compressed responses are stored, see `DownloadService`
+                                          (default: 'decode').
+            session(HttpSession | None): Sends the range probes, and resolves the host names of the
+                                         requests, through a shared session (default: none).
+            writer_pool(WriterPool | None): Writes full bodies on dedicated threads; byte ranges are
+                                            written in place by their request (default: none).
+        """
+
+        if not urls:
+            raise ValueError('At least one URL is required.')
+
+        self.urls = list(urls)
+        self.destination = destination
+        self.__tracker = _ProgressTracker(progress)
+        self.__options = _RequestOptions(
+            token,
+            headers if headers is not None else {'Accept-Encoding': accept_encoding(compression)},
+            compression,
+            session,
+            writer_pool,
+        )
+        self.__hedge_delay = hedge_delay
+        self.__segments = max(segments, 1)
+        self.__existing = existing_size(destination)
+
+    def run(self, mode: MirrorMode) -> Path:
+        """Downloads the file using `mode`.
+
+        Returns:
+            Path: The path of the downloaded file.
+        Raises:
+            NetworkDownloadError: If every mirror failed.
+            FileOperationError: If there was an error during file I/O operations.
+            DownloadCancelledError: If the token was cancelled, or expired (`DownloadTimeoutError`).
+            ValueError: If `mode` is unknown.
+        """
+
+        runners = {'failover': self.__failover, 'hedged': self.__hedged, 'segmented': self.__segmented}
+        if mode not in runners:
+            raise ValueError(f"Invalid mirror mode: {mode!r}. Expected one of {', '.join(runners)}.")
+
+        try:
+            ensure_directory(self.destination.parent)
+            # The timer of the calling thread, if its transfer is profiled.
+            return runners[mode](active_timer())
+        except OSError as error:
+            raise FileOperationError(f'File operation for {self.destination} failed: {error}') from error
+        finally:
+            self.__tracker.flush()
+
+    def __accept(self, response: httpx.Response) -> bool:
+        """Announces the size of a full-body response and tells whether its body is needed."""
+
+        if is_complete(self.destination, self.__existing, response, self.__options.compression):
+            return False
+
+        self.__tracker.expect(content_length(response))
+        return True
+
+    def __request(self, url: str, timer: PhaseTimer | None) -> _Request:
+        """Prepares a full-body request to the mirror at `url`, timed by `timer` of the calling thread."""
+
+        if timer is None:
+            return _Request(url, self.__options)
+        with timer.measure('client'):
+            return _Request(url, self.__options)
+
+    def __fetch(self, request: _Request, part_path: Path, timer: PhaseTimer | None) -> bool:
+        """Streams the full body of `request` into `part_path`; False means the file was already complete."""
+
+        return request.fetch(part_path, self.__accept, lambda position: self.__tracker.update(0, position), timer=timer)
+
+    def __complete(self, part_path: Path | None, request: _Request | None = None) -> Path:
+        """Moves a finished `.part` file into place; None means the file was already complete.
+
+        `request` is the request that wrote the file, whose decoded size is reported and recorded.
+        """
+
+        if part_path is None:
+            logger.info(f'File already exists and is complete: {self.destination.name}')
+        else:
+            os.replace(part_path, self.destination)
+            logger.info(f'Download completed: {self.destination.name}')
+            if request is not None and request.decoded and request.response is not None:
+                self.__tracker.decoded(request.decoded)
+                record_decoded(self.destination, request.response, request.decoded)
+
+        return self.destination
+
+    def __fail(self, errors: List[DownloadError]) -> NetworkDownloadError:
+        """Builds the error raised when no mirror could deliver the file."""
+
+        details = '; '.join(str(error) for error in errors)
+        return NetworkDownloadError(f'All {len(self.urls)} mirrors of {self.destination.name} failed: {details}')
+
+    def __failover(self, timer: PhaseTimer | None) -> Path:
+        """Tries each mirror in turn."""
+
+        errors: List[DownloadError] = []
+        for number, url in enumerate(self.urls):
+            part_path = _part_path(self.destination, number)
+            request = self.__request(url, timer)
+            try:
+                written = self.__fetch(request, part_path, timer)
+            except httpx.HTTPError as error:
+                _discard(part_path)
+                errors.append(_wrap_error(url, error))
+                logger.warning(f'Mirror {url} failed, trying the next one: {error}')
+                continue
+            except BaseException:
+                _discard(part_path)
+                raise
+
+            return self.__complete(part_path if written else None, request)
+
+        raise self.__fail(errors)
+
+    def __hedged(self, timer: PhaseTimer | None) -> Path:
+        """Races the mirrors, adding one whenever the running requests stall.
+
+        Every attempt runs on a thread of its own, joined before returning. When the
+        transfer is profiled, each attempt times itself and the winner's phases are
+        added to `timer`, the timer of the calling thread.
+        """
+
+        race = _HedgedRace(self.destination, self.__fetch)
+        errors: List[DownloadError] = []
+        self.__launch(race, timer)
+        try:
+            while race.running:
+                outcome = race.next_outcome(self.__hedge_timeout(race))
+                if outcome is None:
+                    if self.__options.token is not None:
+                        self.__options.token.raise_if_cancelled()
+                    if race.launched < len(self.urls):
+                        self.__launch(race, timer)
+                    continue
+
+                if outcome.failure is None:
+                    if timer is not None and outcome.timer is not None:
+                        timer.merge(outcome.timer)
+                    part_path = _part_path(self.destination, outcome.number) if outcome.written else None
+                    return self.__complete(part_path, outcome.request)
+                if not isinstance(outcome.failure, (httpx.HTTPError, _Cancelled)):
+                    raise outcome.failure
+
+                url = self.urls[outcome.number]
+                errors.append(_wrap_error(url, outcome.failure))
+                logger.warning(f'Mirror {url} failed: {outcome.failure}')
+                if not race.running and race.launched < len(self.urls):
+                    self.__launch(race, timer)
+        finally:
+            race.join()
+
+        raise self.__fail(errors)
+
+    def __launch(self, race: _HedgedRace, timer: PhaseTimer | None) -> None:
+        """Starts a hedged attempt on the next mirror, with a timer of its own if the transfer is profiled."""
+
+        request = self.__request(self.urls[race.launched], timer)
+        if race.launched:
+            logger.info(f'Hedging {self.destination.name} with mirror {request.url}')
+        race.launch(request, PhaseTimer() if timer is not None else None)
+        self.__tracker.last_activity = time.monotonic()
+
+    def __hedge_timeout(self, race: _HedgedRace) -> float | None:
+        """Returns how long to wait for an attempt before hedging again or checking the token, or None for ever."""
+
+        timeout = None
+        if race.launched < len(self.urls):
+            timeout = max(self.__hedge_delay - (time.monotonic() - self.__tracker.last_activity), 0)
+        remaining = self.__options.token.remaining() if self.__options.token is not None else None
+        if remaining is not None:
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        return timeout
+
+    def __probe(self) -> Tuple[int, List[str]]:
+        """Returns the size of the file and the mirrors serving it in byte ranges, or (0, []) if none does."""
+
+        size, ranged = 0, []
+        session = self.__options.session
+        for url in self.urls:
+            try:
+                timeout = request_timeout(self.__options.token)
+                if session is not None:
+                    response = session.head(url, headers=_IDENTITY, timeout=timeout)
+                else:
+                    response = httpx.head(url, headers=_IDENTITY, timeout=timeout, follow_redirects=True)
+                response.raise_for_status()
+            except httpx.HTTPError as error:
+                logger.debug(f'Range probe for {url} failed: {error}')
+                continue
+
+            length = content_length(response)
+            if length and response.headers.get('accept-ranges', '').lower() == 'bytes' and size in (0, length):
+                size = length
+                ranged.append(url)
+
+        return size, ranged
+
+    def __segmented(self, timer: PhaseTimer | None) -> Path:
+        """Fetches byte ranges of the file from different mirrors in parallel."""
+
+        size, urls = self.__probe()
+        count = min(self.__segments, size // MIN_SEGMENT_SIZE)
+        if count < 2:
+            logger.debug(f'Not segmenting {self.destination.name}: file too small or ranges unsupported.')
+            return self.__failover(timer)
+
+        if self.__existing == size:
+            return self.__complete(None)
+
+        self.__tracker.expect(size)
+        part_path = _part_path(self.destination, 0)
+        with open(part_path, 'wb') as file:
+            file.truncate(size)
+
+        bounds = [size * segment // count for segment in range(count + 1)]
+        try:
+            self.__fetch_segments(part_path, urls, bounds)
+        except BaseException:
+            _discard(part_path)
+            raise
+
+        return self.__complete(part_path)
+
+    def __fetch_segments(self, part_path: Path, urls: List[str], bounds: List[int]) -> None:
+        """Fetches the byte range between each pair of consecutive `bounds` into `part_path`, from `urls`."""
+
+        count = len(bounds) - 1
+        requests: List[_Request] = []
+        lock = threading.Lock()
+        stopped = threading.Event()
+
+        def fetch_segment(segment: int) -> None:
+            errors: List[DownloadError] = []
+            for offset in range(len(urls)):
+                url = urls[(segment + offset) % len(urls)]
+                with lock:
+                    if stopped.is_set():
+                        raise _Cancelled()
+                    request = _Request(url, self.__options)
+                    requests.append(request)
+                try:
+                    request.fetch(
+                        part_path,
+                        lambda _: True,
+                        lambda position: self.__tracker.update(segment, position),
+                        byte_range=(bounds[segment], bounds[segment + 1] - 1),
+                    )
+                    return
+                except httpx.HTTPError as error:
+                    errors.append(_wrap_error(url, error))
+                    logger.warning(f'Mirror {url} failed for segment {segment} of {self.destination.name}: {error}')
+
+            raise self.__fail(errors)
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(fetch_segment, segment) for segment in range(count)]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failure = next((future.exception() for future in done if future.exception()), None)
+            if failure is not None:
+                with lock:
+                    stopped.set()
+                    for request in requests:
+                        request.cancel()
+                raise failure
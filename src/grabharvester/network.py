@@ -0,0 +1,421 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: network.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""A shared HTTP session with DNS caching and connection pre-warming.
+
+By default every request builds its own httpx client, so each transfer pays for
+an SSL context, a DNS lookup, a TCP connection and a TLS handshake on the
+worker's critical path. An `HttpSession` shares one client between the workers
+of a `DownloadService`: connections are kept alive and reused, host names are
+resolved through a `DnsCache` and `prewarm` opens the connection to a host
+before the transfer that needs it, so `DownloadManager` can overlap connection
+setup with the transfers still running. Requests that must be aborted on their
+own, such as those racing other mirrors, get a client with connections of its
+own from `client`, still sharing the DNS cache and the SSL context.
+"""
+
+import ipaddress
+import socket
+import ssl
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import ContextManager, Dict, Iterable, Iterator, List, Tuple
+
+import httpcore
+import httpx
+from loguru import logger
+
+from .dedup import SingleFlight
+from .streaming import REQUEST_TIMEOUT
+
+# Seconds a resolved host name is reused; the system resolver does not expose the record TTL.
+DEFAULT_DNS_TTL = 300.0
+
+# Seconds a failed resolution is remembered, so a dead host does not cost a lookup per task.
+DEFAULT_NEGATIVE_TTL = 30.0
+
+# Number of host names cached before the cache is reset, bounding its memory.
+DEFAULT_MAX_HOSTS = 65536
+
+# Seconds an idle connection is kept open for the next request to the same host.
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
+# A client certificate file, or the certificate, key and optional password files, as in httpx.
+CertTypes = str | Tuple[str, str] | Tuple[str, str, str]
+
+# httpx errors raised for httpcore errors, most specific first.
+_MAPPED_ERRORS: Tuple[Tuple[type, type], ...] = (
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.ProxyError, httpx.ProxyError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+)
+
+
+def _is_address(host: str) -> bool:
+    """Whether `host` is an IP address rather than a name."""
+
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+    except ValueError:
+        return False
+
+    return True
+
+
+# pylint: disable=too-few-public-methods
+class DnsCache:
+    """A thread-safe cache of host name resolutions, shared by the workers.
+
+    Concurrent lookups of the same host are coalesced into one. Failed lookups
+    are cached too, for a shorter time.
+
+    Attributes:
+        ttl(float): Seconds a resolution is reused.
+        negative_ttl(float): Seconds a failed resolution is remembered.
+        __entries(Dict[str, Tuple[float, List[str] | socket.gaierror]]): Expiry and outcome, by host.
+        __max_hosts(int): Size at which the cache is reset.
+        __flights(SingleFlight): Coalesces concurrent lookups of a host.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_DNS_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        max_hosts: int = DEFAULT_MAX_HOSTS,
+    ) -> None:
+        """Initializes an empty cache.
+
+        Arguments:
+            ttl(float): Seconds a resolution is reused (default: 300).
+            negative_ttl(float): Seconds a failed resolution is remembered (default: 30).
+            max_hosts(int): Number of hosts cached before the cache is reset (default: 65536).
+        """
+
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.__entries: Dict[str, Tuple[float, List[str] | socket.gaierror]] = {}
+        self.__max_hosts = max_hosts
+        self.__flights = SingleFlight()
+
+    def resolve(self, host: str, port: int) -> List[str]:
+        """Returns the addresses of `host`, from the cache while they are fresh.
+
+        Arguments:
+            host(str): The host name, or an IP address returned as is.
+            port(int): The port to connect to.
+
+        Returns:
+            List[str]: The addresses of the host, in the order of the system resolver.
+        Raises:
+            socket.gaierror: If the host cannot be resolved, or could not be recently.
+        """
+
+        if _is_address(host):
+            return [host.strip('[]')]
+
+        entry = self.__entries.get(host)
+        if entry is None or entry[0] <= time.monotonic():
+            return self.__flights.do(host, self.__lookup, host, port)
+
+        outcome = entry[1]
+        if isinstance(outcome, socket.gaierror):
+            raise socket.gaierror(*outcome.args)
+
+        return outcome
+
+    def __lookup(self, host: str, port: int) -> List[str]:
+        """Resolves `host` with the system resolver and caches the outcome."""
+
+        if len(self.__entries) >= self.__max_hosts:
+            self.__entries.clear()
+
+        try:
+            infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as error:
+            self.__entries[host] = (time.monotonic() + self.negative_ttl, error)
+            raise
+
+        addresses = list(dict.fromkeys(str(info[4][0]) for info in infos))
+        self.__entries[host] = (time.monotonic() + self.ttl, addresses)
+
+        return addresses
+
+
+class _ResolvingBackend(httpcore.SyncBackend):
+    """Opens TCP connections to the addresses given by a `DnsCache`, trying each in turn.
+
+    TLS still verifies and sends the host name of the URL, not the address.
+    """
+
+    def __init__(self, resolver: DnsCache) -> None:
+        self.__resolver = resolver
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: float | None = None,
+        local_address: str | None = None,
+        socket_options: Iterable | None = None,
+    ) -> httpcore.NetworkStream:
+        """Connects to the first reachable address of `host`."""
+
+        try:
+            addresses = self.__resolver.resolve(host, port)
+        except OSError as error:
+            raise httpcore.ConnectError(f'Cannot resolve {host}: {error}') from error
+
+        socket_options = list(socket_options or ())
+        error: httpcore.ConnectError | None = None
+        for address in addresses:
+            try:
+                return super().connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as connect_error:
+                error = connect_error
+
+        raise error or httpcore.ConnectError(f'No address for {host}.')
+
+
+@contextmanager
+def _httpx_errors() -> Iterator[None]:
+    """Raises the httpx error matching an httpcore error, as `httpx.HTTPTransport` does."""
+
+    try:
+        yield
+    except Exception as error:
+        for source, target in _MAPPED_ERRORS:
+            if isinstance(error, source):
+                raise target(str(error)) from error
+        raise
+
+
+class _ResponseStream(httpx.SyncByteStream):
+    """The body of a response from an httpcore pool, with its errors mapped to httpx ones."""
+
+    def __init__(self, stream: Iterable[bytes]) -> None:
+        self.__stream = stream
+
+    def __iter__(self) -> Iterator[bytes]:
+        with _httpx_errors():
+            yield from self.__stream
+
+    def close(self) -> None:
+        close = getattr(self.__stream, 'close', None)
+        if close is not None:
+            close()
+
+
+class _PoolTransport(httpx.BaseTransport):
+    """An httpx transport sending requests through its own httpcore connection pool."""
+
+    def __init__(self, pool: httpcore.ConnectionPool) -> None:
+        self.__pool = pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Sends `request` through the pool."""
+
+        url = request.url
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(scheme=url.raw_scheme, host=url.raw_host, port=url.port, target=url.raw_path),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors():
+            response = self.__pool.handle_request(core_request)
+
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        """Closes every connection of the pool."""
+
+        self.__pool.close()
+
+
+# pylint: disable=too-many-arguments
+def _connection_pool(
+    backend: httpcore.SyncBackend,
+    ssl_context: ssl.SSLContext,
+    proxy: str | None,
+    *,
+    max_connections: int | None,
+    keepalive_expiry: float,
+    **options,
+) -> httpcore.ConnectionPool:
+    """Builds an httpcore connection pool opening its connections through `backend`.
+
+    Raises:
+        ValueError: If `proxy` is not an HTTP or HTTPS proxy URL.
+    """
+
+    limits = {
+        'max_connections': max_connections,
+        'max_keepalive_connections': max_connections,
+        'keepalive_expiry': keepalive_expiry,
+    }
+    if proxy is None:
+        return httpcore.ConnectionPool(ssl_context=ssl_context, network_backend=backend, **limits, **options)
+
+    proxy_config = httpx.Proxy(proxy)
+    if proxy_config.url.scheme not in ('http', 'https'):
+        raise ValueError(f'Unsupported proxy: {proxy!r}. Expected an http:// or https:// URL.')
+
+    proxy_url = proxy_config.url
+    return httpcore.HTTPProxy(
+        proxy_url=httpcore.URL(
+            scheme=proxy_url.raw_scheme, host=proxy_url.raw_host, port=proxy_url.port, target=proxy_url.raw_path
+        ),
+        proxy_auth=proxy_config.raw_auth,
+        proxy_headers=proxy_config.headers.raw,
+        ssl_context=ssl_context,
+        network_backend=backend,
+        **limits,
+        **options,
+    )
+
+
+class HttpSession:
+    """An HTTP client shared by the workers of a `DownloadService`.
+
+    Attributes:
+        resolver(DnsCache): Resolves the host names of every connection.
+        __new_pool(Callable[..., httpcore.ConnectionPool]): Builds a connection pool with the session settings.
+        __client(httpx.Client): The shared, thread-safe client.
+    """
+
+    # pylint: disable=too-many-arguments, too-many-locals
+    def __init__(
+        self,
+        *,
+        resolver: DnsCache | None = None,
+        max_connections: int = 100,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        verify: ssl.SSLContext | str | bool = True,
+        cert: CertTypes | None = None,
+        trust_env: bool = True,
+        http2: bool = False,
+        proxy: str | None = None,
+        retries: int = 0,
+        local_address: str | None = None,
+        socket_options: Iterable[Tuple] | None = None,
+    ) -> None:
+        """Initializes the session.
+
+        Arguments:
+            resolver(DnsCache | None): Resolves host names, and may be shared with other
+                                       sessions (default: a new `DnsCache`).
+            max_connections(int): Maximum number of open connections, idle ones included (default: 100).
+            keepalive_expiry(float): Seconds an idle connection is kept for reuse (default: 30).
+            verify(ssl.SSLContext | str | bool): Verifies the server certificates, as in httpx (default: True).
+            cert(CertTypes | None): Client certificate file, or (certificate, key[, password]), as in httpx
+                                    (default: none).
+            trust_env(bool): Whether SSL_CERT_FILE and SSL_CERT_DIR are honored (default: True).
+            http2(bool): Whether HTTP/2 is offered; it needs the `h2` package (default: False).
+            proxy(str | None): URL of an HTTP or HTTPS proxy; with one, only the proxy host goes through
+                               the DNS cache. Proxy environment variables are not read (default: none).
+            retries(int): Number of retries of a failed connection attempt (default: 0).
+            local_address(str | None): Local address to connect from (default: any).
+            socket_options(Iterable[Tuple] | None): Options set on every socket (default: none).
+
+        Raises:
+            ValueError: If `proxy` is not an HTTP or HTTPS proxy URL.
+        """
+
+        self.resolver = resolver or DnsCache()
+        self.__new_pool = partial(
+            _connection_pool,
+            _ResolvingBackend(self.resolver),
+            httpx.create_ssl_context(verify=verify, cert=cert, trust_env=trust_env),
+            proxy,
+            keepalive_expiry=keepalive_expiry,
+            http2=http2,
+            retries=retries,
+            local_address=local_address,
+            socket_options=socket_options,
+        )
+        self.__client = httpx.Client(
+            transport=_PoolTransport(self.__new_pool(max_connections=max_connections)), timeout=REQUEST_TIMEOUT
+        )
+
+    def stream(
+        self,
+        url: str,
+        *,
+        headers: Dict[str, str],
+        timeout: float,
+        extensions: Dict[str, object] | None = None,
+    ) -> ContextManager[httpx.Response]:
+        """Same as `httpx.stream('GET', url)`, through the shared client."""
+
+        return self.__client.stream('GET', url, headers=headers, timeout=timeout, extensions=extensions)
+
+    def head(self, url: str, *, headers: Dict[str, str] | None = None, timeout: float) -> httpx.Response:
+        """Same as `httpx.head(url, follow_redirects=True)`, through the shared client."""
+
+        return self.__client.head(url, headers=headers, timeout=timeout, follow_redirects=True)
+
+    def client(self, timeout: float) -> httpx.Client:
+        """Returns a new client with connections of its own, for a request that may be aborted by closing it.
+
+        The client resolves host names through the DNS cache of the session and shares its
+        SSL context, proxy and connection options; the caller closes it.
+        """
+
+        return httpx.Client(transport=_PoolTransport(self.__new_pool(max_connections=None)), timeout=timeout)
+
+    def prewarm(self, url: str) -> None:
+        """Resolves the host of `url` and opens a connection to it, left idle for the next request.
+
+        httpcore cannot open a pooled connection without a request, so the connection is
+        opened by a HEAD request for the root of the origin, '/', never for `url` itself;
+        redirects are not followed. Failures are only logged: the download itself reports them.
+        """
+
+        try:
+            origin = httpx.URL(url).copy_with(path='/', query=None, fragment=None)
+            self.__client.head(origin, follow_redirects=False)
+        except (httpx.HTTPError, OSError, ValueError) as error:
+            logger.debug(f'Pre-warming the connection for {url} failed: {error}')
+
+    def close(self) -> None:
+        """Closes every connection."""
+
+        self.__client.close()
+
+    def __enter__(self) -> 'HttpSession':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
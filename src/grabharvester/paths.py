@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: paths.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Helpers that map URLs to local file paths.
+
+Besides the filename logic shared by the whole package, this module provides
+directory layouts that shard huge output trees into many small directories, and
+a process-wide cache of the directories already created, so writing millions of
+files does not cost a `mkdir` syscall per file.
+"""
+
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Set
+
+from .interfaces import DirectoryLayoutProtocol
+
+# Filename used when the URL does not end with a usable path segment.
+DEFAULT_FILENAME = 'downloaded_file'
+
+
+def filename_from_url(url: str) -> str:
+    """Returns the filename a URL is saved under: its last path segment, without query string.
+
+    Arguments:
+        url(str): The URL of the file to download.
+
+    Returns:
+        str: The filename, or `DEFAULT_FILENAME` if the URL ends with a slash.
+    """
+
+    return url.split('/')[-1].split('?')[0] or DEFAULT_FILENAME
+
+
+class DirectoryCache:
+    """Process-wide record of the directories known to exist.
+
+    Lookups and insertions rely on the atomicity of `set` operations, so no lock
+    is taken; two threads racing on a new directory both call `mkdir`, which is
+    harmless with `exist_ok=True`.
+
+    Attributes:
+        __known(Set[Path]): Directories created or observed by this process.
+        __max_entries(int): Size at which the cache is reset, bounding its memory.
+    """
+
+    def __init__(self, max_entries: int = 1_000_000) -> None:
+        """Initializes an empty cache.
+
+        Arguments:
+            max_entries(int): Size at which the cache is reset (default: 1,000,000).
+        """
+
+        self.__known: Set[Path] = set()
+        self.__max_entries = max_entries
+
+    def __len__(self) -> int:
+        return len(self.__known)
+
+    def ensure(self, directory: Path) -> None:
+        """Creates `directory` and its parents, unless already known to exist.
+
+        Raises:
+            OSError: If the directory cannot be created.
+        """
+
+        if directory in self.__known:
+            return
+
+        directory.mkdir(parents=True, exist_ok=True)
+
+        if len(self.__known) >= self.__max_entries:
+            self.__known.clear()
+
+        self.__known.add(directory)
+        self.__known.update(directory.parents)
+
+    def is_dir(self, path: Path) -> bool:
+        """Returns True if `path` is a directory, without a syscall for known directories."""
+
+        if path in self.__known:
+            return True
+
+        return path.is_dir()
+
+    def discard(self, directory: Path) -> None:
+        """Forgets `directory`, e.g. after it turned out to have been removed."""
+
+        self.__known.discard(directory)
+
+    def clear(self) -> None:
+        """Forgets every directory."""
+
+        self.__known.clear()
+
+
+# NOTE: Shared by every service and manager in the process.
+DIRECTORY_CACHE = DirectoryCache()
+
+
+def ensure_directory(directory: Path) -> None:
+    """Creates `directory` and its parents through the process-wide cache."""
+
+    DIRECTORY_CACHE.ensure(directory)
+
+
+# pylint: disable=too-few-public-methods
+class FlatLayout:
+    """Places every file directly in the destination directory (the default)."""
+
+    def place(self, directory: Path, url: str) -> Path:
+        """Returns `directory / filename`."""
+
+        return directory / filename_from_url(url)
+
+
+_FLAT_LAYOUT = FlatLayout()
+
+
+# pylint: disable=too-few-public-methods
+class HashPrefixLayout:
+    """Shards files into `ab/cd/filename` style subdirectories.
+
+    The prefixes come from a hash of the filename, so files spread evenly over
+    the shards and the directory of any file can be computed from its name.
+    """
+
+    def __init__(self, levels: int = 2, width: int = 2) -> None:
+        """Initializes the layout.
+
+        Arguments:
+            levels(int): Number of nested shard directories (default: 2).
+            width(int): Hex characters per shard directory name (default: 2, i.e. 256 per level).
+        """
+
+        if levels < 1 or width < 1 or levels * width > 32:
+            raise ValueError(f'Invalid hash prefix layout: levels={levels}, width={width}')
+
+        self.__levels = levels
+        self.__width = width
+
+    def place(self, directory: Path, url: str) -> Path:
+        """Returns `directory / <prefix> / ... / filename`."""
+
+        filename = filename_from_url(url)
+        digest = hashlib.blake2b(filename.encode('utf-8'), digest_size=16).hexdigest()
+        width = self.__width
+        shards = [digest[level * width : (level + 1) * width] for level in range(self.__levels)]
+
+        return directory.joinpath(*shards, filename)
+
+
+# pylint: disable=too-few-public-methods
+class DateLayout:
+    """Shards files by download date, e.g. `2024/05/17/filename`."""
+
+    def __init__(self, date_format: str = '%Y/%m/%d', clock: Callable[[], datetime] | None = None) -> None:
+        """Initializes the layout.
+
+        Arguments:
+            date_format(str): `strftime` format of the subdirectory; '/' nests directories
+                              (default: '%Y/%m/%d').
+            clock(Callable[[], datetime] | None): Returns the current time (default: now in UTC).
+        """
+
+        self.__date_format = date_format
+        self.__clock = clock or (lambda: datetime.now(timezone.utc))
+
+    def place(self, directory: Path, url: str) -> Path:
+        """Returns `directory / <date> / filename`."""
+
+        return directory / self.__clock().strftime(self.__date_format) / filename_from_url(url)
+
+
+def resolve_destination(url: str, file_path: Path | None = None, layout: DirectoryLayoutProtocol | None = None) -> Path:
+    """Returns the local file path a download of `url` is written to.
+
+    Arguments:
+        url(str): The URL of the file to download.
+        file_path(Path | None): The local file path or directory. If None, uses system temp dir.
+        layout(DirectoryLayoutProtocol | None): Places the file when `file_path` is a directory
+                                                (default: directly inside it).
+
+    Returns:
+        Path: The full path of the destination file.
+    """
+
+    if file_path is None:
+        file_path = Path(tempfile.gettempdir())
+
+    if DIRECTORY_CACHE.is_dir(file_path):
+        file_path = (layout or _FLAT_LAYOUT).place(file_path, url)
+
+    return file_path
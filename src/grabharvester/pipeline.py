@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: pipeline.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Pipelined disk writes, decoupling the network threads from slow storage.
+
+Network threads copy the chunks they receive into pooled buffers and hand full
+buffers to a small pool of writer threads through bounded queues. Fetching and
+writing thus overlap, and when the disk falls behind, the full queues block the
+network threads instead of piling data up in memory.
+
+All the writes of a file go through the same writer, so they happen in order
+without positional writes or locks.
+"""
+
+import itertools
+import queue
+import threading
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO, Callable, List, Type
+
+from .streaming import open_for_writing
+
+# Size of the pooled buffers, and thus of each disk write.
+DEFAULT_BUFFER_SIZE = 256 * 1024
+
+# Number of writer threads.
+DEFAULT_WRITERS = 2
+
+# Number of full buffers waiting to be written, across all writers.
+DEFAULT_QUEUE_DEPTH = 32
+
+
+class BufferPool:
+    """Recycles fixed-size buffers between network and writer threads.
+
+    Attributes:
+        buffer_size(int): Size of each buffer, in bytes.
+        allocated(int): Number of buffers allocated so far.
+        __capacity(int): Maximum number of idle buffers kept for reuse.
+        __free(List[bytearray]): The idle buffers.
+    """
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE, capacity: int = DEFAULT_QUEUE_DEPTH) -> None:
+        """Initializes an empty pool.
+
+        Arguments:
+            buffer_size(int): Size of each buffer, in bytes (default: 256 KiB).
+            capacity(int): Maximum number of idle buffers kept for reuse (default: 32).
+        """
+
+        self.buffer_size = buffer_size
+        self.allocated = 0
+        self.__capacity = capacity
+        self.__free: List[bytearray] = []
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> bytearray:
+        """Returns an idle buffer, allocating one if none is left."""
+
+        with self.__lock:
+            if self.__free:
+                return self.__free.pop()
+            self.allocated += 1
+
+        return bytearray(self.buffer_size)
+
+    def release(self, buffer: bytearray) -> None:
+        """Returns a buffer to the pool, or drops it if the pool is full."""
+
+        with self.__lock:
+            if len(self.__free) < self.__capacity:
+                self.__free.append(buffer)
+
+
+# pylint: disable=too-many-instance-attributes
+class PipelinedFile:
+    """A file opened for writing through a `WriterPool`.
+
+    `write` only copies data into the current buffer; full buffers are written
+    by the writer thread of the file. Write errors are raised by the next
+    `write` or by `close`.
+    """
+
+    def __init__(self, path: Path, buffers: BufferPool, jobs: 'queue.Queue[Callable[[], None] | None]') -> None:
+        """Opens `path` for writing.
+
+        Arguments:
+            path(Path): The file to write.
+            buffers(BufferPool): Provides the buffers.
+            jobs(queue.Queue): Queue of the writer thread assigned to the file.
+        """
+
+        self.__file: BinaryIO = open_for_writing(path)
+        self.__buffers = buffers
+        self.__jobs = jobs
+        self.__buffer: bytearray | None = None
+        self.__filled = 0
+        self.__pending = 0
+        self.__error: BaseException | None = None
+        self.__condition = threading.Condition()
+
+    def write(self, data: bytes) -> None:
+        """Queues `data` for writing, blocking while the writer is too far behind.
+
+        Raises:
+            OSError: If an earlier write of the file failed.
+        """
+
+        view = memoryview(data)
+        while view:
+            if self.__buffer is None:
+                self.__buffer = self.__buffers.acquire()
+                self.__filled = 0
+
+            count = min(len(view), len(self.__buffer) - self.__filled)
+            self.__buffer[self.__filled : self.__filled + count] = view[:count]
+            self.__filled += count
+            view = view[count:]
+
+            if self.__filled == len(self.__buffer):
+                self.__submit()
+
+    def close(self) -> None:
+        """Writes the remaining data, waits for the writer and closes the file.
+
+        Raises:
+            OSError: If a write of the file failed.
+        """
+
+        try:
+            if self.__filled:
+                self.__submit()
+            self.__wait()
+        finally:
+            self.__discard_buffer()
+            self.__file.close()
+
+        if self.__error is not None:
+            raise self.__error
+
+    def abort(self) -> None:
+        """Drops the unsubmitted data, waits for the queued writes and closes the file."""
+
+        self.__discard_buffer()
+        self.__wait()
+        self.__file.close()
+
+    def __enter__(self) -> 'PipelinedFile':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __submit(self) -> None:
+        """Hands the current buffer to the writer thread."""
+
+        if self.__error is not None:
+            raise self.__error
+
+        buffer, length = self.__buffer, self.__filled
+        self.__buffer, self.__filled = None, 0
+
+        with self.__condition:
+            self.__pending += 1
+        # Blocks while the queue is full: this is the backpressure on the network side.
+        self.__jobs.put(lambda: self.__write(buffer, length))
+
+    def __write(self, buffer: bytearray, length: int) -> None:
+        """Writes a buffer; runs on the writer thread."""
+
+        error = None
+        try:
+            if self.__error is None:
+                with memoryview(buffer) as view:
+                    self.__file.write(view[:length])
+        except BaseException as exception:  # pylint: disable=broad-exception-caught
+            error = exception
+        finally:
+            self.__buffers.release(buffer)
+            with self.__condition:
+                if error is not None and self.__error is None:
+                    self.__error = error
+                self.__pending -= 1
+                self.__condition.notify_all()
+
+    def __wait(self) -> None:
+        """Waits until every submitted buffer was written."""
+
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__pending == 0)
+
+    def __discard_buffer(self) -> None:
+        """Returns the current, unsubmitted buffer to the pool."""
+
+        if self.__buffer is not None:
+            self.__buffers.release(self.__buffer)
+            self.__buffer, self.__filled = None, 0
+
+
+class WriterPool:
+    """A small pool of threads writing downloaded data to disk.
+
+    Attributes:
+        buffers(BufferPool): The buffers shared by the network and writer threads.
+        __queues(List[queue.Queue]): One bounded job queue per writer.
+        __threads(List[threading.Thread]): The writer threads.
+    """
+
+    def __init__(
+        self,
+        writers: int = DEFAULT_WRITERS,
+        queue_depth: int = DEFAULT_QUEUE_DEPTH,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ) -> None:
+        """Starts the writer threads.
+
+        Arguments:
+            writers(int): Number of writer threads (default: 2).
+            queue_depth(int): Number of full buffers that may wait for the writers before
+                              the network threads block (default: 32).
+            buffer_size(int): Size of each buffer, and thus of each disk write (default: 256 KiB).
+        """
+
+        writers = max(writers, 1)
+        depth = max(queue_depth // writers, 1)
+
+        self.buffers = BufferPool(buffer_size, capacity=depth * writers + writers)
+        self.__queues: List[queue.Queue[Callable[[], None] | None]] = [queue.Queue(depth) for _ in range(writers)]
+        self.__next_queue = itertools.cycle(self.__queues)
+        self.__lock = threading.Lock()
+        self.__threads = [
+            threading.Thread(target=self.__drain, args=(jobs,), name=f'grabharvester-writer-{number}', daemon=True)
+            for number, jobs in enumerate(self.__queues)
+        ]
+        for thread in self.__threads:
+            thread.start()
+
+    def open(self, path: Path) -> PipelinedFile:
+        """Opens `path` for writing through the pool."""
+
+        with self.__lock:
+            jobs = next(self.__next_queue)
+
+        return PipelinedFile(path, self.buffers, jobs)
+
+    def close(self) -> None:
+        """Stops the writer threads once the queued writes are done."""
+
+        for jobs in self.__queues:
+            jobs.put(None)
+        for thread in self.__threads:
+            thread.join()
+
+    def __enter__(self) -> 'WriterPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @staticmethod
+    def __drain(jobs: 'queue.Queue[Callable[[], None] | None]') -> None:
+        """Runs the jobs of one writer until it is stopped."""
+
+        while (job := jobs.get()) is not None:
+            job()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: profiling.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Per-phase timers and sampled stacks of the worker threads of a batch.
+
+A `Profiler` handed to `DownloadManager` splits the time of every transfer into
+phases — creating the HTTP client (SSL context included), TCP connect (including
+DNS), TLS handshake, sending the request, waiting for the response headers,
+reading the body, writing it and reporting progress — using the httpx trace
+extension for the connection steps. What is left, mostly Python overhead, is
+reported as 'other'. It can also sample the stacks of the workers, producing
+collapsed stacks for flamegraph tools.
+
+Nothing is timed while no profiler is attached: the download loop only checks
+once per transfer whether the current thread is being profiled.
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import FrameType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple, TypeVar
+
+import httpx
+
+_T = TypeVar('_T')
+
+# Phases of a transfer, in the order they happen.
+TRANSFER_PHASES = ('client', 'connect', 'tls', 'request', 'wait', 'read', 'write', 'progress')
+
+# Time of a transfer outside the phases above.
+OTHER_PHASE = 'other'
+
+# Time spent on the calling thread handling settled tasks (progress bar, events, results).
+SETTLE_PHASE = 'settle'
+
+# Whole duration of a transfer on a worker.
+TRANSFER = 'transfer'
+
+# httpcore trace steps and the phase they belong to.
+_TRACED_STEPS = {
+    'connect_tcp': 'connect',
+    'start_tls': 'tls',
+    'send_request_headers': 'request',
+    'send_request_body': 'request',
+    'receive_response_headers': 'wait',
+}
+
+# The profiler of the transfer running on each thread, if any.
+_ACTIVE = threading.local()
+
+
+class PhaseTimer:
+    """Accumulates the time one thread spends in each phase.
+
+    A timer is only used by its own thread, so it needs no lock.
+
+    Attributes:
+        seconds(Dict[str, float]): Total time per phase.
+        counts(Dict[str, int]): Number of timed intervals per phase.
+    """
+
+    __slots__ = ('seconds', 'counts', '__started')
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.__started: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Adds `seconds` to `phase`."""
+
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def merge(self, other: 'PhaseTimer') -> None:
+        """Adds the phases of `other`, the timer of a helper thread that has finished."""
+
+        for phase, seconds in other.seconds.items():
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+            self.counts[phase] = self.counts.get(phase, 0) + other.counts.get(phase, 0)
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """Times the body of the `with` statement as `phase`."""
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - started)
+
+    def wrap(self, phase: str, function: Callable[..., _T]) -> Callable[..., _T]:
+        """Returns `function`, timing each call as `phase`."""
+
+        def timed(*args: Any) -> _T:
+            started = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                self.add(phase, time.perf_counter() - started)
+
+        return timed
+
+    def iterate(self, phase: str, iterable: Iterable[_T]) -> Iterator[_T]:
+        """Yields the items of `iterable`, timing the wait for each one as `phase`."""
+
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(phase, time.perf_counter() - started)
+                return
+            self.add(phase, time.perf_counter() - started)
+            yield item
+
+    def trace(self, event_name: str, info: Dict[str, Any]) -> None:  # pylint: disable=unused-argument
+        """An httpx trace extension timing the connection steps, e.g. 'connection.start_tls.complete'."""
+
+        parts = event_name.split('.')
+        if len(parts) != 3 or parts[1] not in _TRACED_STEPS:
+            return
+
+        step, state = parts[1], parts[2]
+        if state == 'started':
+            self.__started[step] = time.perf_counter()
+        elif step in self.__started:
+            self.add(_TRACED_STEPS[step], time.perf_counter() - self.__started.pop(step))
+
+
+class ProfileReport(NamedTuple):
+    """Where the time of the profiled batches went.
+
+    Attributes:
+        wall_time: Seconds during which at least one profiled batch was running.
+        workers: Seconds per phase, by thread name, including the 'transfer' total
+                 and the 'other' remainder of each worker.
+        samples: Number of samples per collapsed stack, if sampling was enabled.
+    """
+
+    wall_time: float
+    workers: Dict[str, Dict[str, float]]
+    samples: Dict[str, int]
+
+    def totals(self) -> Dict[str, float]:
+        """Returns the seconds per phase, summed over every thread."""
+
+        totals: Dict[str, float] = {}
+        for phases in self.workers.values():
+            for phase, seconds in phases.items():
+                totals[phase] = totals.get(phase, 0.0) + seconds
+
+        return totals
+
+    def format(self) -> str:
+        """Returns the breakdown as a table, one row per phase."""
+
+        totals = self.totals()
+        busy = totals.get(TRANSFER, 0.0)
+        workers = sum(1 for phases in self.workers.values() if TRANSFER in phases)
+        utilization = busy / (self.wall_time * workers) if self.wall_time and workers else 0.0
+
+        lines = [
+            f'Wall time: {self.wall_time:.3f} s, {workers} workers busy {utilization:.1%} of the time.',
+            f'{"phase":<10} {"seconds":>10} {"share":>8}',
+        ]
+        for phase in (*TRANSFER_PHASES, OTHER_PHASE):
+            seconds = totals.get(phase, 0.0)
+            share = seconds / busy if busy else 0.0
+            lines.append(f'{phase:<10} {seconds:>10.3f} {share:>8.1%}')
+        lines.append(f'{SETTLE_PHASE:<10} {totals.get(SETTLE_PHASE, 0.0):>10.3f} {"(caller)":>8}')
+
+        return '\n'.join(lines)
+
+    def collapsed(self) -> List[str]:
+        """Returns collapsed stacks ('frame;frame count' lines) for flamegraph tools.
+
+        These are the sampled stacks if sampling was enabled, otherwise the phases of
+        each thread weighted in microseconds.
+        """
+
+        if self.samples:
+            return [f'{stack} {count}' for stack, count in sorted(self.samples.items())]
+
+        lines = []
+        for name, phases in sorted(self.workers.items()):
+            for phase, seconds in phases.items():
+                if phase == TRANSFER:
+                    continue
+                if phase == OTHER_PHASE:
+                    stack = f'{name};{TRANSFER}'
+                elif phase == SETTLE_PHASE:
+                    stack = f'{name};{phase}'
+                else:
+                    stack = f'{name};{TRANSFER};{phase}'
+                lines.append(f'{stack} {round(seconds * 1_000_000)}')
+
+        return lines
+
+    def write_collapsed(self, path: Path) -> None:
+        """Writes the collapsed stacks to `path`, e.g. for `flamegraph.pl` or speedscope."""
+
+        path.write_text(''.join(f'{line}\n' for line in self.collapsed()), encoding='utf-8')
+
+
+# pylint: disable=too-many-instance-attributes
+class Profiler:
+    """Collects the phase timers, and optionally stack samples, of the workers of profiled batches.
+
+    A profiler may be shared by several batches; their wall time adds up while none overlap.
+
+    Attributes:
+        __sample_interval(float | None): Seconds between two stack samples, or None not to sample.
+        __timers(List[Tuple[str, PhaseTimer]]): The timer of every profiled thread, with its name.
+        __threads(Dict[int, str]): Names of the profiled worker threads, by thread id.
+        __samples(Dict[str, int]): Number of samples per collapsed stack.
+    """
+
+    def __init__(self, *, sample_interval: float | None = None) -> None:
+        """Initializes an empty profiler.
+
+        Arguments:
+            sample_interval(float | None): Seconds between two samples of the worker stacks, e.g.
+                                           0.005; sampling costs some CPU, so it is off by default.
+        """
+
+        self.__sample_interval = sample_interval
+        self.__timers: List[Tuple[str, PhaseTimer]] = []
+        self.__threads: Dict[int, str] = {}
+        self.__samples: Dict[str, int] = {}
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__running = 0
+        self.__started = 0.0
+        self.__wall_time = 0.0
+        self.__stopped = threading.Event()
+        self.__sampler: threading.Thread | None = None
+
+    def timer(self) -> PhaseTimer:
+        """Returns the timer of the current thread."""
+
+        timer = getattr(self.__local, 'timer', None)
+        if timer is None:
+            timer = self.__local.timer = PhaseTimer()
+            with self.__lock:
+                self.__timers.append((threading.current_thread().name, timer))
+
+        return timer
+
+    @contextmanager
+    def activate(self) -> Iterator[PhaseTimer]:
+        """Profiles the transfers of the current thread within the `with` statement."""
+
+        thread = threading.current_thread()
+        self.__threads[thread.ident] = thread.name
+        previous = getattr(_ACTIVE, 'profiler', None)
+        _ACTIVE.profiler = self
+        try:
+            yield self.timer()
+        finally:
+            _ACTIVE.profiler = previous
+
+    def start(self) -> None:
+        """Marks the start of a profiled batch."""
+
+        with self.__lock:
+            self.__running += 1
+            if self.__running > 1:
+                return
+            self.__started = time.perf_counter()
+            if self.__sample_interval:
+                self.__stopped.clear()
+                self.__sampler = threading.Thread(target=self.__sample, name='grabharvester-sampler', daemon=True)
+                self.__sampler.start()
+
+    def stop(self) -> None:
+        """Marks the end of a profiled batch."""
+
+        with self.__lock:
+            self.__running -= 1
+            if self.__running > 0:
+                return
+            self.__wall_time += time.perf_counter() - self.__started
+            sampler, self.__sampler = self.__sampler, None
+
+        if sampler is not None:
+            self.__stopped.set()
+            sampler.join()
+
+    def report(self) -> ProfileReport:
+        """Returns what was measured so far."""
+
+        workers: Dict[str, Dict[str, float]] = {}
+        with self.__lock:
+            timers = list(self.__timers)
+            samples = dict(self.__samples)
+
+        for name, timer in timers:
+            phases = workers.setdefault(name, {})
+            for phase, seconds in dict(timer.seconds).items():
+                phases[phase] = phases.get(phase, 0.0) + seconds
+
+        for phases in workers.values():
+            if TRANSFER in phases:
+                timed = sum(phases.get(phase, 0.0) for phase in TRANSFER_PHASES)
+                phases[OTHER_PHASE] = max(phases[TRANSFER] - timed, 0.0)
+
+        return ProfileReport(wall_time=self.__wall_time, workers=workers, samples=samples)
+
+    def __sample(self) -> None:
+        """Samples the stacks of the worker threads until the last batch stops."""
+
+        while not self.__stopped.wait(self.__sample_interval):
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            for ident, name in list(self.__threads.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    stack = f'{name};{_collapse(frame)}'
+                    with self.__lock:
+                        self.__samples[stack] = self.__samples.get(stack, 0) + 1
+
+
+def _collapse(frame: FrameType | None) -> str:
+    """Returns the stack ending at `frame` as 'module:function;...' from the outermost frame."""
+
+    names = []
+    while frame is not None:
+        names.append(f'{frame.f_globals.get("__name__", "?")}:{frame.f_code.co_qualname}')
+        frame = frame.f_back
+
+    return ';'.join(reversed(names))
+
+
+def active_timer() -> PhaseTimer | None:
+    """Returns the timer of the current thread if its transfer is being profiled."""
+
+    profiler = getattr(_ACTIVE, 'profiler', None)
+
+    return profiler.timer() if profiler is not None else None
+
+
+@contextmanager
+def traced_stream(url: str, *, headers: Dict[str, str], timeout: float, timer: PhaseTimer) -> Iterator[httpx.Response]:
+    """Same as `httpx.stream('GET', url)`, with the connection steps timed by `timer`."""
+
+    with timer.measure('client'):
+        client = httpx.Client(timeout=timeout)
+    with client:
+        with client.stream('GET', url, headers=headers, extensions={'trace': timer.trace}) as response:
+            yield response
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: progress.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Byte-level progress reporting for download batches.
+
+Workers count bytes into a per-transfer `TransferProgress`, which only talks to
+the shared reporter once enough bytes have accumulated. The hot path is thus a
+single integer addition and comparison per chunk.
+"""
+
+import sys
+import threading
+import time
+from typing import Callable, NamedTuple, Union
+
+from loguru import logger
+from tqdm import tqdm
+
+from .interfaces import ProgressReporterProtocol
+
+# Number of bytes a transfer accumulates before forwarding them to the reporter.
+DEFAULT_FLUSH_BYTES = 1024 * 1024
+
+
+class ProgressSnapshot(NamedTuple):
+    """Aggregated progress of a download batch.
+
+    Attributes:
+        bytes_done: Bytes downloaded so far, across all workers.
+        bytes_total: Expected bytes, as far as known from `Content-Length` headers.
+        tasks_done: Number of finished tasks.
+        tasks_total: Number of tasks in the batch.
+    """
+
+    bytes_done: int
+    bytes_total: int
+    tasks_done: int
+    tasks_total: int
+
+
+class TransferProgress:
+    """Batches the byte count of a single transfer before reporting it.
+
+    Attributes:
+        __reporter(ProgressReporterProtocol): The shared batch reporter.
+        __flush_bytes(int): Pending bytes that trigger a flush to the reporter.
+        __pending(int): Bytes received but not yet reported.
+    """
+
+    __slots__ = ('__reporter', '__flush_bytes', '__pending')
+
+    def __init__(self, reporter: ProgressReporterProtocol, flush_bytes: int = DEFAULT_FLUSH_BYTES) -> None:
+        """Initializes the transfer counter.
+
+        Arguments:
+            reporter(ProgressReporterProtocol): The shared batch reporter.
+            flush_bytes(int): Pending bytes that trigger a flush (default: 1 MiB).
+        """
+
+        self.__reporter = reporter
+        self.__flush_bytes = flush_bytes
+        self.__pending = 0
+
+    def expect(self, total_bytes: int) -> None:
+        """Announce the expected size of the transfer."""
+
+        self.__reporter.add_total_bytes(total_bytes)
+
+    def advance(self, count: int) -> None:
+        """Record that `count` more bytes were received."""
+
+        self.__pending += count
+        if self.__pending >= self.__flush_bytes:
+            self.flush()
+
+    def flush(self) -> None:
+        """Forward the pending byte count to the reporter."""
+
+        if self.__pending:
+            self.__reporter.advance_bytes(self.__pending)
+            self.__pending = 0
+
+    def decoded(self, count: int) -> None:
+        """Record that the compressed body of the transfer decoded to `count` bytes."""
+
+        record = getattr(self.__reporter, 'add_decoded_bytes', None)
+        if record is not None:
+            record(count)
+
+
+class AggregatingProgressReporter:
+    """Base reporter that aggregates updates from all workers under a lock.
+
+    Subclasses implement `_emit` to present a snapshot, and may override
+    `_finish` to present the final state of the batch.
+    """
+
+    def __init__(self) -> None:
+        """Initializes the aggregated counters."""
+
+        self._lock = threading.Lock()
+        self._bytes_done = 0
+        self._bytes_total = 0
+        self._tasks_done = 0
+        self._tasks_total = 0
+
+    def start(self, total_tasks: int) -> None:
+        """Begin reporting a batch of `total_tasks` downloads."""
+
+        with self._lock:
+            self._bytes_done = 0
+            self._bytes_total = 0
+            self._tasks_done = 0
+            self._tasks_total = total_tasks
+
+    def add_total_bytes(self, count: int) -> None:
+        """Grow the expected byte total of the batch."""
+
+        with self._lock:
+            self._bytes_total += count
+
+    def advance_bytes(self, count: int) -> None:
+        """Record that `count` more bytes were downloaded."""
+
+        with self._lock:
+            self._bytes_done += count
+            self._emit(self._snapshot())
+
+    def task_done(self) -> None:
+        """Record that a download task finished."""
+
+        with self._lock:
+            self._tasks_done += 1
+            self._emit(self._snapshot())
+
+    def close(self) -> None:
+        """Finish reporting the current batch."""
+
+        with self._lock:
+            self._finish(self._snapshot())
+
+    def _snapshot(self) -> ProgressSnapshot:
+        """Returns the current aggregated state. Must be called with the lock held."""
+
+        return ProgressSnapshot(self._bytes_done, self._bytes_total, self._tasks_done, self._tasks_total)
+
+    def _emit(self, snapshot: ProgressSnapshot) -> None:
+        """Presents an intermediate snapshot."""
+
+    def _finish(self, snapshot: ProgressSnapshot) -> None:
+        """Presents the final snapshot of the batch."""
+
+        self._emit(snapshot)
+
+
+class TqdmProgressReporter(AggregatingProgressReporter):
+    """Displays a byte-level `tqdm` progress bar with a finished-files counter."""
+
+    def __init__(self, desc: str = 'Downloading files...') -> None:
+        """Initializes the reporter.
+
+        Arguments:
+            desc(str): Description shown next to the progress bar.
+        """
+
+        super().__init__()
+        self.__desc = desc
+        self.__bar: tqdm | None = None
+
+    def start(self, total_tasks: int) -> None:
+        """Opens a new progress bar for the batch."""
+
+        super().start(total_tasks)
+        self.__bar = tqdm(total=0, desc=self.__desc, unit='B', unit_scale=True, unit_divisor=1024)
+
+    def add_total_bytes(self, count: int) -> None:
+        """Grows the total of the progress bar."""
+
+        with self._lock:
+            self._bytes_total += count
+            if self.__bar is not None:
+                self.__bar.total = self._bytes_total
+
+    def advance_bytes(self, count: int) -> None:
+        """Advances the progress bar."""
+
+        with self._lock:
+            self._bytes_done += count
+            if self.__bar is not None:
+                self.__bar.update(count)
+
+    def _emit(self, snapshot: ProgressSnapshot) -> None:
+        """Refreshes the files counter of the progress bar."""
+
+        if self.__bar is not None:
+            self.__bar.set_postfix_str(f'files={snapshot.tasks_done}/{snapshot.tasks_total}')
+
+    def _finish(self, snapshot: ProgressSnapshot) -> None:
+        """Closes the progress bar."""
+
+        self._emit(snapshot)
+        if self.__bar is not None:
+            self.__bar.close()
+            self.__bar = None
+
+
+class LoggingProgressReporter(AggregatingProgressReporter):
+    """Logs the batch progress periodically, suitable for non-interactive jobs."""
+
+    def __init__(self, interval: float = 10.0) -> None:
+        """Initializes the reporter.
+
+        Arguments:
+            interval(float): Minimum number of seconds between two log lines (default: 10.0).
+        """
+
+        super().__init__()
+        self.__interval = interval
+        self.__last_log = 0.0
+
+    def start(self, total_tasks: int) -> None:
+        """Resets the log timer for the new batch."""
+
+        super().start(total_tasks)
+        self.__last_log = time.monotonic()
+
+    def _emit(self, snapshot: ProgressSnapshot) -> None:
+        """Logs the snapshot if the interval has elapsed."""
+
+        now = time.monotonic()
+        if now - self.__last_log >= self.__interval:
+            self.__last_log = now
+            self.__log(snapshot)
+
+    def _finish(self, snapshot: ProgressSnapshot) -> None:
+        """Always logs the final snapshot."""
+
+        self.__log(snapshot)
+
+    @staticmethod
+    def __log(snapshot: ProgressSnapshot) -> None:
+        """Writes a single progress line."""
+
+        logger.info(
+            f'Progress: {snapshot.tasks_done}/{snapshot.tasks_total} files, '
+            f'{snapshot.bytes_done}/{snapshot.bytes_total or "?"} bytes'
+        )
+
+
+class CallbackProgressReporter(AggregatingProgressReporter):
+    """Forwards every aggregated update to a user supplied callback.
+
+    The callback is invoked while the reporter lock is held, so it should return
+    quickly and must not call back into the reporter.
+    """
+
+    def __init__(self, callback: Callable[[ProgressSnapshot], None]) -> None:
+        """Initializes the reporter.
+
+        Arguments:
+            callback(Callable[[ProgressSnapshot], None]): Receives each aggregated snapshot.
+        """
+
+        super().__init__()
+        self.__callback = callback
+
+    def _emit(self, snapshot: ProgressSnapshot) -> None:
+        """Invokes the callback."""
+
+        self.__callback(snapshot)
+
+
+ProgressOption = Union[str, ProgressReporterProtocol, Callable[[ProgressSnapshot], None], None]
+
+
+def resolve_progress_reporter(progress: ProgressOption) -> ProgressReporterProtocol | None:
+    """Builds the progress reporter selected by `progress`.
+
+    Arguments:
+        progress(ProgressOption): One of 'auto', 'tqdm', 'log' or 'none', a reporter
+                                  instance, a callback receiving `ProgressSnapshot`
+                                  objects, or None to disable progress reporting.
+
+    Returns:
+        ProgressReporterProtocol | None: The reporter, or None when reporting is disabled.
+    """
+
+    if progress is None or progress == 'none':
+        return None
+
+    if progress == 'auto':
+        # NOTE: Progress bars only make sense on an interactive terminal; in cron jobs
+        # and CI logs they just add noise.
+        return TqdmProgressReporter() if sys.stderr.isatty() else None
+
+    if progress == 'tqdm':
+        return TqdmProgressReporter()
+
+    if progress == 'log':
+        return LoggingProgressReporter()
+
+    if isinstance(progress, str):
+        raise ValueError(f'Invalid progress option: {progress!r}')
+
+    if hasattr(progress, 'advance_bytes'):
+        return progress  # type: ignore[return-value]
+
+    return CallbackProgressReporter(progress)  # type: ignore[arg-type]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: scheduling.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Scheduling policies deciding the order in which a batch is submitted.
+
+With a fixed number of workers, submission order matters: a huge file started
+last keeps the batch running long after everything else finished. Starting the
+largest files first minimizes the total batch time (makespan), while starting
+the smallest first minimizes the mean time until each file is available.
+"""
+
+from array import array
+from typing import Iterable, Sequence
+
+from .interfaces import DownloadTask
+
+# Size of a task whose size is unknown.
+UNKNOWN_SIZE = -1
+
+
+# pylint: disable=too-few-public-methods
+class FifoPolicy:
+    """Submits tasks in input order (the default)."""
+
+    needs_sizes = False
+
+    # pylint: disable=unused-argument
+    def order(self, tasks: Sequence[DownloadTask], sizes: Sequence[int]) -> Iterable[int]:
+        """Returns the indexes in input order."""
+
+        return range(len(tasks))
+
+
+# pylint: disable=too-few-public-methods
+class LargestFirstPolicy:
+    """Submits the largest tasks first, to minimize the batch makespan.
+
+    Tasks of unknown size go first: they may be the largest of all, and starting
+    them early is what keeps them from becoming stragglers.
+    """
+
+    needs_sizes = True
+
+    def order(self, tasks: Sequence[DownloadTask], sizes: Sequence[int]) -> Iterable[int]:
+        """Returns the indexes by decreasing size, unknown sizes first."""
+
+        def key(index: int) -> float:
+            size = sizes[index]
+            return float('-inf') if size == UNKNOWN_SIZE else -size
+
+        return array('Q', sorted(range(len(tasks)), key=key))
+
+
+# pylint: disable=too-few-public-methods
+class ShortestFirstPolicy:
+    """Submits the smallest tasks first, to minimize the mean completion time.
+
+    Tasks of unknown size go last.
+    """
+
+    needs_sizes = True
+
+    def order(self, tasks: Sequence[DownloadTask], sizes: Sequence[int]) -> Iterable[int]:
+        """Returns the indexes by increasing size, unknown sizes last."""
+
+        def key(index: int) -> float:
+            size = sizes[index]
+            return float('inf') if size == UNKNOWN_SIZE else size
+
+        return array('Q', sorted(range(len(tasks)), key=key))
+
+
+# pylint: disable=too-few-public-methods
+class PriorityPolicy:
+    """Submits tasks by decreasing `DownloadTask.priority`, keeping input order for ties."""
+
+    needs_sizes = False
+
+    # pylint: disable=unused-argument
+    def order(self, tasks: Sequence[DownloadTask], sizes: Sequence[int]) -> Iterable[int]:
+        """Returns the indexes by decreasing priority."""
+
+        priorities = array('q', (task.priority for task in tasks))
+        return array('Q', sorted(range(len(tasks)), key=lambda index: -priorities[index]))
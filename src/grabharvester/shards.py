@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: shards.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Packs small downloads into rolling archive shards.
+
+Millions of tiny files cost more in inodes and metadata operations than in
+data. A `ShardWriter` appends each download as a member of the current tar or
+zip shard, starting a new shard once it is full, and records in a JSON Lines
+index where the data of every URL lives. Members are stored uncompressed, so
+the index offsets point at the raw bytes: a reader can seek straight to a file,
+or stream whole shards sequentially.
+
+The 'webdataset' format writes tar shards whose members are named
+`<key>.<extension>`, the convention of the WebDataset loaders.
+"""
+
+import json
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path, PurePosixPath
+from types import TracebackType
+from typing import BinaryIO, Iterator, List, Literal, NamedTuple, Sequence, Type, get_args
+
+from .interfaces import DownloadTask
+from .paths import ensure_directory, filename_from_url
+
+# Archive format of the shards.
+ShardFormat = Literal['tar', 'zip', 'webdataset']
+
+# Size after which a new shard is started.
+DEFAULT_SHARD_SIZE = 256 * 1024 * 1024
+
+# Name of the index written next to the shards.
+INDEX_NAME = 'index.jsonl'
+
+_TAR_BLOCK = tarfile.BLOCKSIZE
+
+
+class ShardEntry(NamedTuple):
+    """Location of a download inside the shards.
+
+    Attributes:
+        url: The URL of the download.
+        shard: Filename of the shard holding it.
+        member: Name of its archive member.
+        offset: Position of its first byte in the shard file.
+        size: Its size in bytes.
+    """
+
+    url: str
+    shard: str
+    member: str
+    offset: int
+    size: int
+
+
+class ShardResult(NamedTuple):
+    """Result of a batch packed into shards.
+
+    Attributes:
+        successes: Index entries of the downloaded files; duplicate tasks of a batch share one entry.
+        failures: List of tasks that failed, including those stopped while running.
+        not_started: Tasks that never started because the batch was cancelled or hit its deadline.
+    """
+
+    successes: List[ShardEntry]
+    failures: List[DownloadTask]
+    not_started: Sequence[DownloadTask] = ()
+
+
+# pylint: disable=too-many-instance-attributes
+class ShardWriter:
+    """Appends downloads to rolling archive shards and indexes them.
+
+    Adding is thread-safe: concurrent downloads are written one after the other,
+    so each shard is written sequentially.
+
+    Attributes:
+        directory(Path): Where the shards and the index are written.
+        __format(ShardFormat): Archive format of the shards.
+        __shard_size(int): Size after which a new shard is started.
+        __prefix(str): Filename prefix of the shards.
+        __count(int): Number of downloads added so far, used to name the members.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        directory: Path,
+        shard_format: ShardFormat = 'tar',
+        *,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        prefix: str = 'shard',
+    ) -> None:
+        """Initializes the writer; the first shard is created by the first download.
+
+        Arguments:
+            directory(Path): Where the shards and the index are written.
+            shard_format(ShardFormat): 'tar', 'zip' or 'webdataset' (default: 'tar').
+            shard_size(int): Size after which a new shard is started (default: 256 MiB).
+            prefix(str): Filename prefix of the shards (default: 'shard').
+
+        Raises:
+            ValueError: If `shard_format` is unknown.
+        """
+
+        if shard_format not in get_args(ShardFormat):
+            raise ValueError(
+                f"Invalid shard format: {shard_format!r}. Expected one of {', '.join(get_args(ShardFormat))}."
+            )
+
+        self.directory = directory
+        self.__format = shard_format
+        self.__shard_size = shard_size
+        self.__prefix = prefix
+        self.__count = 0
+        self.__shards = 0
+        self.__lock = threading.Lock()
+        self.__raw: BinaryIO | None = None
+        self.__archive: tarfile.TarFile | zipfile.ZipFile | None = None
+        self.__index: BinaryIO | None = None
+
+    def add(self, url: str, source: BinaryIO, size: int) -> ShardEntry:
+        """Appends `size` bytes read from `source` as the download of `url`.
+
+        Arguments:
+            url(str): The URL of the download, recorded in the index.
+            source(BinaryIO): Provides the content, from its current position.
+            size(int): Size of the content in bytes.
+
+        Returns:
+            ShardEntry: Where the content was written.
+        """
+
+        with self.__lock:
+            if self.__raw is None or (self.__raw.tell() > 0 and self.__raw.tell() + size > self.__shard_size):
+                self.__roll()
+
+            member = self.__member_name(url)
+            if isinstance(self.__archive, tarfile.TarFile):
+                info = tarfile.TarInfo(member)
+                info.size, info.mtime = size, int(time.time())
+                self.__archive.addfile(info, source)
+                # Tar pads the data of each member to a whole block.
+                offset = self.__raw.tell() - size - (-size % _TAR_BLOCK)
+            else:
+                info = zipfile.ZipInfo(member, time.localtime()[:6])
+                with self.__archive.open(info, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as target:
+                    shutil.copyfileobj(source, target)
+                # Stored members are not compressed and the seekable shard needs no data descriptor.
+                offset = self.__raw.tell() - size
+
+            entry = ShardEntry(
+                url=url, shard=self.__shard_name(self.__shards - 1), member=member, offset=offset, size=size
+            )
+            self.__index.write(json.dumps(entry._asdict()).encode('utf-8') + b'\n')
+            self.__count += 1
+
+        return entry
+
+    def close(self) -> None:
+        """Finishes the current shard and the index."""
+
+        with self.__lock:
+            self.__close_shard()
+            if self.__index is not None:
+                self.__index.close()
+                self.__index = None
+
+    def __enter__(self) -> 'ShardWriter':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    # pylint: disable=consider-using-with
+    def __roll(self) -> None:
+        """Finishes the current shard, if any, and starts the next one."""
+
+        self.__close_shard()
+        if self.__index is None:
+            ensure_directory(self.directory)
+            self.__index = open(self.directory / INDEX_NAME, 'wb')
+
+        self.__raw = open(self.directory / self.__shard_name(self.__shards), 'wb')
+        if self.__format == 'zip':
+            self.__archive = zipfile.ZipFile(self.__raw, 'w', zipfile.ZIP_STORED)
+        else:
+            self.__archive = tarfile.open(fileobj=self.__raw, mode='w', format=tarfile.PAX_FORMAT)
+        self.__shards += 1
+
+    def __close_shard(self) -> None:
+        """Writes the trailer of the current shard and closes it."""
+
+        if self.__archive is not None:
+            self.__archive.close()
+            self.__raw.close()
+            self.__index.flush()
+        self.__archive, self.__raw = None, None
+
+    def __shard_name(self, number: int) -> str:
+        """Returns the filename of shard `number`."""
+
+        extension = 'zip' if self.__format == 'zip' else 'tar'
+        return f'{self.__prefix}-{number:06d}.{extension}'
+
+    def __member_name(self, url: str) -> str:
+        """Returns a unique member name for the next download."""
+
+        filename = filename_from_url(url)
+        if self.__format == 'webdataset':
+            # WebDataset groups members by key, the part of the name before the first dot.
+            return f'{self.__count:09d}.{PurePosixPath(filename).suffix.lstrip(".") or "bin"}'
+
+        return f'{self.__count:09d}-{filename}'
+
+
+def read_index(directory: Path) -> Iterator[ShardEntry]:
+    """Yields the entries of the index written by a `ShardWriter` into `directory`."""
+
+    with open(directory / INDEX_NAME, 'rb') as index:
+        for line in index:
+            yield ShardEntry(**json.loads(line))
+
+
+def read_entry(directory: Path, entry: ShardEntry) -> bytes:
+    """Returns the content of a download, read straight from its shard."""
+
+    with open(directory / entry.shard, 'rb') as shard:
+        shard.seek(entry.offset)
+        return shard.read(entry.size)
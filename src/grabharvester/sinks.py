@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: sinks.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Storage sinks receiving downloads as they stream in.
+
+A sink stores objects under string keys: `LocalSink` writes files under a
+root directory, `MemorySink` keeps `SpooledBuffer` objects and `S3Sink`
+uploads to an S3-compatible object store with multipart uploads. Chunks go
+from the HTTP response straight to the sink, so uploading no longer requires
+downloading to the local disk first.
+"""
+
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+from .interfaces import DownloadTask, FileOperationError, SinkWriterProtocol
+from .memory import DEFAULT_SPILL_THRESHOLD, MemoryBudget, SpooledBuffer
+from .paths import ensure_directory
+from .pipeline import WriterPool
+from .streaming import open_for_writing
+
+# Size of the parts of S3 multipart uploads, and thus of the data buffered per upload.
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+# Smallest part S3 accepts, except for the last one.
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class SinkResult(NamedTuple):
+    """Result of a batch streamed into a storage sink.
+
+    Attributes:
+        successes: Keys of the stored objects; duplicate tasks of a batch share one object.
+        failures: List of tasks that failed, including those stopped while running.
+        not_started: Tasks that never started because the batch was cancelled or hit its deadline.
+    """
+
+    successes: List[str]
+    failures: List[DownloadTask]
+    not_started: Sequence[DownloadTask] = ()
+
+
+def _check_key(key: str) -> PurePosixPath:
+    """Returns `key` as a relative path, rejecting keys that would escape the sink.
+
+    Raises:
+        ValueError: If `key` is empty, absolute or contains '..'.
+    """
+
+    path = PurePosixPath(key)
+    if not key or path.is_absolute() or '..' in path.parts:
+        raise ValueError(f'Invalid storage key: {key!r}.')
+
+    return path
+
+
+class _LocalWriter:
+    """Writes a file of a `LocalSink`, deleting it if aborted."""
+
+    def __init__(self, path: Path, file: Any) -> None:
+        self.__path = path
+        self.__file = file
+
+    def write(self, data: bytes) -> None:
+        """Appends `data` to the file."""
+
+        self.__file.write(data)
+
+    def close(self) -> None:
+        """Closes the file."""
+
+        self.__file.close()
+
+    def abort(self) -> None:
+        """Closes and deletes the file."""
+
+        getattr(self.__file, 'abort', self.__file.close)()
+        self.__path.unlink(missing_ok=True)
+
+
+# pylint: disable=too-few-public-methods
+class LocalSink:
+    """Stores objects as files below a root directory; keys may contain '/' to nest directories.
+
+    Attributes:
+        root(Path): The directory holding the files.
+        __writer_pool(WriterPool | None): Writes the files on dedicated threads, if set.
+    """
+
+    def __init__(self, root: Path, *, writer_pool: WriterPool | None = None) -> None:
+        """Initializes the sink.
+
+        Arguments:
+            root(Path): The directory holding the files.
+            writer_pool(WriterPool | None): Pipelines disk writes through dedicated writer threads
+                                            (default: write from the downloading thread).
+        """
+
+        self.root = root
+        self.__writer_pool = writer_pool
+
+    def open(self, key: str) -> SinkWriterProtocol:
+        """Starts writing the file of `key`."""
+
+        path = self.root.joinpath(*_check_key(key).parts)
+        ensure_directory(path.parent)
+        file = self.__writer_pool.open(path) if self.__writer_pool is not None else open_for_writing(path)
+
+        return _LocalWriter(path, file)
+
+
+class _MemoryWriter:
+    """Writes an object of a `MemorySink`, publishing it once closed."""
+
+    def __init__(self, objects: Dict[str, SpooledBuffer], key: str, buffer: SpooledBuffer) -> None:
+        self.__objects = objects
+        self.__key = key
+        self.__buffer = buffer
+
+    def write(self, data: bytes) -> None:
+        """Appends `data` to the object."""
+
+        self.__buffer.write(data)
+
+    def close(self) -> None:
+        """Publishes the object, replacing any previous one."""
+
+        previous = self.__objects.get(self.__key)
+        self.__objects[self.__key] = self.__buffer
+        if previous is not None:
+            previous.close()
+
+    def abort(self) -> None:
+        """Drops the object."""
+
+        self.__buffer.close()
+
+
+# pylint: disable=too-few-public-methods
+class MemorySink:
+    """Stores objects in `SpooledBuffer` objects, sharing a memory budget.
+
+    Attributes:
+        objects(Dict[str, SpooledBuffer]): The finished objects, by key.
+        __budget(MemoryBudget): Caps the bytes the buffers keep in memory.
+        __spill_threshold(int): Size above which a single object spills to disk.
+    """
+
+    def __init__(self, budget: MemoryBudget | None = None, spill_threshold: int = DEFAULT_SPILL_THRESHOLD) -> None:
+        """Initializes an empty sink.
+
+        Arguments:
+            budget(MemoryBudget | None): Caps the bytes the buffers keep in memory (default: 256 MiB).
+            spill_threshold(int): Size above which a single object spills to disk (default: 8 MiB).
+        """
+
+        self.objects: Dict[str, SpooledBuffer] = {}
+        self.__budget = budget or MemoryBudget()
+        self.__spill_threshold = spill_threshold
+
+    def open(self, key: str) -> SinkWriterProtocol:
+        """Starts writing the object of `key`."""
+
+        return _MemoryWriter(self.objects, key, SpooledBuffer(self.__budget, self.__spill_threshold))
+
+
+class _S3Writer:
+    """Streams an object to S3, buffering at most one part.
+
+    Objects smaller than a part are stored with a single `put_object` call;
+    larger ones start a multipart upload once the first part is full.
+    """
+
+    def __init__(self, client: Any, bucket: str, key: str, part_size: int) -> None:
+        self.__client = client
+        self.__bucket = bucket
+        self.__key = key
+        self.__part_size = part_size
+        self.__buffer = bytearray()
+        self.__upload_id: str | None = None
+        self.__parts: List[Dict[str, Any]] = []
+
+    def write(self, data: bytes) -> None:
+        """Appends `data`, uploading a part whenever a full one is buffered."""
+
+        self.__buffer += data
+        while len(self.__buffer) >= self.__part_size:
+            part = bytes(self.__buffer[: self.__part_size])
+            del self.__buffer[: self.__part_size]
+            self.__upload_part(part)
+
+    def close(self) -> None:
+        """Uploads the buffered data and completes the object."""
+
+        if self.__upload_id is None:
+            self.__call('put_object', Bucket=self.__bucket, Key=self.__key, Body=bytes(self.__buffer))
+        else:
+            if self.__buffer:
+                self.__upload_part(bytes(self.__buffer))
+            self.__call(
+                'complete_multipart_upload',
+                Bucket=self.__bucket,
+                Key=self.__key,
+                UploadId=self.__upload_id,
+                MultipartUpload={'Parts': self.__parts},
+            )
+        self.__buffer = bytearray()
+
+    def abort(self) -> None:
+        """Discards the buffered data and the parts already uploaded."""
+
+        self.__buffer = bytearray()
+        if self.__upload_id is not None:
+            self.__call('abort_multipart_upload', Bucket=self.__bucket, Key=self.__key, UploadId=self.__upload_id)
+            self.__upload_id = None
+
+    def __upload_part(self, part: bytes) -> None:
+        """Uploads the next part, starting the multipart upload if needed."""
+
+        if self.__upload_id is None:
+            self.__upload_id = self.__call('create_multipart_upload', Bucket=self.__bucket, Key=self.__key)['UploadId']
+
+        number = len(self.__parts) + 1
+        response = self.__call(
+            'upload_part', Bucket=self.__bucket, Key=self.__key, UploadId=self.__upload_id, PartNumber=number, Body=part
+        )
+        self.__parts.append({'ETag': response['ETag'], 'PartNumber': number})
+
+    def __call(self, operation: str, **arguments: Any) -> Any:
+        """Calls a client operation, wrapping its errors.
+
+        Raises:
+            FileOperationError: If the operation failed.
+        """
+
+        try:
+            return getattr(self.__client, operation)(**arguments)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            raise FileOperationError(f'S3 {operation} for {self.__key} failed: {error}') from error
+
+
+# pylint: disable=too-few-public-methods
+class S3Sink:
+    """Uploads objects to an S3-compatible object store while they are downloaded.
+
+    Memory use per download is bounded by the part size, whatever the file size.
+
+    Attributes:
+        bucket(str): The destination bucket.
+        prefix(str): Prepended to every key, e.g. 'datasets/2024/'.
+        __client(Any): A boto3 S3 client, or a compatible object.
+        __part_size(int): Size of the parts of multipart uploads.
+    """
+
+    def __init__(
+        self, bucket: str, *, prefix: str = '', client: Any = None, part_size: int = DEFAULT_PART_SIZE
+    ) -> None:
+        """Initializes the sink.
+
+        Arguments:
+            bucket(str): The destination bucket.
+            prefix(str): Prepended to every key (default: none).
+            client(Any): A boto3 S3 client, or a compatible object, e.g. one pointing at MinIO
+                         through `endpoint_url` (default: `boto3.client('s3')`).
+            part_size(int): Size of the parts of multipart uploads, at least 5 MiB (default: 8 MiB).
+
+        Raises:
+            ImportError: If no client is given and boto3 is not installed.
+        """
+
+        if client is None:
+            try:
+                import boto3  # pylint: disable=import-outside-toplevel
+            except ImportError as error:
+                raise ImportError('S3Sink requires boto3: pip install boto3') from error
+            client = boto3.client('s3')
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.__client = client
+        self.__part_size = max(part_size, MIN_PART_SIZE)
+
+    def open(self, key: str) -> SinkWriterProtocol:
+        """Starts uploading the object of `key`."""
+
+        return _S3Writer(self.__client, self.bucket, f'{self.prefix}{_check_key(key)}', self.__part_size)
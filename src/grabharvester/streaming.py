@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: streaming.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Helpers shared by the code streaming HTTP responses to disk."""
+
+import json
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Literal
+
+import httpx
+from loguru import logger
+
+from .interfaces import CancellationTokenProtocol, TransferProgressProtocol
+from .paths import DIRECTORY_CACHE, ensure_directory
+
+# Size of the chunks read from the HTTP response.
+CHUNK_SIZE = 8192
+
+# Timeout, in seconds, of each HTTP request.
+REQUEST_TIMEOUT = 30
+
+# How compressed responses are handled: 'decode' stores the decoded body, 'raw' stores
+# the body as sent (e.g. gzip data) and 'off' asks the server not to compress it.
+CompressionMode = Literal['decode', 'raw', 'off']
+
+# Suffix of the file recording how a decoded body was sent, next to the file storing it.
+ENCODING_SUFFIX = '.encoding'
+
+
+def accept_encoding(mode: CompressionMode = 'decode') -> str:
+    """Returns the Accept-Encoding header of a request: the codings that can be decoded here, best first.
+
+    Brotli and Zstandard are only offered when their codec is installed (`httpx[brotli,zstd]`).
+    """
+
+    if mode == 'off':
+        return 'identity'
+
+    codings = []
+    if find_spec('zstandard') is not None:
+        codings.append('zstd')
+    if find_spec('brotli') is not None or find_spec('brotlicffi') is not None:
+        codings.append('br')
+    codings.extend(('gzip', 'deflate'))
+
+    return ', '.join(codings)
+
+
+def content_length(response: httpx.Response) -> int:
+    """Returns the announced body size of a response, or 0 when unknown."""
+
+    try:
+        return int(response.headers.get('content-length', 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def decodes(response: httpx.Response, mode: CompressionMode = 'decode') -> bool:
+    """Whether the body of a response is decoded before being stored, i.e. it is sent compressed outside 'raw' mode."""
+
+    if mode == 'raw':
+        return False
+
+    return response.headers.get('content-encoding', 'identity').strip().lower() not in ('', 'identity')
+
+
+def encoding_path(file_path: Path) -> Path:
+    """Returns the file recording how the decoded body stored in `file_path` was sent."""
+
+    return file_path.with_name(f'{file_path.name}{ENCODING_SUFFIX}')
+
+
+def _fingerprint(response: httpx.Response) -> Dict[str, Any]:
+    """Identifies the encoded body of a response by its coding, announced size and ETag."""
+
+    return {
+        'encoding': response.headers.get('content-encoding', '').strip().lower(),
+        'length': content_length(response),
+        'etag': response.headers.get('etag', ''),
+    }
+
+
+def is_complete(file_path: Path, existing: int | None, response: httpx.Response, mode: CompressionMode) -> bool:
+    """Whether `file_path`, of `existing` size (None if missing), already holds the body of `response`.
+
+    Content-Length counts the bytes sent, so it only vouches for bodies stored as sent:
+    not encoded, or kept encoded in 'raw' mode. A decoded body is complete when
+    `record_decoded` saw the same encoded body, known by its Content-Length or ETag,
+    decode to the size the file still has.
+    """
+
+    if not existing:
+        return False
+    if not decodes(response, mode):
+        return existing == content_length(response)
+
+    fingerprint = _fingerprint(response)
+    if not fingerprint['length'] and not fingerprint['etag']:
+        return False
+    try:
+        record = json.loads(encoding_path(file_path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return False
+
+    return record == {**fingerprint, 'size': existing}
+
+
+def record_decoded(file_path: Path, response: httpx.Response, size: int) -> None:
+    """Records that `file_path` stores the body of `response` decoded to `size` bytes, for `is_complete`.
+
+    Failing to record it only means the file is downloaded again next time.
+    """
+
+    try:
+        encoding_path(file_path).write_text(json.dumps({**_fingerprint(response), 'size': size}), encoding='utf-8')
+    except OSError as error:
+        logger.warning(f'Could not record the encoding of {file_path.name}: {error}')
+
+
+def forget_decoded(file_path: Path) -> None:
+    """Removes the record of the decoded body of `file_path`, before the file is written again."""
+
+    try:
+        encoding_path(file_path).unlink(missing_ok=True)
+    except OSError as error:
+        logger.warning(f'Could not remove {encoding_path(file_path)}: {error}')
+
+
+def iter_body(
+    response: httpx.Response, mode: CompressionMode, progress: TransferProgressProtocol | None
+) -> Iterator[bytes]:
+    """Yields the body of a response as it should be stored.
+
+    When `decodes` is true, it advances `progress` by the bytes received rather than
+    the decoded ones, so it matches Content-Length, then reports the decoded size to
+    its `decoded` method, if any; otherwise progress is left to the caller.
+    """
+
+    if mode == 'raw':
+        yield from response.iter_raw(chunk_size=CHUNK_SIZE)
+        return
+
+    if progress is None or not decodes(response, mode):
+        yield from response.iter_bytes(chunk_size=CHUNK_SIZE)
+        return
+
+    received = decoded = 0
+    for chunk in response.iter_bytes(chunk_size=CHUNK_SIZE):
+        decoded += len(chunk)
+        progress.advance(response.num_bytes_downloaded - received)
+        received = response.num_bytes_downloaded
+        yield chunk
+
+    progress.advance(response.num_bytes_downloaded - received)
+    record = getattr(progress, 'decoded', None)
+    if record is not None:
+        record(decoded)
+
+
+def existing_size(file_path: Path) -> int | None:
+    """Returns the size of `file_path`, or None if it does not exist, with a single syscall."""
+
+    try:
+        return file_path.stat().st_size
+    except FileNotFoundError:
+        return None
+
+
+def open_for_writing(file_path: Path, mode: str = 'wb') -> BinaryIO:
+    """Opens `file_path` for writing, recreating its directory if it vanished since it was cached."""
+
+    try:
+        return open(file_path, mode)
+    except FileNotFoundError:
+        DIRECTORY_CACHE.discard(file_path.parent)
+        ensure_directory(file_path.parent)
+        return open(file_path, mode)
+
+
+def request_timeout(token: CancellationTokenProtocol | None) -> float:
+    """Returns the HTTP timeout of a request, shortened so it cannot outlive the deadline of `token`."""
+
+    remaining = token.remaining() if token is not None else None
+    if remaining is None:
+        return REQUEST_TIMEOUT
+
+    # A zero timeout would disable it in httpx; an expired deadline still fails fast.
+    return min(REQUEST_TIMEOUT, max(remaining, 0.001))
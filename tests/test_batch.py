@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_batch.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for the compact batch representation."""
+
+# pylint: disable=redefined-outer-name
+
+from pathlib import Path
+
+import pytest
+
+from grabharvester.batch import BatchResult, TaskBatch, TaskStatus
+from grabharvester.interfaces import DownloadTask, NetworkDownloadError
+from grabharvester.manager import DownloadManager
+
+
+@pytest.fixture
+def sample_batch():
+    """Provides a small batch mixing tasks and bare URLs."""
+
+    return TaskBatch(
+        [
+            DownloadTask(url='http://example.com/file1.zip', destination_path=Path('/tmp/out/file1.zip')),
+            DownloadTask(url='http://example.com/file2.zip', destination_path=Path('/tmp/out/file2.zip')),
+            'http://example.com/file3.zip',
+        ]
+    )
+
+
+def test_task_batch_materializes_tasks(sample_batch):
+    """Tests that tasks are rebuilt unchanged from the compact columns."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    assert len(sample_batch) == 3
+    assert sample_batch[0] == DownloadTask('http://example.com/file1.zip', Path('/tmp/out/file1.zip'))
+    assert sample_batch[-1] == DownloadTask('http://example.com/file3.zip', None)
+    assert sample_batch.url(1) == 'http://example.com/file2.zip'
+    assert sample_batch.destination_path(1) == Path('/tmp/out/file2.zip')
+    assert [task.url for task in sample_batch[1:]] == ['http://example.com/file2.zip', 'http://example.com/file3.zip']
+
+    with pytest.raises(IndexError):
+        sample_batch[3]  # pylint: disable=pointless-statement
+
+
+def test_task_batch_rejects_invalid_items():
+    """Tests that only tasks and URLs are accepted."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    with pytest.raises(ValueError):
+        TaskBatch([123])  # type: ignore
+
+
+def test_task_batch_is_compact():
+    """Tests that a batch sharing one directory stores little more than its strings."""
+
+    # Step 1 - Arrange
+    batch = TaskBatch()
+
+    # Step 2 - Act
+    for number in range(1000):
+        batch.append(f'http://example.com/{number:04d}.bin', f'/data/harvest/{number:04d}.bin')
+
+    # Step 3 - Assert
+    # 27-byte URLs and 8-byte filenames, plus fixed-size offsets, directory ids, priorities, size hints
+    # and (empty) mirror lists.
+    assert batch.nbytes < 1000 * (27 + 8 + 8 + 8 + 8 + 8 + 8 + 8) + 100
+
+
+def test_batch_result_views(sample_batch):
+    """Tests that the result exposes lazy success and failure views."""
+
+    # Step 1 - Arrange
+    result = BatchResult(sample_batch)
+
+    # Step 2 - Act
+    result.record_success(2, Path('/tmp/file3.zip'))
+    result.record_success(0, Path('/tmp/out/file1.zip'))
+    result.record_failure(1)
+
+    # Step 3 - Assert
+    assert list(result.status) == [TaskStatus.SUCCEEDED, TaskStatus.FAILED, TaskStatus.SUCCEEDED]
+    assert result.successes == [Path('/tmp/out/file1.zip'), Path('/tmp/file3.zip')]
+    assert result.failures == [sample_batch[1]]
+    assert result.count(TaskStatus.SUCCEEDED) == 2
+    assert result.path(1) is None
+
+
+def test_run_batch(mocker, sample_batch):
+    """Tests that the manager consumes a TaskBatch and produces a BatchResult."""
+
+    # Step 1 - Arrange
+    mocker.patch('tempfile.gettempdir', return_value='/tmp')
+    downloader = mocker.Mock()
+    downloader.download_file.side_effect = [
+        Path('/tmp/out/file1.zip'),
+        NetworkDownloadError('Simulated download error'),
+        Path('/tmp/file3.zip'),
+    ]
+    manager = DownloadManager(downloader=downloader, max_threads=1, progress=None)
+
+    # Step 2 - Act
+    result = manager.run_batch(sample_batch)
+
+    # Step 3 - Assert
+    assert isinstance(result, BatchResult)
+    assert list(result.status) == [TaskStatus.SUCCEEDED, TaskStatus.FAILED, TaskStatus.SUCCEEDED]
+    assert result.successes == [Path('/tmp/out/file1.zip'), Path('/tmp/file3.zip')]
+    assert result.failures == [sample_batch[1]]
+
+
+def test_run_batch_empty(mocker):
+    """Tests that an empty batch returns an empty result."""
+
+    # Step 1 - Arrange
+    downloader = mocker.Mock()
+    manager = DownloadManager(downloader=downloader, progress=None)
+
+    # Step 2 - Act
+    result = manager.run_batch(TaskBatch())
+
+    # Step 3 - Assert
+    assert len(result.successes) == 0
+    downloader.download_file.assert_not_called()
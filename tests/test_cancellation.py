@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_cancellation.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for cancellation tokens, batch deadlines and per-task time limits."""
+
+# pylint: disable=redefined-outer-name
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from grabharvester import dedup
+from grabharvester.batch import TaskBatch, TaskStatus
+from grabharvester.cancellation import CancellationToken
+from grabharvester.interfaces import DownloadCancelledError, DownloadResult, DownloadTask, DownloadTimeoutError
+from grabharvester.manager import DownloadManager
+
+
+def _slow_download(url, file_path, *, token, **_):
+    """Simulates a slow-drip transfer that honours its token between chunks."""
+
+    while True:
+        token.raise_if_cancelled()
+        if url.endswith('fast.zip'):
+            return file_path
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def slow_downloader(mocker):
+    """Provides a downloader whose transfers only end when their token stops them."""
+
+    downloader = mocker.Mock()
+    downloader.download_file.side_effect = _slow_download
+    return downloader
+
+
+@pytest.fixture
+def slow_tasks():
+    """Provides more slow tasks than a single worker and its submission window can hold."""
+
+    return [
+        DownloadTask(url=f'http://example.com/{number}.zip', destination_path=Path(f'/tmp/{number}.zip'))
+        for number in range(6)
+    ]
+
+
+def test_child_token_follows_its_parent():
+    """Tests that a child token is cancelled with its parent and inherits its deadline."""
+
+    # Step 1 - Arrange
+    parent = CancellationToken(timeout=60)
+    child = parent.child(timeout=120)
+
+    # Step 2 - Act
+    remaining = child.remaining()
+    parent.cancel()
+
+    # Step 3 - Assert
+    assert remaining <= 60
+    assert child.cancelled
+    with pytest.raises(DownloadCancelledError):
+        child.raise_if_cancelled()
+
+
+def test_expired_token_raises_timeout():
+    """Tests that a token past its deadline raises a timeout error."""
+
+    # Step 1 - Arrange
+    token = CancellationToken(timeout=0)
+
+    # Step 2 - Act & Step 3 - Assert
+    assert token.expired
+    assert not token.cancel_requested
+    with pytest.raises(DownloadTimeoutError):
+        token.raise_if_cancelled()
+
+
+def test_token_callbacks(mocker):
+    """Tests that callbacks run once on cancel, and right away once cancelled."""
+
+    # Step 1 - Arrange
+    token = CancellationToken()
+    callback, removed, late = mocker.Mock(), mocker.Mock(), mocker.Mock()
+    token.add_callback(callback)
+    token.add_callback(removed)
+    token.remove_callback(removed)
+
+    # Step 2 - Act
+    token.cancel()
+    token.cancel()
+    token.add_callback(late)
+
+    # Step 3 - Assert
+    callback.assert_called_once_with()
+    removed.assert_not_called()
+    late.assert_called_once_with()
+
+
+def test_run_stops_at_batch_deadline(slow_downloader, slow_tasks):
+    """Tests that the batch deadline cancels queued tasks and stops the running one."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(slow_downloader, max_threads=1, progress=None)
+
+    # Step 2 - Act
+    started = time.perf_counter()
+    result = manager.run(slow_tasks, timeout=0.2)
+    elapsed = time.perf_counter() - started
+
+    # Step 3 - Assert
+    assert elapsed < 2
+    assert result.successes == []
+    assert result.failures == [slow_tasks[0]]
+    assert sorted(result.not_started) == slow_tasks[1:]
+    assert slow_downloader.download_file.call_count == 1
+
+
+def test_stopped_run_still_unpacks_into_two_lists(slow_downloader, slow_tasks):
+    """Tests that the result of a stopped batch keeps the two-field form, with `not_started` aside."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(slow_downloader, max_threads=1, progress=None)
+
+    # Step 2 - Act
+    result = manager.run(slow_tasks, timeout=0.2)
+    successes, failures = result
+
+    # Step 3 - Assert
+    assert (successes, failures) == ([], [slow_tasks[0]])
+    assert sorted(result.not_started) == slow_tasks[1:]
+    assert result == DownloadResult(successes=[], failures=[slow_tasks[0]])
+
+
+def test_run_stops_when_token_is_cancelled(slow_downloader, slow_tasks):
+    """Tests that cancelling the caller's token from another thread stops the batch."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(slow_downloader, max_threads=2, progress=None)
+    token = CancellationToken()
+    timer = threading.Timer(0.2, token.cancel)
+
+    # Step 2 - Act
+    timer.start()
+    result = manager.run(slow_tasks, token=token)
+    timer.join()
+
+    # Step 3 - Assert
+    assert len(result.failures) == 2
+    assert len(result.not_started) == len(slow_tasks) - 2
+
+
+def test_task_timeout_fails_only_the_slow_task(slow_downloader):
+    """Tests that the per-task limit stops a slow-drip transfer without stopping the batch."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(slow_downloader, max_threads=2, progress=None, task_timeout=0.1)
+    tasks = [
+        DownloadTask(url='http://example.com/slow.zip', destination_path=Path('/tmp/slow.zip')),
+        DownloadTask(url='http://example.com/fast.zip', destination_path=Path('/tmp/fast.zip')),
+    ]
+
+    # Step 2 - Act
+    result = manager.run(tasks)
+
+    # Step 3 - Assert
+    assert result.successes == [Path('/tmp/fast.zip')]
+    assert result.failures == [tasks[0]]
+    assert result.not_started == []
+
+
+def test_run_batch_marks_tasks_not_started(slow_downloader, slow_tasks):
+    """Tests that a stopped compact batch marks the unstarted tasks."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(slow_downloader, max_threads=1, progress=None)
+    batch = TaskBatch(slow_tasks)
+
+    # Step 2 - Act
+    result = manager.run_batch(batch, timeout=0.2)
+
+    # Step 3 - Assert
+    assert result.status[0] == TaskStatus.FAILED
+    assert result.count(TaskStatus.NOT_STARTED) == len(slow_tasks) - 1
+    assert result.not_started == slow_tasks[1:]
+
+
+def test_run_batch_plans_only_the_tasks_it_reaches(mocker, slow_downloader):
+    """Tests that a batch stopped early neither plans nor waits for the tasks it never reached."""
+
+    # Step 1 - Arrange
+    resolve = mocker.spy(dedup, 'resolve_destination')
+    manager = DownloadManager(slow_downloader, max_threads=1, progress=None)
+    batch = TaskBatch(
+        DownloadTask(url=f'http://example.com/{number}.zip', destination_path=Path(f'/tmp/{number}.zip'))
+        for number in range(20000)
+    )
+
+    # Step 2 - Act
+    started = time.monotonic()
+    result = manager.run_batch(batch, timeout=0.2)
+    elapsed = time.monotonic() - started
+
+    # Step 3 - Assert
+    assert result.status[0] == TaskStatus.FAILED
+    assert result.count(TaskStatus.NOT_STARTED) == len(batch) - 1
+    assert resolve.call_count < len(batch) // 10
+    assert elapsed < 5
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_compression.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for compressed transfers."""
+
+# pylint: disable=redefined-outer-name
+
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from grabharvester.downloader import DownloadService
+from grabharvester.interfaces import DownloadTask
+from grabharvester.manager import DownloadManager
+from grabharvester.mirrors import MirrorDownload
+from grabharvester.streaming import accept_encoding, encoding_path
+
+_BODY = b'grab harvester ' * 4096
+_GZIPPED = gzip.compress(_BODY)
+
+
+class _GzipHandler(BaseHTTPRequestHandler):
+    """Serves `_BODY`, gzipped when the request accepts gzip, and records the Accept-Encoding of every request."""
+
+    protocol_version = 'HTTP/1.1'
+    encodings = []
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answers a GET request."""
+
+        self.encodings.append(self.headers.get('Accept-Encoding'))
+        compress = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = _GZIPPED if compress else _BODY
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        """Silences the default request logging."""
+
+
+@pytest.fixture
+def gzip_server():
+    """Runs a local HTTP server and yields the URL of its file and the Accept-Encoding of each request."""
+
+    handler = type('Handler', (_GzipHandler,), {'encodings': []})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+
+    yield f'http://{host}:{port}/words.txt', handler.encodings
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def gzip_url(gzip_server):
+    """Yields the URL of the file of the local HTTP server."""
+
+    return gzip_server[0]
+
+
+def test_accept_encoding_offers_installed_codecs():
+    """Tests that gzip is always offered, and nothing is in 'off' mode."""
+
+    # Step 1 - Arrange & Step 2 - Act
+    offered = accept_encoding('decode').split(', ')
+
+    # Step 3 - Assert
+    assert offered[-2:] == ['gzip', 'deflate']
+    assert accept_encoding('off') == 'identity'
+
+
+def test_decoded_file_is_not_mistaken_for_complete(gzip_url, tmp_path):
+    """Tests that a file the size of the compressed body is downloaded again and stored decoded."""
+
+    # Step 1 - Arrange
+    destination = tmp_path / 'words.txt'
+    destination.write_bytes(b'x' * len(_GZIPPED))
+
+    # Step 2 - Act
+    DownloadService().download_file(gzip_url, destination)
+
+    # Step 3 - Assert
+    assert destination.read_bytes() == _BODY
+
+
+def test_raw_mode_stores_the_encoded_body(mocker, gzip_url, tmp_path):
+    """Tests that 'raw' mode keeps the body as sent and recognizes it as complete afterwards."""
+
+    # Step 1 - Arrange
+    service = DownloadService(compression='raw')
+    destination = tmp_path / 'words.txt.gz'
+
+    # Step 2 - Act
+    service.download_file(gzip_url, destination)
+    write = mocker.spy(DownloadService, '_DownloadService__copy_body')
+    service.download_file(gzip_url, destination)
+
+    # Step 3 - Assert
+    assert destination.read_bytes() == _GZIPPED
+    write.assert_not_called()
+
+
+def test_decoded_file_is_recognized_as_complete(mocker, gzip_url, tmp_path):
+    """Tests that a decoded file is not downloaded again while it keeps the size recorded for it."""
+
+    # Step 1 - Arrange
+    service = DownloadService()
+    destination = tmp_path / 'words.txt'
+
+    # Step 2 - Act
+    service.download_file(gzip_url, destination)
+    write = mocker.spy(DownloadService, '_DownloadService__copy_body')
+    service.download_file(gzip_url, destination)
+
+    # Step 3 - Assert
+    assert destination.read_bytes() == _BODY
+    assert encoding_path(destination).exists()
+    write.assert_not_called()
+
+
+def test_changed_decoded_file_is_downloaded_again(gzip_url, tmp_path):
+    """Tests that a decoded file whose size no longer matches its record is downloaded again."""
+
+    # Step 1 - Arrange
+    service = DownloadService()
+    destination = tmp_path / 'words.txt'
+    service.download_file(gzip_url, destination)
+    destination.write_bytes(b'truncated')
+
+    # Step 2 - Act
+    service.download_file(gzip_url, destination)
+
+    # Step 3 - Assert
+    assert destination.read_bytes() == _BODY
+
+
+def test_off_mode_asks_for_identity(gzip_url, tmp_path):
+    """Tests that 'off' mode receives the uncompressed body."""
+
+    # Step 1 - Arrange
+    events = []
+    manager = DownloadManager(DownloadService(compression='off'), progress=None)
+
+    # Step 2 - Act
+    manager.run([DownloadTask(url=gzip_url, destination_path=tmp_path)], on_complete=events.append)
+
+    # Step 3 - Assert
+    assert events[0].metrics.bytes_downloaded == len(_BODY)
+    assert events[0].metrics.bytes_saved == 0
+
+
+def test_savings_are_reported_per_task(gzip_url, tmp_path):
+    """Tests that progress counts the bytes received and the event reports the bandwidth saved."""
+
+    # Step 1 - Arrange
+    events = []
+    received = []
+    manager = DownloadManager(DownloadService(), progress=None)
+
+    # Step 2 - Act
+    manager.run(
+        [DownloadTask(url=gzip_url, destination_path=tmp_path)],
+        on_progress=lambda index, task, done, total: received.append((done, total)),
+        on_complete=events.append,
+    )
+
+    # Step 3 - Assert
+    metrics = events[0].metrics
+    assert received[-1] == (len(_GZIPPED), len(_GZIPPED))
+    assert (metrics.bytes_downloaded, metrics.bytes_decoded) == (len(_GZIPPED), len(_BODY))
+    assert metrics.bytes_saved == len(_BODY) - len(_GZIPPED)
+    assert (tmp_path / 'words.txt').read_bytes() == _BODY
+
+
+@pytest.mark.parametrize('mirror_mode', ['failover', 'hedged'])
+def test_mirrored_savings_are_reported_per_task(gzip_url, tmp_path, mirror_mode):
+    """Tests that tasks with mirrors decode compressed bodies and report the bandwidth saved."""
+
+    # Step 1 - Arrange
+    events = []
+    manager = DownloadManager(DownloadService(mirror_mode=mirror_mode), progress=None)
+    task = DownloadTask(url=gzip_url, destination_path=tmp_path, mirrors=(f'{gzip_url}?mirror=1',))
+
+    # Step 2 - Act
+    manager.run([task], on_complete=events.append)
+
+    # Step 3 - Assert
+    metrics = events[0].metrics
+    assert (metrics.bytes_downloaded, metrics.bytes_decoded) == (len(_GZIPPED), len(_BODY))
+    assert (tmp_path / 'words.txt').read_bytes() == _BODY
+
+
+@pytest.mark.parametrize('mirror_mode', ['failover', 'hedged'])
+def test_mirrored_decoded_file_is_recognized_as_complete(mocker, gzip_url, tmp_path, mirror_mode):
+    """Tests that tasks with mirrors do not download a decoded file again."""
+
+    # Step 1 - Arrange
+    service = DownloadService(mirror_mode=mirror_mode)
+    destination = tmp_path / 'words.txt'
+    mirrors = (f'{gzip_url}?mirror=1',)
+
+    # Step 2 - Act
+    service.download_file(gzip_url, destination, mirrors=mirrors)
+    complete = mocker.spy(MirrorDownload, '_MirrorDownload__complete')
+    service.download_file(gzip_url, destination, mirrors=mirrors)
+
+    # Step 3 - Assert
+    assert destination.read_bytes() == _BODY
+    assert complete.call_args.args[1] is None
+
+
+@pytest.mark.parametrize('compression, expected', [('raw', _GZIPPED), ('off', _BODY)])
+def test_mirrored_tasks_follow_the_compression_mode(gzip_server, tmp_path, compression, expected):
+    """Tests that tasks with mirrors receive and store the body as the compression mode asks."""
+
+    # Step 1 - Arrange
+    gzip_url, encodings = gzip_server
+    events = []
+    manager = DownloadManager(DownloadService(mirror_mode='failover', compression=compression), progress=None)
+    task = DownloadTask(url=gzip_url, destination_path=tmp_path, mirrors=(f'{gzip_url}?mirror=1',))
+
+    # Step 2 - Act
+    manager.run([task], on_complete=events.append)
+
+    # Step 3 - Assert
+    assert events[0].metrics.bytes_downloaded == len(expected)
+    assert events[0].metrics.bytes_decoded == 0
+    assert (tmp_path / 'words.txt').read_bytes() == expected
+    assert encodings == [accept_encoding(compression)]
+
+
+def test_rejects_unknown_compression_mode():
+    """Tests that an unknown compression mode is rejected up front."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    with pytest.raises(ValueError, match='Invalid compression mode'):
+        DownloadService(compression='zip')  # type: ignore
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_dedup.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for the duplicate coalescing module."""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from grabharvester.dedup import BloomFilter, SingleFlight, normalize_url, plan_transfers
+from grabharvester.interfaces import DownloadTask
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ('HTTP://Example.COM:80/a.zip#part', 'http://example.com/a.zip'),
+        ('https://example.com:443', 'https://example.com/'),
+        ('https://example.com:8443/a.zip?b=1&a=2', 'https://example.com:8443/a.zip?b=1&a=2'),
+    ],
+)
+def test_normalize_url(url, expected):
+    """Tests that equivalent URLs share the same normalized form."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    assert normalize_url(url) == expected
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Tests that every added key is reported as present."""
+
+    # Step 1 - Arrange
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [str(number).encode() for number in range(1000)]
+
+    # Step 2 - Act
+    first_insertions = [bloom.add(key) for key in keys]
+
+    # Step 3 - Assert
+    assert all(key in bloom for key in keys)
+    # At 1% error rate, only a handful of new keys may look like repeats.
+    assert sum(first_insertions) < 50
+    assert bloom.size_in_bytes < 2000
+
+
+def test_plan_transfers_coalesces_duplicate_urls():
+    """Tests that equivalent URLs to the same file share one transfer."""
+
+    # Step 1 - Arrange
+    tasks = [
+        DownloadTask(url='http://example.com/file.zip', destination_path=Path('/tmp/out/file.zip')),
+        DownloadTask(url='HTTP://EXAMPLE.com/file.zip', destination_path=Path('/tmp/out/file.zip')),
+        DownloadTask(url='http://example.com/file.zip', destination_path=Path('/tmp/copy/file.zip')),
+    ]
+
+    # Step 2 - Act
+    plan = plan_transfers(tasks)
+
+    # Step 3 - Assert
+    assert plan.leaders == {1: 0, 2: 0}
+    assert [plan.destination(index) for index in range(3)] == [
+        Path('/tmp/out/file.zip'),
+        Path('/tmp/out/file.zip'),
+        Path('/tmp/copy/file.zip'),
+    ]
+
+
+def test_plan_transfers_resolves_filename_collisions():
+    """Tests that different URLs mapping to the same file get distinct, stable names."""
+
+    # Step 1 - Arrange
+    tasks = [
+        DownloadTask(url='http://one.example.com/data.csv', destination_path=Path('/tmp/out/data.csv')),
+        DownloadTask(url='http://two.example.com/data.csv', destination_path=Path('/tmp/out/data.csv')),
+    ]
+
+    # Step 2 - Act
+    first_plan = plan_transfers(tasks)
+    second_plan = plan_transfers(tasks)
+
+    # Step 3 - Assert
+    assert first_plan.leaders == {}
+    assert first_plan.destination(0) == Path('/tmp/out/data.csv')
+    assert first_plan.destination(1).parent == Path('/tmp/out')
+    assert first_plan.destination(1).name.startswith('data-')
+    assert first_plan.destination(1).suffix == '.csv'
+    assert first_plan.destination(1) == second_plan.destination(1)
+
+
+def test_plan_transfers_survives_bloom_filter_false_positives(mocker):
+    """Tests that keys the filter wrongly reports as seen are planned as new tasks."""
+
+    # Step 1 - Arrange
+    mocker.patch.object(BloomFilter, 'add', return_value=True)
+    tasks = [
+        DownloadTask(url=f'http://example.com/{number}.zip', destination_path=Path(f'/tmp/out/{number}.zip'))
+        for number in range(3000)
+    ]
+    tasks.append(tasks[10])
+
+    # Step 2 - Act
+    plan = plan_transfers(tasks)
+
+    # Step 3 - Assert
+    assert plan.leaders == {3000: 10}
+    assert [plan.destination(index) for index in range(3000)] == [task.destination_path for task in tasks[:3000]]
+
+
+def test_single_flight_shares_concurrent_calls():
+    """Tests that concurrent calls with the same key run the function only once."""
+
+    # Step 1 - Arrange
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return 'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do('key', slow_call))) for _ in range(3)]
+
+    # Step 2 - Act
+    threads[0].start()
+    started.wait(timeout=5)
+    for thread in threads[1:]:
+        thread.start()
+    # Give the followers time to find the in-flight call before releasing it.
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # Step 3 - Assert
+    assert results == ['result'] * 3
+    assert len(calls) == 1
+    # Once finished, the key is free again.
+    assert flights.do('key', lambda: 'again') == 'again'
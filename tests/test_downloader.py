@@ -23,8 +23,20 @@ from pathlib import Path
 import httpx
 import pytest
 
+from grabharvester.cancellation import CancellationToken
 from grabharvester.downloader import DownloadService
-from grabharvester.interfaces import FileOperationError, NetworkDownloadError
+from grabharvester.interfaces import DownloadCancelledError, FileOperationError, NetworkDownloadError
+from grabharvester.paths import DIRECTORY_CACHE
+from grabharvester.streaming import accept_encoding
+
+
+@pytest.fixture(autouse=True)
+def clear_directory_cache():
+    """Prevents directories "created" by one test from being skipped in the next."""
+
+    DIRECTORY_CACHE.clear()
+    yield
+    DIRECTORY_CACHE.clear()
 
 
 @pytest.fixture
@@ -34,6 +46,13 @@ def downloader_service():
     return DownloadService()
 
 
+@pytest.fixture
+def mock_stream(mocker):
+    """Mocks httpx.stream, returning the mock whose context manager yields the response."""
+
+    return mocker.patch('httpx.stream')
+
+
 @pytest.fixture
 def mock_path():
     """Provides a consistent mock Path object for tests."""
@@ -41,17 +60,18 @@ def mock_path():
     return Path('/fake/dir/file.zip')
 
 
-def test_download_file_success(mocker, downloader_service, mock_path):
+def test_download_file_success(mocker, downloader_service, mock_stream, mock_path):
     """Tests successful file download."""
 
     # Step 1 - Arrange
     # Httpx mock response
     mock_response = mocker.Mock()
+    mock_response.headers = {}
     mock_response.raise_for_status.return_value = None
     mock_response.iter_bytes.return_value = [b'file', b'content']
 
-    # Mock httpx.get to return our simulated response.
-    mock_get = mocker.patch('httpx.get', return_value=mock_response)
+    # Mock httpx.stream to yield our simulated response.
+    mock_stream.return_value.__enter__.return_value = mock_response
 
     # Mock 'open' to simulate writing to a file without touching the disk.
     mock_file_open = mocker.patch('builtins.open', mocker.mock_open())
@@ -67,8 +87,8 @@ def test_download_file_success(mocker, downloader_service, mock_path):
     result_path = downloader_service.download_file(test_url, mock_path)
 
     # Step 3 - Assert
-    # Assert that httpx.get was called with the correct URL.
-    mock_get.assert_called_once_with(test_url, timeout=30)
+    # Assert that httpx.stream was called with the correct URL.
+    mock_stream.assert_called_once_with('GET', test_url, headers={'Accept-Encoding': accept_encoding()}, timeout=30)
     # Assert that the file was opened for writing in binary mode ('wb').
     mock_file_open.assert_called_once_with(mock_path, 'wb')
     # Assert that the content was written to the file.
@@ -84,8 +104,8 @@ def test_download_file_network_error(mocker, downloader_service, mock_path):
     """Tests handling of network errors during file download."""
 
     # Step 1 - Arrange
-    # Mock httpx.get to raise a network exception.
-    mocker.patch('httpx.get', side_effect=httpx.RequestError("Connection failed", request=mocker.Mock()))
+    # Mock httpx.stream to raise a network exception.
+    mocker.patch('httpx.stream', side_effect=httpx.RequestError("Connection failed", request=mocker.Mock()))
 
     test_url = 'http://example.com/file.zip'
 
@@ -95,14 +115,28 @@ def test_download_file_network_error(mocker, downloader_service, mock_path):
         downloader_service.download_file(test_url, mock_path)
 
 
-def test_download_file_already_exists_and_complete(mocker, downloader_service, mock_path):
+def test_download_file_http_status_error(mocker, downloader_service, mock_stream, mock_path):
+    """Tests that an HTTP error status is reported as a network error, not raised as is."""
+
+    # Step 1 - Arrange
+    mock_response = mock_stream.return_value.__enter__.return_value
+    mock_response.raise_for_status.side_effect = httpx.HTTPStatusError(
+        '503 Service Unavailable', request=mocker.Mock(), response=mocker.Mock()
+    )
+
+    # Step 2 - Act & Step 3 - Assert
+    with pytest.raises(NetworkDownloadError, match='503'):
+        downloader_service.download_file('http://example.com/file.zip', mock_path)
+
+
+def test_download_file_already_exists_and_complete(mocker, downloader_service, mock_stream, mock_path):
     """Tests that the download is skipped if the file already exists and is complete."""
 
     # Step 1 - Arrange
     # Mock the HTTP response with a specific content-length
     mock_response = mocker.Mock()
     mock_response.headers = {'content-length': '1024'}
-    mocker.patch('httpx.get', return_value=mock_response)
+    mock_stream.return_value.__enter__.return_value = mock_response
 
     # Mock 'open' to ensure it's NOT called
     mock_file_open = mocker.patch('builtins.open', mocker.mock_open())
@@ -126,7 +160,7 @@ def test_download_file_already_exists_and_complete(mocker, downloader_service, m
     assert result_path == mock_path
 
 
-def test_download_file_already_exists_but_incomplete(mocker, downloader_service, mock_path):
+def test_download_file_already_exists_but_incomplete(mocker, downloader_service, mock_stream, mock_path):
     """Tests that the file is re-downloaded if it exists but is incomplete."""
 
     # Step 1 - Arrange
@@ -134,7 +168,7 @@ def test_download_file_already_exists_but_incomplete(mocker, downloader_service,
     mock_response = mocker.Mock()
     mock_response.headers = {'content-length': '2048'}  # Remote file is larger
     mock_response.iter_bytes.return_value = [b'new content']
-    mocker.patch('httpx.get', return_value=mock_response)
+    mock_stream.return_value.__enter__.return_value = mock_response
 
     # Mock 'open' to check that it IS called
     mock_file_open = mocker.patch('builtins.open', mocker.mock_open())
@@ -156,14 +190,14 @@ def test_download_file_already_exists_but_incomplete(mocker, downloader_service,
     mock_file_open().write.assert_called_once_with(b'new content')
 
 
-def test_download_file_io_error(mocker, downloader_service, mock_path):
+def test_download_file_io_error(mocker, downloader_service, mock_stream, mock_path):
     """Tests handling of file I/O errors during file download."""
 
     # Step 1 - Arrange
     # Mock the HTTP response (network is working).
     mock_response = mocker.Mock()
     mock_response.raise_for_status.return_value = None
-    mocker.patch('httpx.get', return_value=mock_response)
+    mock_stream.return_value.__enter__.return_value = mock_response
 
     # Mock 'open' to raise an I/O error (e.g., permission denied).
     mocker.patch('builtins.open', side_effect=IOError('Permission denied'))
@@ -178,7 +212,7 @@ def test_download_file_io_error(mocker, downloader_service, mock_path):
         downloader_service.download_file(test_url, mock_path)
 
 
-def test_download_file_to_temp_dir(mocker, downloader_service):
+def test_download_file_to_temp_dir(mocker, downloader_service, mock_stream):
     """Tests downloading a file to the system temporary directory when no path is provided."""
 
     # Step 1 - Arrange
@@ -188,9 +222,10 @@ def test_download_file_to_temp_dir(mocker, downloader_service):
 
     # Mock httpx response
     mock_response = mocker.Mock()
+    mock_response.headers = {}
     mock_response.raise_for_status.return_value = None
     mock_response.iter_bytes.return_value = [b'data']
-    mocker.patch('httpx.get', return_value=mock_response)
+    mock_stream.return_value.__enter__.return_value = mock_response
 
     # Mock tempfile.gettempdir to return our fake temp directory.
     mocker.patch('tempfile.gettempdir', return_value=fake_temp_dir)
@@ -215,7 +250,7 @@ def test_download_file_mkdir_error(mocker, downloader_service, mock_path):
     """Tests handling of errors when creating the destination directory."""
 
     # Step 1 - Arrange
-    mocker.patch('httpx.get')
+    mocker.patch('httpx.stream')
     mocker.patch('pathlib.Path.exists', return_value=False)
 
     # Mock mkdir to raise OSError.
@@ -238,3 +273,111 @@ def test_download_file_empty_url(downloader_service, mock_path):
 
     with pytest.raises(NetworkDownloadError):
         downloader_service.download_file('invalid-url', mock_path)
+
+
+def test_download_file_reports_progress(mocker, downloader_service, mock_stream, mock_path):
+    """Tests that every chunk is counted and flushed to the progress handle."""
+
+    # Step 1 - Arrange
+    mock_response = mocker.Mock()
+    mock_response.headers = {'content-length': '11'}
+    mock_response.iter_bytes.return_value = [b'file', b'content']
+    mock_stream.return_value.__enter__.return_value = mock_response
+
+    mocker.patch('builtins.open', mocker.mock_open())
+    mocker.patch('pathlib.Path.exists', return_value=False)
+    mocker.patch('pathlib.Path.mkdir')
+    progress = mocker.Mock()
+
+    # Step 2 - Act
+    downloader_service.download_file('http://example.com/file.zip', mock_path, progress=progress)
+
+    # Step 3 - Assert
+    progress.expect.assert_called_once_with(11)
+    assert [call.args[0] for call in progress.advance.call_args_list] == [4, 7]
+    progress.flush.assert_called_once()
+
+
+def test_probe_size(mocker, downloader_service):
+    """Tests that the size probe reads the content-length of a HEAD request."""
+
+    # Step 1 - Arrange
+    mock_response = mocker.Mock()
+    mock_response.headers = {'content-length': '2048'}
+    mock_head = mocker.patch('httpx.head', return_value=mock_response)
+
+    # Step 2 - Act
+    size = downloader_service.probe_size('http://example.com/file.zip')
+
+    # Step 3 - Assert
+    mock_head.assert_called_once_with('http://example.com/file.zip', timeout=30, follow_redirects=True)
+    assert size == 2048
+
+
+def test_probe_size_is_bounded_by_token(mocker, downloader_service):
+    """Tests that the size probe honours the deadline of its token and is skipped once cancelled."""
+
+    # Step 1 - Arrange
+    mock_response = mocker.Mock()
+    mock_response.headers = {'content-length': '2048'}
+    mock_head = mocker.patch('httpx.head', return_value=mock_response)
+    cancelled = CancellationToken()
+    cancelled.cancel()
+
+    # Step 2 - Act
+    size = downloader_service.probe_size('http://example.com/file.zip', token=CancellationToken(timeout=5))
+    skipped = downloader_service.probe_size('http://example.com/file.zip', token=cancelled)
+
+    # Step 3 - Assert
+    assert size == 2048
+    assert skipped is None
+    mock_head.assert_called_once()
+    assert mock_head.call_args.kwargs['timeout'] <= 5
+
+
+def test_probe_size_failure(mocker, downloader_service):
+    """Tests that a failed size probe reports an unknown size instead of raising."""
+
+    # Step 1 - Arrange
+    mocker.patch('httpx.head', side_effect=httpx.ConnectError("Connection failed", request=mocker.Mock()))
+
+    # Step 2 - Act & Step 3 - Assert
+    assert downloader_service.probe_size('http://example.com/file.zip') is None
+
+
+def test_download_file_stops_when_cancelled(mocker, downloader_service, mock_stream, tmp_path):
+    """Tests that a cancelled token stops the transfer at the next chunk and removes the partial file."""
+
+    # Step 1 - Arrange
+    token = CancellationToken()
+
+    def chunks(chunk_size):  # pylint: disable=unused-argument
+        yield b'first'
+        token.cancel()
+        yield b'second'
+
+    mock_response = mocker.Mock()
+    mock_response.headers = {}
+    mock_response.iter_bytes.side_effect = chunks
+    mock_stream.return_value.__enter__.return_value = mock_response
+    destination = tmp_path / 'file.zip'
+
+    # Step 2 - Act & Step 3 - Assert
+    with pytest.raises(DownloadCancelledError):
+        downloader_service.download_file('http://example.com/file.zip', destination, token=token)
+
+    assert not destination.exists()
+
+
+def test_download_file_timeout_is_bounded_by_token(downloader_service, mock_stream, tmp_path):
+    """Tests that the HTTP timeout never outlives the deadline of the token."""
+
+    # Step 1 - Arrange
+    token = CancellationToken(timeout=5)
+    mock_stream.return_value.__enter__.return_value.headers = {}
+
+    # Step 2 - Act
+    downloader_service.download_file('http://example.com/file.zip', tmp_path / 'file.zip', token=token)
+
+    # Step 3 - Assert
+    assert mock_stream.call_args.kwargs['timeout'] <= 5
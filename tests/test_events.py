@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_events.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for per-task events of download batches."""
+
+# pylint: disable=redefined-outer-name
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from grabharvester.batch import TaskBatch
+from grabharvester.interfaces import DownloadTask, NetworkDownloadError, TaskEvent
+from grabharvester.manager import DownloadManager
+
+
+def _download(url, file_path, *, progress, token, **_):
+    """Simulates a transfer of 10 bytes; URLs ending in 'broken' fail and 'slow' ones wait for their token."""
+
+    if progress is not None:
+        progress.expect(10)
+        progress.advance(10)
+        progress.flush()
+    while url.endswith('slow'):
+        token.raise_if_cancelled()
+        time.sleep(0.01)
+    if url.endswith('broken'):
+        raise NetworkDownloadError(f'Failed to download {url}')
+
+    return file_path
+
+
+@pytest.fixture
+def downloader(mocker):
+    """Provides a downloader simulating transfers of 10 bytes."""
+
+    downloader = mocker.Mock()
+    downloader.download_file.side_effect = _download
+    return downloader
+
+
+@pytest.fixture
+def tasks():
+    """Provides a successful and a failing task."""
+
+    return [
+        DownloadTask(url='http://example.com/ok', destination_path=Path('/tmp/ok.bin')),
+        DownloadTask(url='http://example.com/broken', destination_path=Path('/tmp/broken.bin')),
+    ]
+
+
+def test_run_calls_event_callbacks(mocker, downloader, tasks):
+    """Tests that every callback fires with the task, its outcome and metrics."""
+
+    # Step 1 - Arrange
+    on_start, on_progress, on_complete, on_error = mocker.Mock(), mocker.Mock(), mocker.Mock(), mocker.Mock()
+    manager = DownloadManager(downloader, progress=None)
+
+    # Step 2 - Act
+    result = manager.run(tasks, on_start=on_start, on_progress=on_progress, on_complete=on_complete, on_error=on_error)
+
+    # Step 3 - Assert
+    assert result.successes == [Path('/tmp/ok.bin')]
+    assert {call.args for call in on_start.call_args_list} == {(0, tasks[0]), (1, tasks[1])}
+    on_progress.assert_any_call(0, tasks[0], 10, 10)
+
+    completed = on_complete.call_args.args[0]
+    assert (completed.index, completed.task, completed.path, completed.error) == (
+        0,
+        tasks[0],
+        Path('/tmp/ok.bin'),
+        None,
+    )
+    assert completed.metrics.bytes_downloaded == 10
+    assert completed.metrics.duration >= 0
+
+    failed = on_error.call_args.args[0]
+    assert (failed.index, failed.path) == (1, None)
+    assert isinstance(failed.error, NetworkDownloadError)
+
+
+def test_duplicates_get_events_without_metrics(mocker, downloader):
+    """Tests that a task served by another task's transfer gets its own event with empty metrics."""
+
+    # Step 1 - Arrange
+    on_complete = mocker.Mock()
+    tasks = [DownloadTask(url='http://example.com/ok', destination_path=Path('/tmp/ok.bin'))] * 2
+
+    # Step 2 - Act
+    DownloadManager(downloader, progress=None).run_batch(TaskBatch(tasks), on_complete=on_complete)
+
+    # Step 3 - Assert
+    events = sorted((call.args[0] for call in on_complete.call_args_list), key=lambda event: event.index)
+    assert [event.index for event in events] == [0, 1]
+    assert events[0].metrics.bytes_downloaded == 10
+    assert events[1].metrics.bytes_downloaded == 0
+
+
+def test_iter_events_yields_each_settled_task(downloader, tasks):
+    """Tests that the iterator yields one event per task."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(downloader, progress=None)
+
+    # Step 2 - Act
+    events = list(manager.iter_events(tasks))
+
+    # Step 3 - Assert
+    assert all(isinstance(event, TaskEvent) for event in events)
+    assert {(event.index, event.path) for event in events} == {(0, Path('/tmp/ok.bin')), (1, None)}
+
+
+def test_iter_events_stops_the_batch_when_left_early(downloader):
+    """Tests that leaving the loop early cancels the transfers still running."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(downloader, max_threads=2, progress=None)
+    tasks = [
+        DownloadTask(url='http://example.com/ok', destination_path=Path('/tmp/ok.bin')),
+        DownloadTask(url='http://example.com/slow', destination_path=Path('/tmp/slow.bin')),
+    ]
+
+    # Step 2 - Act
+    started = time.perf_counter()
+    events = manager.iter_events(tasks)
+    first = next(events)
+    events.close()
+    elapsed = time.perf_counter() - started
+
+    # Step 3 - Assert
+    assert first.index == 0
+    assert elapsed < 2
+
+
+def test_aiter_events_yields_each_settled_task(downloader, tasks):
+    """Tests the asynchronous iterator."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(downloader, progress=None)
+
+    async def collect():
+        return [event async for event in manager.aiter_events(tasks)]
+
+    # Step 2 - Act
+    events = asyncio.run(collect())
+
+    # Step 3 - Assert
+    assert sorted(event.index for event in events) == [0, 1]
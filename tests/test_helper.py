@@ -22,7 +22,7 @@ from pathlib import Path
 
 import pytest
 
-from grabharvester import download
+from grabharvester import HashPrefixLayout, download
 from grabharvester.interfaces import DownloadResult, DownloadTask
 
 
@@ -102,3 +102,19 @@ def test_download_helper_invalid_input():
     # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
     with pytest.raises(ValueError):
         download([123, "http://valid.com"])  # type: ignore
+
+
+def test_download_helper_with_layout(mock_downloader):
+    """Tests download() with a sharding layout for string URLs."""
+
+    # Step 1 - Arrange
+    mock_manager_cls, _ = mock_downloader
+    layout = HashPrefixLayout(levels=1)
+
+    # Step 2 - Act
+    download(["http://example.com/file1.zip"], destination_dir="/tmp/downloads", layout=layout)
+
+    # Step 3 - Assert
+    tasks_arg = mock_manager_cls.return_value.run.call_args[0][0]
+    assert tasks_arg[0].destination_path == layout.place(Path("/tmp/downloads"), "http://example.com/file1.zip")
+    assert mock_manager_cls.call_args.kwargs['layout'] is layout
@@ -32,9 +32,44 @@ def test_library_exposure():
         'DownloadManager',
         'DownloadTask',
         'DownloadResult',
+        'TaskBatch',
+        'BatchResult',
+        'TaskStatus',
+        'TaskEvent',
+        'TaskMetrics',
         'DownloadError',
         'NetworkDownloadError',
         'FileOperationError',
+        'DownloadCancelledError',
+        'DownloadTimeoutError',
+        'DestinationLockedError',
+        'CancellationToken',
+        'ProgressSnapshot',
+        'ProgressOption',
+        'TqdmProgressReporter',
+        'LoggingProgressReporter',
+        'CallbackProgressReporter',
+        'FlatLayout',
+        'HashPrefixLayout',
+        'DateLayout',
+        'FifoPolicy',
+        'LargestFirstPolicy',
+        'ShortestFirstPolicy',
+        'PriorityPolicy',
+        'WriterPool',
+        'MemoryBudget',
+        'MemoryResult',
+        'SpooledBuffer',
+        'ShardWriter',
+        'ShardResult',
+        'LocalSink',
+        'MemorySink',
+        'S3Sink',
+        'SinkResult',
+        'Profiler',
+        'ProfileReport',
+        'HttpSession',
+        'DnsCache',
     ]
 
     # Step 3 - Assert
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_locking.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for the cross-process locks on destination files."""
+
+# pylint: disable=redefined-outer-name
+
+import gzip
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from grabharvester.cancellation import CancellationToken
+from grabharvester.downloader import DownloadService
+from grabharvester.interfaces import DestinationLockedError, DownloadTimeoutError
+from grabharvester.locking import hold_destination, lock_path
+
+_SOURCE = Path(__file__).parent.parent / 'src'
+
+# Holds the lock of argv[1] and reports it, then waits for stdin to close.
+_HOLDER = f'''
+import sys
+sys.path.insert(0, {str(_SOURCE)!r})
+from pathlib import Path
+from grabharvester.locking import hold_destination
+with hold_destination(Path(sys.argv[1])):
+    print('locked', flush=True)
+    sys.stdin.read()
+'''
+
+
+@pytest.fixture
+def holder():
+    """Starts processes holding the lock of a file; closing their stdin releases it."""
+
+    processes = []
+
+    def start(destination):
+        """Returns a process holding the lock of `destination`."""
+
+        process = subprocess.Popen(
+            [sys.executable, '-c', _HOLDER, str(destination)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        processes.append(process)
+        assert process.stdout.readline().strip() == 'locked'
+        return process
+
+    yield start
+
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+_PAYLOAD = b''.join(bytes([number]) * 1024 for number in range(8))
+_GZIPPED = gzip.compress(_PAYLOAD)
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    """Serves 8 blocks of 1 KiB, pausing 20 ms before each one, and records the path of every request.
+
+    Paths ending with `?gzip` get the blocks gzipped, in 8 slices.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    paths = []
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answers a GET request."""
+
+        self.paths.append(self.path)
+        compress = self.path.endswith('?gzip')
+        body = _GZIPPED if compress else _PAYLOAD
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        step = -(-len(body) // 8)
+        for start in range(0, len(body), step):
+            time.sleep(0.02)
+            self.wfile.write(body[start : start + step])
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        """Silences the default request logging."""
+
+
+@pytest.fixture
+def slow_server():
+    """Runs a local HTTP server and yields the URL of its file and the path of each request."""
+
+    handler = type('Handler', (_SlowHandler,), {'paths': []})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+
+    yield f'http://{host}:{port}/data.bin', handler.paths
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def slow_url(slow_server):
+    """Yields the URL of the file of the local HTTP server."""
+
+    return slow_server[0]
+
+
+def test_skip_when_another_process_holds_the_lock(holder, tmp_path):
+    """Tests that 'skip' gives up at once on a file locked by another process."""
+
+    # Step 1 - Arrange
+    destination = tmp_path / 'file.bin'
+    holder(destination)
+
+    # Step 2 - Act & Step 3 - Assert
+    with pytest.raises(DestinationLockedError):
+        with hold_destination(destination, 'skip'):
+            pass
+
+
+def test_wait_until_another_process_releases_the_lock(holder, tmp_path):
+    """Tests that 'wait' takes the lock once the other process releases it."""
+
+    # Step 1 - Arrange
+    destination = tmp_path / 'file.bin'
+    process = holder(destination)
+    threading.Timer(0.2, process.stdin.close).start()
+    started = time.perf_counter()
+
+    # Step 2 - Act
+    with hold_destination(destination, 'wait'):
+        waited = time.perf_counter() - started
+
+    # Step 3 - Assert
+    assert waited >= 0.15
+    assert not lock_path(destination).exists()
+
+
+def test_lock_of_a_killed_process_is_recovered(holder, tmp_path):
+    """Tests that the lock file left by a killed process does not block the next one."""
+
+    # Step 1 - Arrange
+    destination = tmp_path / 'file.bin'
+    process = holder(destination)
+    process.kill()
+    process.wait()
+
+    # Step 2 - Act
+    with hold_destination(destination, 'skip'):
+        recovered = True
+
+    # Step 3 - Assert
+    assert recovered
+
+
+def test_threads_of_a_process_are_kept_apart(tmp_path):
+    """Tests that a lock held by another thread of the process is busy, and that waiting honours the token."""
+
+    # Step 1 - Arrange
+    destination = tmp_path / 'file.bin'
+
+    # Step 2 - Act & Step 3 - Assert
+    with hold_destination(destination):
+        with pytest.raises(DownloadTimeoutError):
+            with hold_destination(destination, 'wait', CancellationToken(0.1)):
+                pass
+
+
+def test_concurrent_downloads_do_not_interleave(slow_url, tmp_path):
+    """Tests that a second download of a locked file waits, then finds the file complete."""
+
+    # Step 1 - Arrange
+    destination = tmp_path / 'data.bin'
+    services = [DownloadService(lock_mode='wait'), DownloadService(lock_mode='wait')]
+    threads = [threading.Thread(target=service.download_file, args=(slow_url, destination)) for service in services]
+
+    # Step 2 - Act
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Step 3 - Assert
+    assert destination.read_bytes() == _PAYLOAD
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['data.bin']
+
+
+def test_waiting_download_reuses_a_file_completed_meanwhile(slow_server, tmp_path):
+    """Tests that a download waiting on the lock skips a compressed file the holder completed."""
+
+    # Step 1 - Arrange
+    url, paths = slow_server
+    gzip_url = f'{url}?gzip'
+    destination = tmp_path / 'data.bin'
+    services = [DownloadService(lock_mode='wait'), DownloadService(lock_mode='wait')]
+    threads = [threading.Thread(target=service.download_file, args=(gzip_url, destination)) for service in services]
+
+    # Step 2 - Act
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Step 3 - Assert
+    assert destination.read_bytes() == _PAYLOAD
+    assert paths == ['/data.bin?gzip']
+
+
+def test_download_skips_a_locked_file(holder, slow_url, tmp_path):
+    """Tests that a service in 'skip' mode reports a file locked by another process."""
+
+    # Step 1 - Arrange
+    destination = tmp_path / 'data.bin'
+    holder(destination)
+
+    # Step 2 - Act & Step 3 - Assert
+    with pytest.raises(DestinationLockedError):
+        DownloadService(lock_mode='skip').download_file(slow_url, destination)
+    assert not destination.exists()
+
+
+def test_download_service_rejects_unknown_lock_mode():
+    """Tests that an unknown lock mode is rejected up front."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    with pytest.raises(ValueError, match='Invalid lock mode'):
+        DownloadService(lock_mode='block')  # type: ignore
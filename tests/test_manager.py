@@ -18,12 +18,16 @@
 
 # pylint: disable=redefined-outer-name
 
+import threading
 from pathlib import Path
+from unittest.mock import ANY
 
 import pytest
 
+from grabharvester.downloader import DownloadService
 from grabharvester.interfaces import DownloadTask, FileOperationError, NetworkDownloadError
 from grabharvester.manager import DownloadManager
+from grabharvester.paths import HashPrefixLayout
 
 
 @pytest.fixture
@@ -35,7 +39,7 @@ def mock_downloader(mocker):
 @pytest.fixture
 def download_manager(mock_downloader):
     """Provides a DownloadManager instance with a mocked downloader."""
-    return DownloadManager(downloader=mock_downloader, max_threads=2)
+    return DownloadManager(downloader=mock_downloader, max_threads=2, progress=None)
 
 
 @pytest.fixture
@@ -63,13 +67,10 @@ def test_run_with_no_tasks(download_manager, mock_downloader):
     mock_downloader.download_file.assert_not_called()
 
 
-def test_run_all_tasks_succeed(mocker, download_manager, mock_downloader, sample_tasks):
+def test_run_all_tasks_succeed(download_manager, mock_downloader, sample_tasks):
     """Tests the scenario where all download tasks complete successfully."""
 
     # Step 1 - Arrange
-    # Mock tqdm to prevent progress bar output during tests
-    mocker.patch('grabharvester.manager.tqdm', side_effect=lambda x, **kwargs: x)
-
     # Step 2 - Act
     # Step 2 - Act
     result = download_manager.run(sample_tasks)
@@ -79,8 +80,12 @@ def test_run_all_tasks_succeed(mocker, download_manager, mock_downloader, sample
     assert len(result.successes) == len(sample_tasks)
     assert mock_downloader.download_file.call_count == len(sample_tasks)
     # Verify that the downloader was called with the correct arguments for each task
-    mock_downloader.download_file.assert_any_call(sample_tasks[0].url, sample_tasks[0].destination_path)
-    mock_downloader.download_file.assert_any_call(sample_tasks[1].url, sample_tasks[1].destination_path)
+    mock_downloader.download_file.assert_any_call(
+        sample_tasks[0].url, sample_tasks[0].destination_path, progress=None, mirrors=(), token=ANY
+    )
+    mock_downloader.download_file.assert_any_call(
+        sample_tasks[1].url, sample_tasks[1].destination_path, progress=None, mirrors=(), token=ANY
+    )
 
 
 @pytest.mark.parametrize("error_to_raise", [NetworkDownloadError, FileOperationError])
@@ -88,10 +93,8 @@ def test_run_with_specific_failures(mocker, download_manager, mock_downloader, s
     """Tests that the manager correctly handles specific download failures."""
 
     # Step 1 - Arrange
-    # Mock tqdm to prevent progress bar output
-    mocker.patch('grabharvester.manager.tqdm', side_effect=lambda x, **kwargs: x)
     # Mock logger and store the mock object to make assertions on it later.
-    mock_logger = mocker.patch('grabharvester.manager.logger')
+    mock_logger = mocker.patch('grabharvester.execution.logger')
 
     # The first task will succeed, the second will fail.
     task_to_fail = sample_tasks[1]
@@ -126,3 +129,216 @@ def test_run_with_specific_failures(mocker, download_manager, mock_downloader, s
     log_message = log_call_args[0][0]
     assert f"Task failed for {task_to_fail.destination_path.name}" in log_message
     assert error_message in log_message
+
+
+def test_run_reports_progress(mocker, mock_downloader, sample_tasks):
+    """Tests that the manager drives the progress reporter for every task."""
+
+    # Step 1 - Arrange
+    reporter = mocker.Mock()
+    manager = DownloadManager(downloader=mock_downloader, max_threads=2, progress=reporter)
+
+    # Step 2 - Act
+    manager.run(sample_tasks)
+
+    # Step 3 - Assert
+    reporter.start.assert_called_once_with(len(sample_tasks))
+    assert reporter.task_done.call_count == len(sample_tasks)
+    reporter.close.assert_called_once()
+    # Each transfer receives its own batching counter.
+    progress_handles = [call.kwargs['progress'] for call in mock_downloader.download_file.call_args_list]
+    assert all(handle is not None for handle in progress_handles)
+    assert progress_handles[0] is not progress_handles[1]
+
+
+def test_concurrent_runs_report_progress_separately(mock_downloader, sample_tasks):
+    """Tests that concurrent runs of one manager do not mix their progress counters."""
+
+    # Step 1 - Arrange
+    snapshots = []
+    manager = DownloadManager(downloader=mock_downloader, max_threads=2, progress=snapshots.append)
+    both_running = threading.Barrier(2, timeout=5)
+    mock_downloader.download_file.side_effect = lambda *args, **kwargs: both_running.wait()
+    runs = [threading.Thread(target=manager.run, args=([task],)) for task in sample_tasks]
+
+    # Step 2 - Act
+    for run in runs:
+        run.start()
+    for run in runs:
+        run.join(timeout=5)
+
+    # Step 3 - Assert
+    assert mock_downloader.download_file.call_count == len(sample_tasks)
+    assert snapshots
+    assert all(snapshot.tasks_total == 1 and snapshot.tasks_done <= 1 for snapshot in snapshots)
+
+
+def test_run_with_legacy_service_signature(tmp_path):
+    """Tests that a service implementing only `download_file(url, file_path)` still works."""
+
+    # Step 1 - Arrange
+    class LegacyService:
+        """Service written against the original two-argument interface."""
+
+        def download_file(self, url, file_path=None):
+            """Writes the URL to the file instead of downloading it."""
+
+            file_path.write_text(url)
+            return file_path
+
+    manager = DownloadManager(downloader=LegacyService(), max_threads=2, progress=None)
+    tasks = [
+        DownloadTask(url='http://example.com/a.zip', destination_path=tmp_path / 'a.zip', mirrors=('http://m/a.zip',)),
+        DownloadTask(url='http://example.com/b.zip', destination_path=tmp_path / 'b.zip'),
+    ]
+
+    # Step 2 - Act
+    result = manager.run(tasks)
+
+    # Step 3 - Assert
+    assert sorted(result.successes) == [tmp_path / 'a.zip', tmp_path / 'b.zip']
+    assert result.failures == []
+    assert (tmp_path / 'a.zip').read_text() == 'http://example.com/a.zip'
+
+
+def test_run_coalesces_duplicate_urls(mock_downloader):
+    """Tests that a URL listed twice is downloaded once and shared by both tasks."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(downloader=mock_downloader, max_threads=2, progress=None)
+    task = DownloadTask(url='http://example.com/file1.zip', destination_path=Path('/tmp/file1.zip'))
+    mock_downloader.download_file.return_value = task.destination_path
+
+    # Step 2 - Act
+    result = manager.run([task, task])
+
+    # Step 3 - Assert
+    mock_downloader.download_file.assert_called_once()
+    assert result.successes == [task.destination_path, task.destination_path]
+    assert result.failures == []
+
+
+def test_run_copies_duplicate_url_to_other_destination(mocker, mock_downloader):
+    """Tests that a duplicate URL with another destination receives a copy of the file."""
+
+    # Step 1 - Arrange
+    mock_copy = mocker.patch('grabharvester.execution.shutil.copyfile')
+    mocker.patch('pathlib.Path.mkdir')
+    manager = DownloadManager(downloader=mock_downloader, max_threads=2, progress=None)
+    tasks = [
+        DownloadTask(url='http://example.com/file1.zip', destination_path=Path('/tmp/a/file1.zip')),
+        DownloadTask(url='http://example.com/file1.zip', destination_path=Path('/tmp/b/file1.zip')),
+    ]
+    mock_downloader.download_file.return_value = tasks[0].destination_path
+
+    # Step 2 - Act
+    result = manager.run(tasks)
+
+    # Step 3 - Assert
+    mock_downloader.download_file.assert_called_once()
+    mock_copy.assert_called_once_with(tasks[0].destination_path, tasks[1].destination_path)
+    assert sorted(result.successes) == sorted(task.destination_path for task in tasks)
+
+
+def test_run_fails_duplicates_with_their_leader(mock_downloader):
+    """Tests that tasks sharing a failed transfer are all reported as failed."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(downloader=mock_downloader, max_threads=2, progress=None)
+    task = DownloadTask(url='http://example.com/file1.zip', destination_path=Path('/tmp/file1.zip'))
+    mock_downloader.download_file.side_effect = NetworkDownloadError('Simulated download error')
+
+    # Step 2 - Act
+    result = manager.run([task, task])
+
+    # Step 3 - Assert
+    mock_downloader.download_file.assert_called_once()
+    assert result.failures == [task, task]
+
+
+def test_run_shares_leader_settled_before_duplicate_is_planned(mock_downloader):
+    """Tests that a duplicate planned after its leader finished still reuses its transfer."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(downloader=mock_downloader, max_threads=1, progress=None)
+    tasks = [
+        DownloadTask(url=f'http://example.com/{number}.zip', destination_path=Path(f'/tmp/{number}.zip'))
+        for number in range(3000)
+    ]
+    tasks.append(tasks[0])
+    mock_downloader.download_file.side_effect = lambda url, destination, **_: destination
+
+    # Step 2 - Act
+    result = manager.run(tasks)
+
+    # Step 3 - Assert
+    assert mock_downloader.download_file.call_count == 3000
+    assert result.successes.count(Path('/tmp/0.zip')) == 2
+    assert result.failures == []
+
+
+def test_run_fails_duplicate_planned_after_its_leader_failed(mock_downloader):
+    """Tests that a duplicate planned after its leader failed gets the error, without its traceback."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(downloader=mock_downloader, max_threads=1, progress=None)
+    tasks = [
+        DownloadTask(url=f'http://example.com/{number}.zip', destination_path=Path(f'/tmp/{number}.zip'))
+        for number in range(3000)
+    ]
+    tasks.append(tasks[0])
+    leader_error = NetworkDownloadError('Simulated download error')
+
+    def download(url, destination, **_):
+        if url == tasks[0].url:
+            raise leader_error
+        return destination
+
+    mock_downloader.download_file.side_effect = download
+    errors = []
+
+    # Step 2 - Act
+    result = manager.run(tasks, on_error=errors.append)
+
+    # Step 3 - Assert
+    assert result.failures == [tasks[0], tasks[0]]
+    assert [event.index for event in errors] == [0, 3000]
+    assert errors[0].error is leader_error
+    assert isinstance(errors[1].error, NetworkDownloadError)
+    assert str(errors[1].error) == 'Simulated download error'
+    assert errors[1].error.__traceback__ is None
+
+
+def test_run_renames_colliding_destinations(sample_tasks, mock_downloader):
+    """Tests that different URLs mapping to the same file are written to different paths."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(downloader=mock_downloader, max_threads=2, progress=None)
+    destination = sample_tasks[0].destination_path
+    tasks = [task._replace(destination_path=destination) for task in sample_tasks]
+    mock_downloader.download_file.side_effect = lambda url, path, **kwargs: path
+
+    # Step 2 - Act
+    result = manager.run(tasks)
+
+    # Step 3 - Assert
+    assert mock_downloader.download_file.call_count == 2
+    assert len(set(result.successes)) == 2
+    assert destination in result.successes
+
+
+def test_run_uses_the_layout_of_the_service(mocker, tmp_path):
+    """Tests that a manager without a layout places files like its DownloadService would."""
+
+    # Step 1 - Arrange
+    layout = HashPrefixLayout()
+    url = 'http://example.com/a.bin'
+    download = mocker.patch.object(DownloadService, 'download_file', side_effect=lambda url, path, **kwargs: path)
+    manager = DownloadManager(downloader=DownloadService(layout=layout), progress=None)
+
+    # Step 2 - Act
+    result = manager.run([DownloadTask(url=url, destination_path=tmp_path)])
+
+    # Step 3 - Assert
+    assert result.successes == [layout.place(tmp_path, url)]
+    assert download.call_args.args[1] == layout.place(tmp_path, url)
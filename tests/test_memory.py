@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_memory.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for in-memory downloads."""
+
+# pylint: disable=redefined-outer-name
+
+import json
+
+import httpx
+import pytest
+
+from grabharvester.downloader import DownloadService
+from grabharvester.interfaces import DownloadTask, NetworkDownloadError
+from grabharvester.manager import DownloadManager
+from grabharvester.memory import MemoryBudget, SpooledBuffer
+from grabharvester.streaming import accept_encoding
+
+
+@pytest.fixture
+def mock_stream(mocker):
+    """Mocks httpx.stream with a response whose body is a small JSON document."""
+
+    response = mocker.Mock()
+    response.raise_for_status.return_value = None
+    response.headers = {'content-length': '13'}
+    response.iter_bytes.return_value = [b'{"value": ', b'42}']
+
+    stream = mocker.patch('httpx.stream')
+    stream.return_value.__enter__.return_value = response
+    return stream
+
+
+def test_buffer_stays_in_memory_below_threshold():
+    """Tests that small bodies are kept in memory and reserved from the budget until closed."""
+
+    # Step 1 - Arrange
+    budget = MemoryBudget(limit=100)
+    buffer = SpooledBuffer(budget, spill_threshold=10)
+
+    # Step 2 - Act
+    buffer.write(b'hello')
+    view = buffer.getbuffer()
+
+    # Step 3 - Assert
+    assert buffer.in_memory
+    assert bytes(view) == b'hello'
+    assert view.readonly
+    assert budget.used == 5
+
+    view.release()
+    buffer.close()
+    assert budget.used == 0
+
+
+def test_buffer_spills_above_threshold():
+    """Tests that a body growing past the threshold moves to disk and frees its memory."""
+
+    # Step 1 - Arrange
+    budget = MemoryBudget(limit=100)
+    buffer = SpooledBuffer(budget, spill_threshold=8)
+
+    # Step 2 - Act
+    buffer.write(b'hello')
+    buffer.write(b' world')
+
+    # Step 3 - Assert
+    assert not buffer.in_memory
+    assert buffer.size == 11
+    assert buffer.getvalue() == b'hello world'
+    assert buffer.open().read() == b'hello world'
+    assert budget.used == 0
+    buffer.close()
+
+
+def test_buffer_spills_when_budget_is_exhausted():
+    """Tests that the shared budget caps the bytes held in memory by all buffers."""
+
+    # Step 1 - Arrange
+    budget = MemoryBudget(limit=8)
+
+    # Step 2 - Act
+    with SpooledBuffer(budget) as first, SpooledBuffer(budget) as second:
+        first.write(b'12345')
+        second.write(b'67890')
+
+        # Step 3 - Assert
+        assert first.in_memory
+        assert not second.in_memory
+        assert budget.used == 5
+        assert second.getvalue() == b'67890'
+
+    assert budget.used == 0
+
+
+def test_download_buffer_returns_body(mock_stream):
+    """Tests that the service downloads a body into memory without opening a file."""
+
+    # Step 1 - Arrange
+    service = DownloadService()
+
+    # Step 2 - Act
+    with service.download_buffer('http://example.com/data.json') as buffer:
+
+        # Step 3 - Assert
+        assert json.load(buffer.open()) == {'value': 42}
+        assert buffer.in_memory
+    mock_stream.assert_called_once_with(
+        'GET', 'http://example.com/data.json', headers={'Accept-Encoding': accept_encoding()}, timeout=30
+    )
+
+
+def test_download_buffer_tries_mirrors(mocker, mock_stream):
+    """Tests that a failing URL is retried on the next mirror, and that the error is wrapped once all fail."""
+
+    # Step 1 - Arrange
+    response = mock_stream.return_value.__enter__.return_value
+    mock_stream.side_effect = [httpx.ConnectError('refused', request=mocker.Mock()), mock_stream.return_value]
+    service = DownloadService()
+
+    # Step 2 - Act
+    buffer = service.download_buffer('http://a.example.com/data.json', mirrors=('http://b.example.com/data.json',))
+
+    # Step 3 - Assert
+    assert buffer.getvalue() == b'{"value": 42}'
+    assert mock_stream.call_args.args[1] == 'http://b.example.com/data.json'
+    response.raise_for_status.side_effect = httpx.HTTPStatusError('404', request=mocker.Mock(), response=mocker.Mock())
+    mock_stream.side_effect = None
+    with pytest.raises(NetworkDownloadError):
+        service.download_buffer('http://a.example.com/data.json')
+
+
+def test_run_in_memory_returns_buffers(mock_stream):
+    """Tests that the manager returns one buffer per task, shared by duplicate tasks."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(DownloadService(), progress=None)
+    task = DownloadTask(url='http://example.com/data.json')
+
+    # Step 2 - Act
+    result = manager.run_in_memory([task, task, DownloadTask(url='http://example.com/other.json')])
+
+    # Step 3 - Assert
+    assert [download.task for download in result.successes].count(task) == 2
+    assert len({id(download.buffer) for download in result.successes}) == 2
+    assert all(download.buffer.getvalue() == b'{"value": 42}' for download in result.successes)
+    assert result.failures == []
+    assert mock_stream.call_count == 2
+
+
+def test_run_in_memory_requires_a_capable_service(mocker):
+    """Tests that services without in-memory support are rejected."""
+
+    # Step 1 - Arrange
+    manager = DownloadManager(mocker.Mock(spec=['download_file']), progress=None)
+
+    # Step 2 - Act & Step 3 - Assert
+    with pytest.raises(TypeError, match='cannot download into memory'):
+        manager.run_in_memory([DownloadTask(url='http://example.com/data.json')])
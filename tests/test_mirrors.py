@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_mirrors.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for mirror-aware downloads, against a local HTTP server."""
+
+# pylint: disable=redefined-outer-name
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import ANY
+
+import pytest
+
+from grabharvester import mirrors as mirrors_module
+from grabharvester.batch import TaskBatch
+from grabharvester.downloader import DownloadService
+from grabharvester.interfaces import DownloadTask, NetworkDownloadError
+from grabharvester.manager import DownloadManager
+from grabharvester.mirrors import MirrorDownload
+from grabharvester.pipeline import WriterPool
+from grabharvester.profiling import Profiler
+
+PAYLOAD = bytes(range(256)) * 1024
+
+
+class _MirrorHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD under /ok, /stall (after the test releases it), /noranges and /missing."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        """Answers a HEAD request."""
+
+        self.__respond(send_body=False)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answers a GET request."""
+
+        self.__respond(send_body=True)
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        """Silences the default request logging."""
+
+    def __respond(self, send_body: bool) -> None:
+        self.server.requests.append((self.command, self.path, self.headers.get('Range')))
+
+        if self.path == '/missing':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/stall' and send_body:
+            self.server.release.wait(timeout=10)
+
+        body, status = PAYLOAD, 200
+        byte_range = self.headers.get('Range')
+        if byte_range and self.path != '/noranges':
+            first, last = (int(value) for value in byte_range.removeprefix('bytes=').split('-'))
+            body, status = PAYLOAD[first : last + 1], 206
+
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        if self.path != '/noranges':
+            self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        if send_body:
+            try:
+                self.wfile.write(body)
+            except OSError:
+                pass
+
+
+@pytest.fixture
+def mirror_server():
+    """Runs the mirror server in the background and yields its base URL and the server itself."""
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _MirrorHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.release = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+
+    yield f'http://127.0.0.1:{server.server_address[1]}', server
+
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_failover_uses_next_mirror(mirror_server, tmp_path):
+    """Tests that a failing mirror is skipped in favour of the next one."""
+
+    # Step 1 - Arrange
+    base_url, _ = mirror_server
+    destination = tmp_path / 'file.bin'
+
+    # Step 2 - Act
+    result = MirrorDownload([f'{base_url}/missing', f'{base_url}/ok'], destination).run('failover')
+
+    # Step 3 - Assert
+    assert result == destination
+    assert destination.read_bytes() == PAYLOAD
+    assert list(tmp_path.iterdir()) == [destination]
+
+
+def test_failover_raises_when_every_mirror_fails(mirror_server, tmp_path):
+    """Tests that a download fails once every mirror failed."""
+
+    # Step 1 - Arrange
+    base_url, _ = mirror_server
+
+    # Step 2 - Act & Step 3 - Assert
+    with pytest.raises(NetworkDownloadError, match='All 2 mirrors'):
+        MirrorDownload([f'{base_url}/missing', f'{base_url}/missing'], tmp_path / 'file.bin').run('failover')
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_hedged_races_a_stalled_mirror(mirror_server, tmp_path):
+    """Tests that a stalled request is hedged with another mirror and then cancelled."""
+
+    # Step 1 - Arrange
+    base_url, _ = mirror_server
+    destination = tmp_path / 'file.bin'
+    download = MirrorDownload([f'{base_url}/stall', f'{base_url}/ok'], destination, hedge_delay=0.2)
+
+    # Step 2 - Act
+    started = time.perf_counter()
+    result = download.run('hedged')
+    elapsed = time.perf_counter() - started
+
+    # Step 3 - Assert
+    assert result == destination
+    assert destination.read_bytes() == PAYLOAD
+    # The stalled mirror would have held the download for 10 seconds.
+    assert elapsed < 5
+    assert list(tmp_path.iterdir()) == [destination]
+
+
+def test_hedged_joins_the_losing_attempts(mirror_server, tmp_path):
+    """Tests that a hedged download returns only once its stalled attempt was aborted and joined."""
+
+    # Step 1 - Arrange
+    base_url, _ = mirror_server
+    download = MirrorDownload([f'{base_url}/stall', f'{base_url}/ok'], tmp_path / 'file.bin', hedge_delay=0.2)
+
+    before = set(threading.enumerate())
+
+    # Step 2 - Act
+    started = time.perf_counter()
+    download.run('hedged')
+    elapsed = time.perf_counter() - started
+
+    # Step 3 - Assert
+    assert elapsed < 5
+    # Only the server still serves the stalled request.
+    left = set(threading.enumerate()) - before
+    assert all('process_request' in thread.name for thread in left)
+
+
+def test_hedged_writes_through_the_writer_pool_and_profiler(mocker, mirror_server, tmp_path):
+    """Tests that hedged attempts write through the writer pool and report their phases to the profiler."""
+
+    # Step 1 - Arrange
+    base_url, _ = mirror_server
+    destination = tmp_path / 'file.bin'
+    mirror_urls = [f'{base_url}/stall', f'{base_url}/ok']
+    profiler = Profiler()
+
+    # Step 2 - Act
+    with WriterPool() as pool:
+        open_file = mocker.spy(pool, 'open')
+        with profiler.activate() as timer:
+            MirrorDownload(mirror_urls, destination, hedge_delay=0.2, writer_pool=pool).run('hedged')
+
+    # Step 3 - Assert
+    assert destination.read_bytes() == PAYLOAD
+    assert open_file.call_args.args[0].name == 'file.bin.1.part'
+    assert {'client', 'read', 'write'} <= set(timer.seconds)
+
+
+def test_segmented_fetches_ranges_from_every_mirror(mocker, mirror_server, tmp_path):
+    """Tests that a segmented download spreads byte ranges across mirrors and reassembles them."""
+
+    # Step 1 - Arrange
+    mocker.patch.object(mirrors_module, 'MIN_SEGMENT_SIZE', 64 * 1024)
+    base_url, server = mirror_server
+    destination = tmp_path / 'file.bin'
+    mirror_urls = [f'{base_url}/ok', f'{base_url}/ok?mirror=2']
+    progress = mocker.Mock()
+
+    # Step 2 - Act
+    MirrorDownload(mirror_urls, destination, progress=progress, segments=4).run('segmented')
+
+    # Step 3 - Assert
+    assert destination.read_bytes() == PAYLOAD
+    progress.expect.assert_called_once_with(len(PAYLOAD))
+    assert sum(call.args[0] for call in progress.advance.call_args_list) == len(PAYLOAD)
+    ranged = [path for command, path, byte_range in server.requests if command == 'GET' and byte_range]
+    assert len(ranged) == 4
+    assert set(ranged) == {'/ok', '/ok?mirror=2'}
+
+
+def test_segmented_falls_back_without_range_support(mocker, mirror_server, tmp_path):
+    """Tests that mirrors without byte range support are downloaded whole."""
+
+    # Step 1 - Arrange
+    mocker.patch.object(mirrors_module, 'MIN_SEGMENT_SIZE', 64 * 1024)
+    base_url, server = mirror_server
+    destination = tmp_path / 'file.bin'
+
+    # Step 2 - Act
+    MirrorDownload([f'{base_url}/noranges'], destination).run('segmented')
+
+    # Step 3 - Assert
+    assert destination.read_bytes() == PAYLOAD
+    assert not [request for request in server.requests if request[2]]
+
+
+def test_download_service_delegates_mirrors(mocker, tmp_path):
+    """Tests that the service only uses the mirror download when the task has mirrors."""
+
+    # Step 1 - Arrange
+    mirror_download = mocker.patch('grabharvester.downloader.MirrorDownload')
+    mirror_download.return_value.run.return_value = tmp_path / 'file.bin'
+    service = DownloadService(mirror_mode='failover')
+
+    # Step 2 - Act
+    result = service.download_file(
+        'http://a.example.com/file.bin', tmp_path, mirrors=('http://b.example.com/file.bin',)
+    )
+
+    # Step 3 - Assert
+    assert result == tmp_path / 'file.bin'
+    assert mirror_download.call_args.args[0] == ['http://a.example.com/file.bin', 'http://b.example.com/file.bin']
+    mirror_download.return_value.run.assert_called_once_with('failover')
+
+
+def test_download_service_rejects_unknown_mirror_mode():
+    """Tests that an unknown mirror mode is rejected up front."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    with pytest.raises(ValueError, match='Invalid mirror mode'):
+        DownloadService(mirror_mode='fastest')  # type: ignore
+
+
+def test_manager_passes_task_mirrors(mocker):
+    """Tests that the manager forwards the mirrors of a task to the service."""
+
+    # Step 1 - Arrange
+    downloader = mocker.Mock()
+    downloader.download_file.return_value = Path('/tmp/out/file.bin')
+    task = DownloadTask(
+        url='http://a.example.com/file.bin',
+        destination_path=Path('/tmp/out/file.bin'),
+        mirrors=('http://b.example.com/file.bin',),
+    )
+
+    # Step 2 - Act
+    DownloadManager(downloader, progress=None).run([task])
+
+    # Step 3 - Assert
+    downloader.download_file.assert_called_once_with(
+        task.url, Path('/tmp/out/file.bin'), progress=None, mirrors=('http://b.example.com/file.bin',), token=ANY
+    )
+
+
+def test_task_batch_keeps_mirrors():
+    """Tests that mirrors survive the compact batch representation."""
+
+    # Step 1 - Arrange
+    task = DownloadTask(url='http://a.example.com/f', mirrors=('http://b.example.com/f', 'http://c.example.com/f'))
+
+    # Step 2 - Act
+    batch = TaskBatch([task, 'http://a.example.com/g'])
+
+    # Step 3 - Assert
+    assert batch[0] == task
+    assert batch[1].mirrors == ()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_network.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for the shared HTTP session and its DNS cache."""
+
+# pylint: disable=redefined-outer-name
+
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+import pytest
+
+from grabharvester.cancellation import CancellationToken
+from grabharvester.downloader import DownloadService
+from grabharvester.interfaces import DownloadTask
+from grabharvester.manager import DownloadManager
+from grabharvester.network import DnsCache, HttpSession
+
+_BODY = b'grab harvester ' * 64
+
+
+def _address_info(address):
+    """Returns a `getaddrinfo` result holding `address`."""
+
+    return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, 80))]
+
+
+class _CountingHandler(BaseHTTPRequestHandler):
+    """Serves `_BODY` and records the client port of every GET request, and the HEAD requests."""
+
+    protocol_version = 'HTTP/1.1'
+    ports = []
+    heads = []
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answers a GET request."""
+
+        self.ports.append(self.client_address[1])
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(_BODY)))
+        self.end_headers()
+        self.wfile.write(_BODY)
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        """Answers a HEAD request."""
+
+        self.heads.append((self.path, self.client_address[1]))
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(_BODY)))
+        self.end_headers()
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        """Silences the default request logging."""
+
+
+@pytest.fixture
+def http_server():
+    """Runs a local HTTP server and yields its base URL and its handler class, holding the recorded requests."""
+
+    handler = type('Handler', (_CountingHandler,), {'ports': [], 'heads': []})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_address[1]
+
+    yield f'http://localhost:{port}', handler
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def server_url(http_server):
+    """Yields the base URL of the local HTTP server and the ports its clients connected from."""
+
+    base_url, handler = http_server
+    return base_url, handler.ports
+
+
+def test_resolutions_are_cached_until_they_expire(mocker):
+    """Tests that a host is resolved once while fresh, and again once expired."""
+
+    # Step 1 - Arrange
+    lookup = mocker.patch('socket.getaddrinfo', return_value=_address_info('192.0.2.1'))
+    clock = mocker.patch('grabharvester.network.time.monotonic', return_value=100.0)
+    cache = DnsCache(ttl=10)
+
+    # Step 2 - Act
+    first = cache.resolve('example.com', 80)
+    second = cache.resolve('example.com', 80)
+    clock.return_value = 111.0
+    third = cache.resolve('example.com', 80)
+
+    # Step 3 - Assert
+    assert first == second == third == ['192.0.2.1']
+    assert lookup.call_count == 2
+
+
+def test_failed_resolutions_are_cached(mocker):
+    """Tests that a host that cannot be resolved is not looked up again for every task."""
+
+    # Step 1 - Arrange
+    lookup = mocker.patch('socket.getaddrinfo', side_effect=socket.gaierror(-2, 'Name or service not known'))
+    cache = DnsCache()
+
+    # Step 2 - Act & Step 3 - Assert
+    for _ in range(3):
+        with pytest.raises(socket.gaierror):
+            cache.resolve('missing.invalid', 80)
+    assert lookup.call_count == 1
+
+
+def test_addresses_are_not_resolved(mocker):
+    """Tests that IP addresses are returned as they are."""
+
+    # Step 1 - Arrange
+    lookup = mocker.patch('socket.getaddrinfo')
+    cache = DnsCache()
+
+    # Step 2 - Act & Step 3 - Assert
+    assert cache.resolve('127.0.0.1', 80) == ['127.0.0.1']
+    assert cache.resolve('[::1]', 80) == ['::1']
+    lookup.assert_not_called()
+
+
+def test_session_reuses_its_connection(mocker, server_url, tmp_path):
+    """Tests that consecutive downloads through a session share one connection and one lookup."""
+
+    # Step 1 - Arrange
+    base_url, ports = server_url
+    lookup = mocker.spy(socket, 'getaddrinfo')
+
+    # Step 2 - Act
+    with HttpSession() as session:
+        service = DownloadService(session=session)
+        for number in range(3):
+            service.download_file(f'{base_url}/{number}.bin', tmp_path / f'{number}.bin')
+
+    # Step 3 - Assert
+    assert len(ports) == 3
+    assert len(set(ports)) == 1
+    assert [call.args[0] for call in lookup.call_args_list].count('localhost') == 1
+    assert all((tmp_path / f'{number}.bin').read_bytes() == _BODY for number in range(3))
+
+
+def test_probes_and_mirrors_use_the_session(mocker, server_url, tmp_path):
+    """Tests that size probes and tasks with mirrors resolve their host through the session."""
+
+    # Step 1 - Arrange
+    base_url, ports = server_url
+    lookup = mocker.spy(socket, 'getaddrinfo')
+
+    # Step 2 - Act
+    with HttpSession() as session:
+        service = DownloadService(session=session, mirror_mode='failover')
+        size = service.probe_size(f'{base_url}/a.bin')
+        service.download_file(f'{base_url}/a.bin', tmp_path / 'a.bin', mirrors=(f'{base_url}/b.bin',))
+
+    # Step 3 - Assert
+    assert size == len(_BODY)
+    assert len(ports) == 1
+    assert (tmp_path / 'a.bin').read_bytes() == _BODY
+    assert [call.args[0] for call in lookup.call_args_list].count('localhost') == 1
+
+
+def test_session_raises_httpx_errors():
+    """Tests that connection failures surface as httpx errors, as with the default transport."""
+
+    # Step 1 - Arrange
+    with HttpSession() as session:
+        # Step 2 - Act & Step 3 - Assert
+        with pytest.raises(httpx.ConnectError):
+            with session.stream('http://127.0.0.1:1/file.bin', headers={}, timeout=5):
+                pass
+
+
+def test_session_sends_requests_through_its_proxy(mocker, server_url, tmp_path):
+    """Tests that a proxy gets the requests, and only the proxy host is resolved."""
+
+    # Step 1 - Arrange
+    base_url, ports = server_url
+    lookup = mocker.spy(socket, 'getaddrinfo')
+
+    # Step 2 - Act
+    with HttpSession(proxy=base_url) as session:
+        DownloadService(session=session).download_file('http://files.invalid/a.bin', tmp_path / 'a.bin')
+
+    # Step 3 - Assert
+    assert len(ports) == 1
+    assert (tmp_path / 'a.bin').read_bytes() == _BODY
+    assert 'files.invalid' not in [call.args[0] for call in lookup.call_args_list]
+
+
+def test_session_rejects_unsupported_proxies():
+    """Tests that a proxy the session cannot use is rejected up front."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    with pytest.raises(ValueError, match='Unsupported proxy'):
+        HttpSession(proxy='socks5://127.0.0.1:1080')
+
+
+def test_prewarm_only_requests_the_origin_root(http_server, tmp_path):
+    """Tests that pre-warming never requests the file itself, and leaves its connection to the download."""
+
+    # Step 1 - Arrange
+    base_url, handler = http_server
+
+    # Step 2 - Act
+    with HttpSession() as session:
+        session.prewarm(f'{base_url}/data/file.bin?version=2')
+        DownloadService(session=session).download_file(f'{base_url}/data/file.bin?version=2', tmp_path / 'file.bin')
+
+    # Step 3 - Assert
+    assert [path for path, _ in handler.heads] == ['/']
+    assert handler.ports == [handler.heads[0][1]]
+
+
+def test_prewarm_failures_are_only_logged():
+    """Tests that pre-warming an unreachable host does not raise."""
+
+    # Step 1 - Arrange
+    with HttpSession() as session:
+        # Step 2 - Act & Step 3 - Assert
+        session.prewarm('http://127.0.0.1:1/file.bin')
+
+
+def test_manager_prewarms_each_host_once(mocker):
+    """Tests that look-ahead pre-warms every host of the queue once."""
+
+    # Step 1 - Arrange
+    downloader = mocker.Mock()
+    hosts = ['a.example.com', 'b.example.com', 'a.example.com', 'c.example.com', 'b.example.com']
+    tasks = [
+        DownloadTask(url=f'http://{host}/{number}.bin', destination_path=Path(f'/tmp/{number}.bin'))
+        for number, host in enumerate(hosts)
+    ]
+    manager = DownloadManager(downloader=downloader, max_threads=2, progress=None, lookahead=2)
+
+    # Step 2 - Act
+    result = manager.run(tasks)
+
+    # Step 3 - Assert
+    assert len(result.successes) == len(tasks)
+    warmed = sorted(call.args[0].split('/')[2] for call in downloader.prewarm.call_args_list)
+    assert warmed == ['a.example.com', 'b.example.com', 'c.example.com']
+
+
+def test_stopped_batch_stops_prewarming(mocker):
+    """Tests that a stopped batch does not pre-warm the hosts of the tasks it skips."""
+
+    # Step 1 - Arrange
+    downloader = mocker.Mock()
+    token = CancellationToken()
+    downloader.download_file.side_effect = lambda *args, **kwargs: token.cancel()
+    tasks = [
+        DownloadTask(url=f'http://host{number}.example.com/file.bin', destination_path=Path(f'/tmp/{number}.bin'))
+        for number in range(200)
+    ]
+    manager = DownloadManager(downloader=downloader, max_threads=1, progress=None, lookahead=2)
+
+    # Step 2 - Act
+    warm = mocker.spy(ThreadPoolExecutor, 'submit')
+    manager.run(tasks, token=token)
+
+    # Step 3 - Assert
+    warmed = [call for call in warm.call_args_list if call.args[1] is downloader.prewarm]
+    assert len(warmed) < 10
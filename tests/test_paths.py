@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_paths.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for the path helpers, directory layouts and directory cache."""
+
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from grabharvester.paths import (
+    DateLayout,
+    DirectoryCache,
+    FlatLayout,
+    HashPrefixLayout,
+    filename_from_url,
+    resolve_destination,
+)
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ('http://example.com/data/file.zip', 'file.zip'),
+        ('http://example.com/data/file.zip?token=abc', 'file.zip'),
+        ('http://example.com/data/', 'downloaded_file'),
+    ],
+)
+def test_filename_from_url(url, expected):
+    """Tests the filename derived from a URL."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    assert filename_from_url(url) == expected
+
+
+def test_flat_layout():
+    """Tests that the flat layout places files directly in the directory."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    assert FlatLayout().place(Path('/data'), 'http://example.com/a.zip') == Path('/data/a.zip')
+
+
+def test_hash_prefix_layout_is_deterministic():
+    """Tests that the hash prefix layout shards by filename, independently of the host."""
+
+    # Step 1 - Arrange
+    layout = HashPrefixLayout(levels=2, width=2)
+
+    # Step 2 - Act
+    first = layout.place(Path('/data'), 'http://one.example.com/a.zip')
+    second = layout.place(Path('/data'), 'http://two.example.com/a.zip')
+
+    # Step 3 - Assert
+    assert first == second
+    assert first.name == 'a.zip'
+    shard_one, shard_two = first.relative_to('/data').parts[:2]
+    assert len(shard_one) == len(shard_two) == 2
+    assert int(shard_one + shard_two, 16) >= 0
+
+    with pytest.raises(ValueError):
+        HashPrefixLayout(levels=0)
+
+
+def test_date_layout():
+    """Tests that the date layout nests files by date."""
+
+    # Step 1 - Arrange
+    layout = DateLayout(clock=lambda: datetime(2024, 5, 17))
+
+    # Step 2 - Act & Step 3 - Assert
+    assert layout.place(Path('/data'), 'http://example.com/a.zip') == Path('/data/2024/05/17/a.zip')
+
+
+def test_directory_cache_creates_each_directory_once(mocker):
+    """Tests that known directories (and their parents) are not created again."""
+
+    # Step 1 - Arrange
+    mock_mkdir = mocker.patch('pathlib.Path.mkdir')
+    cache = DirectoryCache()
+
+    # Step 2 - Act
+    cache.ensure(Path('/data/ab/cd'))
+    cache.ensure(Path('/data/ab/cd'))
+    cache.ensure(Path('/data/ab'))
+
+    # Step 3 - Assert
+    mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
+    assert cache.is_dir(Path('/data/ab'))
+
+    # A discarded directory is created again.
+    cache.discard(Path('/data/ab/cd'))
+    cache.ensure(Path('/data/ab/cd'))
+    assert mock_mkdir.call_count == 2
+
+
+def test_directory_cache_is_bounded(mocker):
+    """Tests that the cache resets instead of growing beyond its limit."""
+
+    # Step 1 - Arrange
+    mocker.patch('pathlib.Path.mkdir')
+    cache = DirectoryCache(max_entries=10)
+
+    # Step 2 - Act
+    for number in range(20):
+        cache.ensure(Path(f'/d{number}'))
+
+    # Step 3 - Assert
+    assert len(cache) <= 10
+
+
+def test_resolve_destination_applies_layout(tmp_path):
+    """Tests that the layout is applied when the destination is a directory."""
+
+    # Step 1 - Arrange
+    layout = HashPrefixLayout(levels=1)
+    url = 'http://example.com/a.zip'
+
+    # Step 2 - Act & Step 3 - Assert
+    assert resolve_destination(url, tmp_path, layout) == layout.place(tmp_path, url)
+    assert resolve_destination(url, tmp_path / 'b.zip', layout) == tmp_path / 'b.zip'
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_pipeline.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for the pipelined writer pool."""
+
+# pylint: disable=redefined-outer-name
+
+import io
+import threading
+
+import pytest
+
+from grabharvester.downloader import DownloadService
+from grabharvester.interfaces import FileOperationError
+from grabharvester.pipeline import BufferPool, WriterPool
+
+
+@pytest.fixture
+def writer_pool():
+    """Provides a writer pool with tiny buffers, so every test spans several of them."""
+
+    with WriterPool(writers=2, queue_depth=4, buffer_size=4) as pool:
+        yield pool
+
+
+def test_buffer_pool_recycles_buffers():
+    """Tests that released buffers are reused, up to the pool capacity."""
+
+    # Step 1 - Arrange
+    pool = BufferPool(buffer_size=8, capacity=1)
+
+    # Step 2 - Act
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    third = pool.acquire()
+
+    # Step 3 - Assert
+    assert third is first
+    assert len(third) == 8
+    assert pool.allocated == 2
+
+
+def test_pipelined_files_are_written_in_order(writer_pool, tmp_path):
+    """Tests that concurrent files split across many buffers are written intact."""
+
+    # Step 1 - Arrange
+    contents = {tmp_path / f'{number}.bin': bytes(range(number, number + 50)) for number in range(4)}
+
+    def write(path, data):
+        with writer_pool.open(path) as file:
+            for start in range(0, len(data), 3):
+                file.write(data[start : start + 3])
+
+    threads = [threading.Thread(target=write, args=item) for item in contents.items()]
+
+    # Step 2 - Act
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # Step 3 - Assert
+    for path, data in contents.items():
+        assert path.read_bytes() == data
+    # 4 files of 50 bytes in 4-byte buffers, recycled instead of allocated for every write.
+    assert writer_pool.buffers.allocated < 50
+
+
+def test_writer_backpressure_blocks_the_network_side(mocker):
+    """Tests that writing blocks once the writer falls behind and the queue is full."""
+
+    # Step 1 - Arrange
+    release = threading.Event()
+
+    class SlowFile(io.BytesIO):
+        """A file whose writes wait for the test."""
+
+        def write(self, data):
+            release.wait(timeout=5)
+            return super().write(data)
+
+    mocker.patch('grabharvester.pipeline.open_for_writing', return_value=SlowFile())
+    finished = threading.Event()
+
+    with WriterPool(writers=1, queue_depth=1, buffer_size=4) as pool:
+
+        def write():
+            with pool.open('slow.bin') as file:
+                file.write(b'x' * 16)
+            finished.set()
+
+        thread = threading.Thread(target=write)
+
+        # Step 2 - Act
+        thread.start()
+        blocked = not finished.wait(timeout=0.2)
+        release.set()
+        thread.join(timeout=5)
+
+    # Step 3 - Assert
+    assert blocked
+    assert finished.is_set()
+
+
+def test_write_errors_surface_on_close(mocker, writer_pool):
+    """Tests that an error of the writer thread is raised to the downloading thread."""
+
+    # Step 1 - Arrange
+    broken_file = mocker.Mock()
+    broken_file.write.side_effect = OSError('disk full')
+    mocker.patch('grabharvester.pipeline.open_for_writing', return_value=broken_file)
+
+    # Step 2 - Act & Step 3 - Assert
+    with pytest.raises(OSError, match='disk full'):
+        with writer_pool.open('broken.bin') as file:
+            file.write(b'data')
+
+    broken_file.close.assert_called_once_with()
+
+
+def test_download_service_uses_writer_pool(mocker, writer_pool, tmp_path):
+    """Tests that the service writes through the pool and wraps its errors."""
+
+    # Step 1 - Arrange
+    mock_response = mocker.Mock()
+    mock_response.headers = {}
+    mock_response.iter_bytes.return_value = [b'file', b'content', b'!']
+    mocker.patch('httpx.stream').return_value.__enter__.return_value = mock_response
+    service = DownloadService(writer_pool=writer_pool)
+
+    # Step 2 - Act
+    result = service.download_file('http://example.com/file.zip', tmp_path / 'file.zip')
+
+    # Step 3 - Assert
+    assert result.read_bytes() == b'filecontent!'
+
+    mocker.patch('grabharvester.pipeline.open_for_writing', side_effect=PermissionError('denied'))
+    with pytest.raises(FileOperationError):
+        service.download_file('http://example.com/file.zip', tmp_path / 'other.zip')
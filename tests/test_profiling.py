@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_profiling.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for the profiling mode."""
+
+# pylint: disable=redefined-outer-name
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from grabharvester.downloader import DownloadService
+from grabharvester.interfaces import DownloadTask
+from grabharvester.manager import DownloadManager
+from grabharvester.profiling import PhaseTimer, Profiler, active_timer
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    """Serves 4 blocks of 1 KiB, pausing 20 ms before each one."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answers a GET request."""
+
+        self.send_response(200)
+        self.send_header('Content-Length', str(4 * 1024))
+        self.end_headers()
+        for _ in range(4):
+            time.sleep(0.02)
+            self.wfile.write(b'x' * 1024)
+            self.wfile.flush()
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        """Silences the default request logging."""
+
+
+@pytest.fixture
+def slow_server():
+    """Runs a local HTTP server and yields its base URL."""
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _SlowHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+
+    yield f'http://{host}:{port}'
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_phase_timer_times_calls_and_iterations():
+    """Tests that wrapped calls and iterations are added to their phase."""
+
+    # Step 1 - Arrange
+    timer = PhaseTimer()
+
+    # Step 2 - Act
+    items = list(timer.iterate('read', [1, 2, 3]))
+    timer.wrap('write', lambda data: time.sleep(0.01))(b'data')
+
+    # Step 3 - Assert
+    assert items == [1, 2, 3]
+    assert timer.counts == {'read': 4, 'write': 1}
+    assert timer.seconds['write'] >= 0.01
+
+
+def test_manager_reports_the_phases_of_each_worker(slow_server, tmp_path):
+    """Tests that every transfer is split into connection, read and write phases."""
+
+    # Step 1 - Arrange
+    profiler = Profiler()
+    manager = DownloadManager(DownloadService(), max_threads=2, progress=None, profiler=profiler)
+    tasks = [DownloadTask(url=f'{slow_server}/{name}.bin', destination_path=tmp_path) for name in 'ab']
+
+    # Step 2 - Act
+    result = manager.run(tasks)
+    report = profiler.report()
+
+    # Step 3 - Assert
+    assert len(result.successes) == 2
+    totals = report.totals()
+    assert {'connect', 'request', 'wait', 'read', 'write', 'other', 'settle'} <= set(totals)
+    assert totals['read'] >= 0.05
+    assert report.wall_time >= totals['transfer'] / 2
+    assert 'read' in report.format()
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in report.collapsed())
+    assert active_timer() is None
+
+
+def test_sampling_writes_collapsed_stacks(slow_server, tmp_path):
+    """Tests that sampled stacks of the workers are written in the collapsed format."""
+
+    # Step 1 - Arrange
+    profiler = Profiler(sample_interval=0.002)
+    manager = DownloadManager(DownloadService(), progress=None, profiler=profiler)
+    output = tmp_path / 'stacks.txt'
+
+    # Step 2 - Act
+    manager.run([DownloadTask(url=f'{slow_server}/a.bin', destination_path=tmp_path)])
+    profiler.report().write_collapsed(output)
+
+    # Step 3 - Assert
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert lines
+    assert any('grabharvester.downloader:' in line for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
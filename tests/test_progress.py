@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_progress.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for the progress reporting module."""
+
+import pytest
+
+from grabharvester.progress import (
+    CallbackProgressReporter,
+    LoggingProgressReporter,
+    ProgressSnapshot,
+    TqdmProgressReporter,
+    TransferProgress,
+    resolve_progress_reporter,
+)
+
+
+def test_transfer_progress_batches_updates(mocker):
+    """Tests that bytes are only forwarded once the flush threshold is reached."""
+
+    # Step 1 - Arrange
+    reporter = mocker.Mock()
+    progress = TransferProgress(reporter, flush_bytes=100)
+
+    # Step 2 - Act
+    for _ in range(25):
+        progress.advance(10)
+    progress.flush()
+
+    # Step 3 - Assert
+    # 250 bytes: two batches of 100 bytes and a final flush of the remaining 50.
+    assert [call.args[0] for call in reporter.advance_bytes.call_args_list] == [100, 100, 50]
+
+
+def test_callback_reporter_aggregates_workers():
+    """Tests that the callback receives aggregated snapshots of the whole batch."""
+
+    # Step 1 - Arrange
+    snapshots = []
+    reporter = CallbackProgressReporter(snapshots.append)
+    reporter.start(total_tasks=2)
+
+    # Step 2 - Act
+    first = TransferProgress(reporter, flush_bytes=1)
+    second = TransferProgress(reporter, flush_bytes=1)
+    first.expect(10)
+    second.expect(20)
+    first.advance(10)
+    second.advance(20)
+    reporter.task_done()
+    reporter.task_done()
+    reporter.close()
+
+    # Step 3 - Assert
+    assert snapshots[-1] == ProgressSnapshot(bytes_done=30, bytes_total=30, tasks_done=2, tasks_total=2)
+
+
+def test_logging_reporter_logs_final_state(mocker):
+    """Tests that the logging reporter always logs when the batch finishes."""
+
+    # Step 1 - Arrange
+    mock_logger = mocker.patch('grabharvester.progress.logger')
+    reporter = LoggingProgressReporter(interval=3600)
+    reporter.start(total_tasks=1)
+
+    # Step 2 - Act
+    reporter.advance_bytes(512)
+    reporter.task_done()
+    reporter.close()
+
+    # Step 3 - Assert
+    mock_logger.info.assert_called_once()
+    assert '1/1 files' in mock_logger.info.call_args[0][0]
+
+
+def test_tqdm_reporter_tracks_bytes(mocker):
+    """Tests that the tqdm reporter drives a byte-level bar."""
+
+    # Step 1 - Arrange
+    mock_tqdm = mocker.patch('grabharvester.progress.tqdm')
+    reporter = TqdmProgressReporter()
+
+    # Step 2 - Act
+    reporter.start(total_tasks=1)
+    reporter.add_total_bytes(2048)
+    reporter.advance_bytes(1024)
+    reporter.close()
+
+    # Step 3 - Assert
+    progress_bar = mock_tqdm.return_value
+    assert progress_bar.total == 2048
+    progress_bar.update.assert_called_once_with(1024)
+    progress_bar.close.assert_called_once()
+
+
+def test_resolve_progress_reporter_auto(mocker):
+    """Tests that 'auto' only enables the progress bar on interactive terminals."""
+
+    # Step 1 - Arrange
+    mock_stderr = mocker.patch('grabharvester.progress.sys.stderr')
+
+    # Step 2 - Act & Step 3 - Assert
+    mock_stderr.isatty.return_value = False
+    assert resolve_progress_reporter('auto') is None
+
+    mock_stderr.isatty.return_value = True
+    assert isinstance(resolve_progress_reporter('auto'), TqdmProgressReporter)
+
+
+def test_resolve_progress_reporter_options():
+    """Tests the explicit progress options."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    assert resolve_progress_reporter(None) is None
+    assert resolve_progress_reporter('none') is None
+    assert isinstance(resolve_progress_reporter('log'), LoggingProgressReporter)
+    assert isinstance(resolve_progress_reporter(print), CallbackProgressReporter)
+
+    with pytest.raises(ValueError):
+        resolve_progress_reporter('fancy')
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_scheduling.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for the scheduling policies."""
+
+# pylint: disable=redefined-outer-name
+
+import time
+from pathlib import Path
+from unittest.mock import ANY
+
+import pytest
+
+from grabharvester.interfaces import DownloadTask
+from grabharvester.manager import DownloadManager
+from grabharvester.scheduling import (
+    UNKNOWN_SIZE,
+    FifoPolicy,
+    LargestFirstPolicy,
+    PriorityPolicy,
+    ShortestFirstPolicy,
+)
+
+
+@pytest.fixture
+def sized_tasks():
+    """Provides tasks of various sizes, one of them unknown."""
+
+    return [
+        DownloadTask(url='http://example.com/small.bin', destination_path=Path('/tmp/small.bin'), size_hint=10),
+        DownloadTask(url='http://example.com/huge.bin', destination_path=Path('/tmp/huge.bin'), size_hint=10_000),
+        DownloadTask(url='http://example.com/unknown.bin', destination_path=Path('/tmp/unknown.bin')),
+        DownloadTask(url='http://example.com/medium.bin', destination_path=Path('/tmp/medium.bin'), size_hint=500),
+    ]
+
+
+@pytest.mark.parametrize(
+    "policy, expected",
+    [
+        (FifoPolicy(), [0, 1, 2, 3]),
+        (LargestFirstPolicy(), [2, 1, 3, 0]),
+        (ShortestFirstPolicy(), [0, 3, 1, 2]),
+    ],
+)
+def test_size_policies(sized_tasks, policy, expected):
+    """Tests the order produced by each size-based policy."""
+
+    # Step 1 - Arrange
+    sizes = [UNKNOWN_SIZE if task.size_hint is None else task.size_hint for task in sized_tasks]
+
+    # Step 2 - Act & Step 3 - Assert
+    assert list(policy.order(sized_tasks, sizes)) == expected
+
+
+def test_priority_policy_keeps_input_order_for_ties():
+    """Tests that higher priorities go first and ties keep their input order."""
+
+    # Step 1 - Arrange
+    tasks = [
+        DownloadTask(url='http://example.com/a', priority=0),
+        DownloadTask(url='http://example.com/b', priority=5),
+        DownloadTask(url='http://example.com/c', priority=0),
+        DownloadTask(url='http://example.com/d', priority=5),
+    ]
+
+    # Step 2 - Act & Step 3 - Assert
+    assert list(PriorityPolicy().order(tasks, [])) == [1, 3, 0, 2]
+
+
+def test_manager_submits_in_scheduled_order(mocker, sized_tasks):
+    """Tests that the manager submits the tasks in the order chosen by the policy."""
+
+    # Step 1 - Arrange
+    downloader = mocker.Mock()
+    downloader.download_file.side_effect = lambda url, path, **kwargs: path
+    downloader.probe_size.return_value = 1_000_000
+    manager = DownloadManager(
+        downloader=downloader, max_threads=1, progress=None, scheduler=LargestFirstPolicy(), probe_sizes=True
+    )
+
+    # Step 2 - Act
+    manager.run(sized_tasks)
+
+    # Step 3 - Assert
+    # Only the task without a size hint is probed; it turns out to be the largest.
+    downloader.probe_size.assert_called_once_with('http://example.com/unknown.bin', token=ANY)
+    submitted = [call.args[0] for call in downloader.download_file.call_args_list]
+    assert submitted == [sized_tasks[index].url for index in (2, 1, 3, 0)]
+
+
+def test_size_probes_stop_at_the_batch_deadline(mocker):
+    """Tests that probing the sizes of a batch does not outlive its deadline."""
+
+    # Step 1 - Arrange
+    downloader = mocker.Mock()
+    downloader.probe_size.side_effect = lambda url, token: time.sleep(0.05)
+    tasks = [
+        DownloadTask(url=f'http://example.com/{number}.bin', destination_path=Path(f'/tmp/{number}.bin'))
+        for number in range(100)
+    ]
+    manager = DownloadManager(
+        downloader=downloader, max_threads=1, progress=None, scheduler=LargestFirstPolicy(), probe_sizes=True
+    )
+
+    # Step 2 - Act
+    started = time.perf_counter()
+    result = manager.run(tasks, timeout=0.2)
+    elapsed = time.perf_counter() - started
+
+    # Step 3 - Assert
+    assert elapsed < 1
+    assert downloader.probe_size.call_count < 10
+    assert len(result.not_started) == len(tasks)
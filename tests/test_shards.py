@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_shards.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for packing downloads into archive shards."""
+
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from grabharvester.downloader import DownloadService
+from grabharvester.interfaces import DownloadTask
+from grabharvester.manager import DownloadManager
+from grabharvester.shards import ShardWriter, read_entry, read_index
+
+
+def _add(writer, url, content):
+    """Adds in-memory `content` to the shards of `writer`."""
+
+    return writer.add(url, io.BytesIO(content), len(content))
+
+
+@pytest.mark.parametrize('shard_format', ['tar', 'zip'])
+def test_index_offsets_point_at_the_data(tmp_path, shard_format):
+    """Tests that members can be read both through the archive and straight from the index offsets."""
+
+    # Step 1 - Arrange
+    contents = {f'http://example.com/file{number}.txt': b'x' * (number * 300 + 1) for number in range(4)}
+
+    # Step 2 - Act
+    with ShardWriter(tmp_path, shard_format) as writer:
+        for url, content in contents.items():
+            _add(writer, url, content)
+
+    # Step 3 - Assert
+    entries = list(read_index(tmp_path))
+    assert [entry.url for entry in entries] == list(contents)
+    for entry in entries:
+        assert read_entry(tmp_path, entry) == contents[entry.url]
+
+    shard = tmp_path / entries[0].shard
+    if shard_format == 'tar':
+        with tarfile.open(shard) as archive:
+            assert archive.extractfile(entries[1].member).read() == contents[entries[1].url]
+    else:
+        with zipfile.ZipFile(shard) as archive:
+            assert archive.read(entries[1].member) == contents[entries[1].url]
+
+
+def test_shards_roll_over_at_size(tmp_path):
+    """Tests that a new shard is started once the current one is full."""
+
+    # Step 1 - Arrange
+    writer = ShardWriter(tmp_path, 'tar', shard_size=4096)
+
+    # Step 2 - Act
+    entries = [_add(writer, f'http://example.com/{number}.bin', b'y' * 1500) for number in range(4)]
+    writer.close()
+
+    # Step 3 - Assert
+    assert [entry.shard for entry in entries] == ['shard-000000.tar'] * 2 + ['shard-000001.tar'] * 2
+    for entry in entries:
+        assert read_entry(tmp_path, entry) == b'y' * 1500
+
+
+def test_webdataset_member_names(tmp_path):
+    """Tests that WebDataset shards name members `<key>.<extension>`."""
+
+    # Step 1 - Arrange & Step 2 - Act
+    with ShardWriter(tmp_path, 'webdataset') as writer:
+        first = _add(writer, 'http://example.com/images/cat.jpg?size=small', b'jpeg')
+        second = _add(writer, 'http://example.com/blob', b'data')
+
+    # Step 3 - Assert
+    assert (first.member, second.member) == ('000000000.jpg', '000000001.bin')
+    assert first.shard.endswith('.tar')
+
+
+def test_rejects_unknown_format(tmp_path):
+    """Tests that an unknown shard format is rejected up front."""
+
+    # Step 1 - Arrange & Step 2 - Act & Step 3 - Assert
+    with pytest.raises(ValueError, match='Invalid shard format'):
+        ShardWriter(tmp_path, 'rar')  # type: ignore
+
+
+def test_run_to_shards_packs_downloads(mocker, tmp_path):
+    """Tests that the manager packs each download into the shards, once per URL."""
+
+    # Step 1 - Arrange
+    response = mocker.Mock()
+    response.raise_for_status.return_value = None
+    response.headers = {'content-length': '5'}
+    response.iter_bytes.side_effect = lambda chunk_size: iter([b'hello'])
+    stream = mocker.patch('httpx.stream')
+    stream.return_value.__enter__.return_value = response
+    tasks = [DownloadTask(url='http://example.com/a.txt')] * 2 + [DownloadTask(url='http://example.com/b.txt')]
+
+    # Step 2 - Act
+    with ShardWriter(tmp_path) as writer:
+        result = DownloadManager(DownloadService(), progress=None).run_to_shards(tasks, writer)
+
+    # Step 3 - Assert
+    assert len(result.successes) == 3
+    assert result.failures == []
+    assert sorted(entry.url for entry in read_index(tmp_path)) == [
+        'http://example.com/a.txt',
+        'http://example.com/b.txt',
+    ]
+    assert all(read_entry(tmp_path, entry) == b'hello' for entry in result.successes)
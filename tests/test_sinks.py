@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_sinks.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Unit tests for storage sinks."""
+
+# pylint: disable=redefined-outer-name
+
+import httpx
+import pytest
+
+from grabharvester import sinks as sinks_module
+from grabharvester.downloader import DownloadService
+from grabharvester.interfaces import DownloadTask, FileOperationError
+from grabharvester.manager import DownloadManager
+from grabharvester.sinks import LocalSink, MemorySink, S3Sink
+
+
+@pytest.fixture
+def mock_stream(mocker):
+    """Mocks httpx.stream with a response streaming b'hello world' in two chunks."""
+
+    response = mocker.Mock()
+    response.raise_for_status.return_value = None
+    response.headers = {'content-length': '11'}
+    response.iter_bytes.side_effect = lambda chunk_size: iter([b'hello ', b'world'])
+
+    stream = mocker.patch('httpx.stream')
+    stream.return_value.__enter__.return_value = response
+    return stream
+
+
+def test_local_sink_writes_nested_keys(tmp_path, mock_stream):
+    """Tests that the service streams a body into a file of the local sink."""
+
+    # Step 1 - Arrange
+    sink = LocalSink(tmp_path)
+
+    # Step 2 - Act
+    key = DownloadService().download_to_sink('http://example.com/a.txt', sink, 'nested/dir/a.txt')
+
+    # Step 3 - Assert
+    assert key == 'nested/dir/a.txt'
+    assert (tmp_path / 'nested' / 'dir' / 'a.txt').read_bytes() == b'hello world'
+
+
+def test_local_sink_abort_and_invalid_keys(tmp_path):
+    """Tests that an aborted object leaves no file behind and that keys cannot escape the root."""
+
+    # Step 1 - Arrange
+    sink = LocalSink(tmp_path)
+
+    # Step 2 - Act
+    writer = sink.open('partial.bin')
+    writer.write(b'partial')
+    writer.abort()
+
+    # Step 3 - Assert
+    assert not list(tmp_path.iterdir())
+    with pytest.raises(ValueError, match='Invalid storage key'):
+        sink.open('../outside.bin')
+
+
+def test_failed_attempt_is_aborted_before_the_mirror(mocker, mock_stream):
+    """Tests that the object of a failed attempt is discarded before the next mirror is tried."""
+
+    # Step 1 - Arrange
+    sink = MemorySink()
+    mock_stream.side_effect = [httpx.ConnectError('refused', request=mocker.Mock()), mock_stream.return_value]
+
+    # Step 2 - Act
+    DownloadService().download_to_sink('http://a.example.com/a.txt', sink, mirrors=('http://b.example.com/a.txt',))
+
+    # Step 3 - Assert
+    assert list(sink.objects) == ['a.txt']
+    assert sink.objects['a.txt'].getvalue() == b'hello world'
+
+
+def test_s3_sink_puts_small_objects(mocker):
+    """Tests that objects smaller than a part are uploaded with a single request."""
+
+    # Step 1 - Arrange
+    client = mocker.Mock()
+    sink = S3Sink('bucket', prefix='data/', client=client)
+
+    # Step 2 - Act
+    writer = sink.open('a.txt')
+    writer.write(b'hello')
+    writer.close()
+
+    # Step 3 - Assert
+    client.put_object.assert_called_once_with(Bucket='bucket', Key='data/a.txt', Body=b'hello')
+    client.create_multipart_upload.assert_not_called()
+
+
+def test_s3_sink_streams_multipart_uploads(mocker):
+    """Tests that large objects are uploaded part by part, buffering at most one part."""
+
+    # Step 1 - Arrange
+    mocker.patch.object(sinks_module, 'MIN_PART_SIZE', 4)
+    client = mocker.Mock()
+    client.create_multipart_upload.return_value = {'UploadId': 'upload'}
+    client.upload_part.side_effect = lambda **arguments: {'ETag': f'etag-{arguments["PartNumber"]}'}
+    sink = S3Sink('bucket', client=client, part_size=4)
+
+    # Step 2 - Act
+    writer = sink.open('a.bin')
+    writer.write(b'abcdef')
+    writer.write(b'ghij')
+    writer.close()
+
+    # Step 3 - Assert
+    assert [call.kwargs['Body'] for call in client.upload_part.call_args_list] == [b'abcd', b'efgh', b'ij']
+    client.complete_multipart_upload.assert_called_once_with(
+        Bucket='bucket',
+        Key='a.bin',
+        UploadId='upload',
+        MultipartUpload={'Parts': [{'ETag': f'etag-{number}', 'PartNumber': number} for number in (1, 2, 3)]},
+    )
+
+
+def test_s3_sink_aborts_and_wraps_errors(mocker):
+    """Tests that aborting cancels the multipart upload and that client errors are wrapped."""
+
+    # Step 1 - Arrange
+    mocker.patch.object(sinks_module, 'MIN_PART_SIZE', 4)
+    client = mocker.Mock()
+    client.create_multipart_upload.return_value = {'UploadId': 'upload'}
+    client.upload_part.return_value = {'ETag': 'etag'}
+    client.put_object.side_effect = RuntimeError('access denied')
+    sink = S3Sink('bucket', client=client, part_size=4)
+
+    # Step 2 - Act
+    writer = sink.open('a.bin')
+    writer.write(b'abcdef')
+    writer.abort()
+
+    # Step 3 - Assert
+    client.abort_multipart_upload.assert_called_once_with(Bucket='bucket', Key='a.bin', UploadId='upload')
+    with pytest.raises(FileOperationError, match='access denied'):
+        sink.open('b.bin').close()
+
+
+def test_s3_sink_against_moto(mock_stream):
+    """Tests a real multipart upload against the moto S3 stand-in, if installed."""
+
+    # Step 1 - Arrange
+    moto = pytest.importorskip('moto')
+    boto3 = pytest.importorskip('boto3')
+
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='bucket')
+        manager = DownloadManager(DownloadService(), progress=None)
+
+        # Step 2 - Act
+        result = manager.run_to_sink([DownloadTask(url='http://example.com/a.txt')], S3Sink('bucket', client=client))
+
+        # Step 3 - Assert
+        assert result.successes == ['a.txt']
+        assert client.get_object(Bucket='bucket', Key='a.txt')['Body'].read() == b'hello world'
+
+
+def test_failed_s3_completion_aborts_the_upload(mocker, mock_stream):
+    """Tests that a multipart upload whose completion fails is aborted, leaving no parts behind."""
+
+    # Step 1 - Arrange
+    moto = pytest.importorskip('moto')
+    boto3 = pytest.importorskip('boto3')
+    mocker.patch.object(sinks_module, 'MIN_PART_SIZE', 4)
+
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='bucket')
+        mocker.patch.object(client, 'complete_multipart_upload', side_effect=RuntimeError('service unavailable'))
+        sink = S3Sink('bucket', client=client, part_size=4)
+
+        # Step 2 - Act & Step 3 - Assert
+        with pytest.raises(FileOperationError, match='service unavailable'):
+            DownloadService().download_to_sink('http://example.com/a.txt', sink)
+        assert client.list_multipart_uploads(Bucket='bucket').get('Uploads', []) == []
+
+
+def test_run_to_sink_keys_by_filename(mock_stream):
+    """Tests that the manager stores each URL once, under its filename."""
+
+    # Step 1 - Arrange
+    sink = MemorySink()
+    task = DownloadTask(url='http://example.com/a.txt')
+    manager = DownloadManager(DownloadService(), progress=None)
+
+    # Step 2 - Act
+    result = manager.run_to_sink([task, task, DownloadTask(url='http://example.com/b.txt')], sink)
+
+    # Step 3 - Assert
+    assert sorted(result.successes) == ['a.txt', 'a.txt', 'b.txt']
+    assert sorted(sink.objects) == ['a.txt', 'b.txt']
+    assert mock_stream.call_count == 2
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# ------------------------------------------------------------------------------
+#  Name: test_soak.py
+#  Version: 0.0.1
+#
+#  Summary: Grab Harvester
+#           A lightweight, concurrent, and robust batch file downloader for Python.
+#
+#  Author: Alexsander Lopes Camargos
+#  Author-email: alcamargos@vivaldi.net
+#
+#  License: MIT
+# ------------------------------------------------------------------------------
+
+"""Smoke tests for the soak test harness in benchmarks/soak.py.
+
+They run the harness in subprocesses and check timing and resource bounds, so
+they are marked slow and only run on request: `pytest -m slow`.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytestmark = pytest.mark.slow
+
+_SOAK = Path(__file__).parent.parent / 'benchmarks' / 'soak.py'
+
+
+def soak(*arguments):
+    """Runs a short soak test and returns the completed process."""
+
+    return subprocess.run(
+        [sys.executable, str(_SOAK), '--rounds', '4', '--tasks', '20', '--warmup', '1', '--report-every', '1']
+        + list(arguments),
+        capture_output=True,
+        text=True,
+        timeout=120,
+        check=False,
+    )
+
+
+def test_repeated_runs_do_not_leak():
+    """Tests that repeated runs mixing failures, timeouts and cancellations hold no extra resources."""
+
+    # Step 1 - Arrange & Step 2 - Act
+    completed = soak('--failure-rate', '0.2', '--timeout-rate', '0.1', '--cancel-rate', '0.3')
+
+    # Step 3 - Assert
+    assert completed.returncode == 0, completed.stdout + completed.stderr
+    assert 'OK: 80 downloads in 4 rounds' in completed.stdout
+
+
+def test_growth_beyond_a_bound_fails():
+    """Tests that the harness fails as soon as a resource exceeds its bound."""
+
+    # Step 1 - Arrange & Step 2 - Act
+    completed = soak('--session', '--max-thread-growth', '-1')
+
+    # Step 3 - Assert
+    assert completed.returncode == 1
+    assert 'round 2: threads grew' in completed.stdout